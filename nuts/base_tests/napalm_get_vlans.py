@@ -3,12 +3,11 @@
 from typing import Dict, Callable, List, Any
 
 import pytest
-from nornir.core.filter import F
 from nornir.core.task import MultiResult, Result
 from nornir_napalm.plugins.tasks import napalm_get
 
 from nuts.context import NornirNutsContext
-from nuts.helpers.filters import filter_hosts
+from nuts.helpers.filters import HostSelector, filter_hosts
 from nuts.helpers.result import AbstractHostResultExtractor
 
 
@@ -27,7 +26,7 @@ class VlansContext(NornirNutsContext):
     def nuts_arguments(self) -> Dict[str, List[str]]:
         return {"getters": ["vlans"]}
 
-    def nornir_filter(self) -> F:
+    def nornir_filter(self) -> HostSelector:
         return filter_hosts(self.nuts_parameters["test_data"])
 
     def nuts_extractor(self) -> VlansExtractor:
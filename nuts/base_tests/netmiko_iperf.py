@@ -6,11 +6,11 @@ from typing import Dict, Callable, Any
 import shlex
 
 from nornir.core.task import Task, Result
-from nornir.core.filter import F
 from nornir_netmiko import netmiko_send_command
 
 from nuts.context import NornirNutsContext
 from nuts.helpers.errors import Error
+from nuts.helpers.filters import HostSelector
 from nuts.helpers.result import NutsResult, AbstractHostDestResultExtractor
 
 
@@ -75,7 +75,9 @@ class IperfContext(NornirNutsContext):
         Sets up the all destinations to act as iperf servers.
         """
         test_data = self.nuts_parameters["test_data"]
-        destinations = F(hostname__any={entry["destination"] for entry in test_data})
+        destinations = HostSelector(
+            hostnames=(entry["destination"] for entry in test_data)
+        )
         assert self.nornir is not None
         selected_destinations = self.nornir.filter(destinations)
         selected_destinations.run(task=self.server_setup)
@@ -88,7 +90,9 @@ class IperfContext(NornirNutsContext):
         Stops all destinations that acted as iperf servers.
         """
         test_data = self.nuts_parameters["test_data"]
-        destinations = F(hostname__any={entry["destination"] for entry in test_data})
+        destinations = HostSelector(
+            hostnames=(entry["destination"] for entry in test_data)
+        )
         assert self.nornir is not None
         selected_destinations = self.nornir.filter(destinations)
         selected_destinations.run(task=self.server_teardown)
@@ -1,19 +1,71 @@
 """Provide necessary information that is needed for a specific test."""
 
 import pathlib
-from typing import Any, Callable, Optional, Dict, List
+from typing import (
+    Any,
+    Callable,
+    Optional,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Tuple,
+    Union,
+)
 from pytest import Config
 
 from nornir import InitNornir
 from nornir.core import Nornir
+from nornir.core.inventory import Inventory
 from nornir.core.task import AggregatedResult, Result
 from nornir.core.filter import F
 from nornir.core.plugins.inventory import InventoryPluginRegister
 
 from nuts.helpers.errors import NutsSetupError
 from nuts.helpers.result import AbstractResultExtractor
-from nuts.helpers.filters import filter_hosts, get_filter_object
-from nuts.helpers.cache import serialize_inventory, CacheInventory
+from nuts.helpers.filters import (
+    SELECTOR_KEYS,
+    HostSelector,
+    apply_filter,
+    filter_hosts,
+    is_expanded,
+    selected_names,
+)
+from nuts.helpers.breaker import get_circuit_breaker, open_circuit_result
+from nuts.helpers.cache import (
+    INVENTORY_CACHE_DIR,
+    INVENTORY_CACHE_FILE,
+    CacheInventory,
+    InventoryCacheFile,
+    inventory_fingerprint,
+    write_inventory_cache,
+)
+from nuts.helpers.connections import get_connection_pool
+from nuts.helpers.inventory_index import get_inventory_index
+from nuts.helpers.locks import get_host_locks
+from nuts.helpers.memo import get_task_memo
+from nuts.helpers.parametrization import (
+    ExpandedTestData,
+    get_inventory_fingerprint,
+    load_expanded,
+    parametrization_key,
+    set_inventory_fingerprint,
+)
+from nuts.helpers.planning import get_getter_plan
+from nuts.helpers.preflight import connection_plugin, get_preflight
+from nuts.helpers.processors import HostResultCallback, with_host_result_callback
+from nuts.helpers.recording import Recording, get_recording
+from nuts.helpers.registry import get_nornir_registry
+from nuts.helpers.result_cache import CACHE_TTL_KEY, get_result_cache
+from nuts.helpers.runners import (
+    ConcurrencyLimits,
+    DeadlineRunner,
+    build_runner,
+    concurrency_limits,
+    deadline,
+    get_concurrency_limits,
+)
 
 
 class NutsContext:
@@ -27,6 +79,12 @@ class NutsContext:
 
     id_format: str = ""
 
+    #: Keys in `test_execution` which configure how the task is run.
+    #: They are not passed on to the task.
+    EXECUTION_SETTINGS: FrozenSet[str] = frozenset(
+        {"runner", "deadline", CACHE_TTL_KEY}
+    )
+
     def __init__(
         self, nuts_parameters: Any = None, pytestconfig: Optional[Config] = None
     ):
@@ -55,7 +113,25 @@ class NutsContext:
         :return: A dict containing the additional arguments
         """
         test_execution = self.nuts_parameters.get("test_execution", None)
-        return {**(test_execution if test_execution is not None else {})}
+        return {
+            key: value
+            for key, value in (test_execution or {}).items()
+            if key not in self.EXECUTION_SETTINGS
+        }
+
+    def execution_settings(self) -> Dict[str, Any]:
+        """
+        Settings defined in the `test_execution` part of the test bundle
+        which configure how the task is run, e.g. its `runner`.
+
+        :return: A dict containing the execution settings
+        """
+        test_execution = self.nuts_parameters.get("test_execution", None)
+        return {
+            key: value
+            for key, value in (test_execution or {}).items()
+            if key in self.EXECUTION_SETTINGS
+        }
 
     def general_result(self) -> Any:
         """
@@ -63,6 +139,14 @@ class NutsContext:
         """
         raise NotImplementedError
 
+    @property
+    def stream_results(self) -> bool:
+        """
+        Whether the results of single hosts are handed to the tests
+        as soon as they are available.
+        """
+        return False
+
     @property
     def pytestconfig(self) -> Optional[Config]:
         """
@@ -108,43 +192,78 @@ class NornirNutsContext(NutsContext):
 
     def initialize(self) -> None:
         """
-        Checks if inventory should be cached, then use global inventory otherwise
-        regenerate it continuously.
+        Load the nornir instance for this context. Within a pytest session,
+        all contexts share a single loaded nornir instance per configuration
+        and receive a view of it.
         """
+        config_file = self.nornir_config_file()
         if self.pytestconfig:
-            config_file = pathlib.Path(
-                self.pytestconfig.getoption("nornir_configuration")
+            registry = get_nornir_registry(self.pytestconfig)
+            self.nornir = registry.view(
+                str(config_file), lambda: self._load_nornir(config_file)
             )
         else:
-            config_file = pathlib.Path(self.DEFAULT_NORNIR_CONFIG_FILE)
-
-        if self.pytestconfig and self.pytestconfig.cache:
-            if nornir_inventory := self.pytestconfig.cache.get(
-                "nuts/NORNIR_CACHE", None
-            ):
-                InventoryPluginRegister.register("NutsCacheInventory", CacheInventory)
-
-                self.nornir = InitNornir(
-                    config_file=str(config_file),
-                    logging={"enabled": False},
-                    inventory={
-                        "plugin": "NutsCacheInventory",
-                        "options": nornir_inventory,
+            self.nornir = self._load_nornir(config_file)
+
+    def nornir_config_file(self) -> pathlib.Path:
+        """
+        :return: The path to the nornir configuration file
+        """
+        if self.pytestconfig:
+            return pathlib.Path(self.pytestconfig.getoption("nornir_configuration"))
+        return pathlib.Path(self.DEFAULT_NORNIR_CONFIG_FILE)
+
+    def _load_nornir(self, config_file: pathlib.Path) -> Nornir:
+        """
+        Load the inventory from the pytest cache if it has been cached by an
+        earlier run and its files have not changed since. Otherwise, load it
+        from its source and cache it.
+        """
+        cache = getattr(self.pytestconfig, "cache", None)
+        if (
+            cache is None
+            or not self.pytestconfig
+            or self.pytestconfig.getoption("nornir_cache_disabled")
+        ):
+            return InitNornir(config_file=str(config_file), logging={"enabled": False})
+
+        cache_path = cache.mkdir(INVENTORY_CACHE_DIR) / INVENTORY_CACHE_FILE
+        fingerprint = inventory_fingerprint(config_file)
+        cached = InventoryCacheFile.open(cache_path)
+        if cached is not None and (
+            self.pytestconfig.getoption("nornir_cached_inventory")
+            or (fingerprint is not None and cached.fingerprint == fingerprint)
+        ):
+            InventoryPluginRegister.register("NutsCacheInventory", CacheInventory)
+            set_inventory_fingerprint(
+                self.pytestconfig, config_file, cached.fingerprint
+            )
+
+            return InitNornir(
+                config_file=str(config_file),
+                logging={"enabled": False},
+                inventory={
+                    "plugin": "NutsCacheInventory",
+                    "options": {
+                        "hosts": cached.hosts,
+                        "groups": cached.groups,
+                        "defaults": cached.defaults,
                     },
-                )
-                return
+                    # The cached hosts have been transformed when they were
+                    # written, applying the transform function again would
+                    # alter them twice and load every lazy host.
+                    "transform_function": None,
+                    "transform_function_options": None,
+                },
+            )
 
-        self.nornir = InitNornir(
+        nornir = InitNornir(
             config_file=str(config_file),
             logging={"enabled": False},
         )
-        if self.pytestconfig and not self.pytestconfig.getoption(
-            "nornir_cache_disabled"
-        ):
-            # pytest cash needs json encodable values
-            inventory = serialize_inventory(self.nornir.inventory)
-            if self.pytestconfig and self.pytestconfig.cache:
-                self.pytestconfig.cache.set("nuts/NORNIR_CACHE", inventory)
+        write_inventory_cache(cache_path, nornir.inventory, fingerprint)
+        set_inventory_fingerprint(self.pytestconfig, config_file, fingerprint)
+        return nornir
 
     def nuts_task(self) -> Callable[..., Result]:
         """
@@ -155,17 +274,43 @@ class NornirNutsContext(NutsContext):
         """
         raise NotImplementedError
 
-    def nornir_filter(self) -> F:
+    def nornir_filter(self) -> Union[F, HostSelector]:
         """
-        :return: A nornir filter that is applied to the nornir instance
+        :return: A nornir filter or host selector that is applied
+            to the nornir instance. It selects the hosts of the parametrized
+            test_data, which is only parametrized here if it has not been
+            parametrized yet.
         """
-        data = self.parametrize(self.nuts_parameters["test_data"])
-        return filter_hosts(data)
+        test_data = self.nuts_parameters["test_data"]
+        if not is_expanded(test_data):
+            test_data = self.parametrize(test_data)
+        return filter_hosts(test_data)
+
+    def _parametrization_key(self, test_data: Any) -> Optional[str]:
+        """
+        :return: The key of the expanded test_data in the pytest cache or None
+            if it is not cached
+        """
+        if not self.pytestconfig or self.pytestconfig.getoption(
+            "nornir_cache_disabled"
+        ):
+            return None
+        fingerprint = get_inventory_fingerprint(
+            self.pytestconfig, self.nornir_config_file()
+        )
+        return parametrization_key(test_data, fingerprint)
 
     def parametrize(self, test_data: Any) -> Any:
         """
         Parametrize test_data with hosts.
         This is needed because of the support of `tags` and `groups`.
+        Explicit hosts come first, followed by the selected hosts in the order
+        of the inventory. Hosts are selected with the inventory index, hence
+        `groups` also select the hosts which belong to a group by inheritance.
+        The expanded test_data is cached between executions as long as
+        neither the test_data nor the inventory change.
+        The other fields of every entry are kept once for all its hosts,
+        the entries of the single hosts are built when they are accessed.
 
         :param test_data: test_data from YAML file
 
@@ -173,10 +318,34 @@ class NornirNutsContext(NutsContext):
         """
         if not self.nornir:
             raise NutsSetupError("First Nornir has to be loaded. Call `initialize`.")
-        tests = []
+        # the cache is missing if the cacheprovider plugin is disabled
+        cache: Any = getattr(self.pytestconfig, "cache", None)
+        cache_key = None if cache is None else self._parametrization_key(test_data)
+        if cache_key is not None:
+            cached = load_expanded(cache.get(cache_key, None))
+            if cached is not None:
+                return ExpandedTestData(cached)
+        expanded = ExpandedTestData(self._expand(test_data))
+        if cache_key is not None:
+            cache.set(cache_key, expanded.expanded)
+        return expanded
+
+    def _expand(self, test_data: Any) -> Iterator[Tuple[Dict[str, Any], List[Any]]]:
+        """
+        :param test_data: test_data from YAML file
+        :return: The fields besides the selectors of every entry of test_data,
+            each with the hosts the entry is expanded to
+        """
+        assert self.nornir is not None
+        # objects which merely behave like an inventory are filtered by nornir
+        inventory: Any = self.nornir.inventory
+        index = (
+            get_inventory_index(self.pytestconfig, inventory)
+            if isinstance(inventory, Inventory)
+            else None
+        )
         for data in test_data:
-            filter_object = get_filter_object(data)
-            nr = self.nornir.filter(filter_object)
+            selector = HostSelector.from_entry(data)
 
             # keep explicit hosts in test_data
             def get_explicit_hosts(data: Any) -> List[str]:
@@ -186,55 +355,282 @@ class NornirNutsContext(NutsContext):
                 return [host]
 
             explicit_hosts = get_explicit_hosts(data)
-            inventory_hosts = list(nr.inventory.hosts.keys())
+            if index is not None:
+                inventory_hosts = selector.resolve(index)
+            else:
+                nr = self.nornir.filter(selector)
+                inventory_hosts = list(nr.inventory.hosts.keys())
             if not inventory_hosts:
                 raise NutsSetupError(
-                    f"No hosts found for filter {filter_object} in Nornir inventory."
+                    f"No hosts found for filter {selector} in Nornir inventory."
                 )
-            for host in set(explicit_hosts + inventory_hosts):
-                new_data = data.copy()
-                new_data.pop("groups", None)
-                new_data.pop("tags", None)
-                tests.append({**new_data, "host": host})
-
-        return tests
+            base = {
+                key: value for key, value in data.items() if key not in SELECTOR_KEYS
+            }
+            yield base, list(dict.fromkeys(explicit_hosts + inventory_hosts))
 
-    def general_result(self) -> AggregatedResult:
+    def select_hosts(self) -> Nornir:
         """
-        Nornir is run with the defined task, additional arguments,
-            a nornir filter and returns the raw result from nornir.
-        If the setup/teardown methods are overwritten, these are executed as well.
+        Apply the nornir filter of this context to the nornir instance.
 
-        :return: The raw result as provided by nornir's executed task
+        :return: The nornir instance restricted to the hosts the task is run on
         """
         if not self.nornir:
             raise NutsSetupError("Nornir instance not found in context object")
-        self.setup()
         nornir_filter = self.nornir_filter()
 
         if nornir_filter:
-            selected_hosts = self.nornir.filter(nornir_filter)
+            selected_hosts = apply_filter(self.nornir, nornir_filter)
 
         else:
             selected_hosts = self.nornir
 
         if not selected_hosts.inventory.hosts:
             if nornir_filter:
+                names = selected_names(nornir_filter)
+                if names is None:
+                    raise NutsSetupError(
+                        f"No hosts found for filter {nornir_filter} in the inventory."
+                    )
                 raise NutsSetupError(
-                    f'Host(s) "{",".join(nornir_filter.filters["name__any"])}" '
+                    f'Host(s) "{",".join(sorted(map(str, names)))}" '
                     f"not found in the inventory."
                 )
             else:
                 raise NutsSetupError("No Hosts found, is the nornir inventory empty?")
+        return selected_hosts
+
+    @property
+    def stream_results(self) -> bool:
+        return bool(
+            self.pytestconfig and self.pytestconfig.getoption("nuts_stream_results")
+        )
 
-        overall_results = selected_hosts.run(
+    def configure_runner(self, selected_hosts: Nornir) -> Nornir:
+        """
+        Apply the runner and the deadline of the `test_execution` settings
+        and the concurrency limits of the inventory to the selected hosts.
+        Without a deadline in `test_execution`, the `--nuts-host-deadline`
+        of the session is used.
+
+        :param selected_hosts: The nornir instance restricted to the selected hosts
+        :return: The nornir instance with the configured runner
+        """
+        runner = selected_hosts.runner
+        settings = self.execution_settings()
+        if "runner" in settings:
+            runner = build_runner(selected_hosts, settings["runner"])
+        limits = concurrency_limits(selected_hosts)
+        if limits:
+            session_limits = (
+                get_concurrency_limits(self.pytestconfig)
+                if self.pytestconfig
+                else ConcurrencyLimits()
+            )
+            runner = session_limits.runner(runner, limits)
+        host_deadline = deadline(
+            settings["deadline"]
+            if "deadline" in settings
+            else self.pytestconfig and self.pytestconfig.getoption("nuts_host_deadline")
+        )
+        if host_deadline:
+            # wraps the limited runner, so that a host acquires its slots
+            # before its deadline starts
+            runner = DeadlineRunner(runner, host_deadline)
+        if runner is selected_hosts.runner:
+            return selected_hosts
+        return selected_hosts.with_runner(runner)
+
+    def run_task(
+        self,
+        selected_hosts: Nornir,
+        on_host_result: Optional[HostResultCallback] = None,
+    ) -> AggregatedResult:
+        """
+        Run the task of this context with its arguments on the selected hosts.
+        Getters of `napalm_get` are merged with those of other contexts
+        of the session, other tasks that are run with the same arguments
+        by several contexts are run only once per host.
+
+        :param selected_hosts: The nornir instance restricted to the selected hosts
+        :param on_host_result: Called for every host as soon as its result
+            is available
+        :return: The raw result as provided by nornir's executed task
+        """
+        selected_hosts = self.configure_runner(selected_hosts)
+        if self.pytestconfig:
+            plan = get_getter_plan(self.pytestconfig)
+            if plan.covers(self):
+                return plan.run(self, selected_hosts, on_host_result)
+            memo = get_task_memo(self.pytestconfig)
+            if memo.covers(self):
+                return memo.run(self, selected_hosts, on_host_result)
+        return with_host_result_callback(selected_hosts, on_host_result).run(
             task=self.nuts_task(), **self.nuts_arguments()
         )
 
-        self.teardown()
-        selected_hosts.close_connections(on_good=True, on_failed=True)
+    def general_result(
+        self, on_host_result: Optional[HostResultCallback] = None
+    ) -> AggregatedResult:
+        """
+        Nornir is run with the defined task, additional arguments,
+            a nornir filter and returns the raw result from nornir.
+        If the setup/teardown methods are overwritten, these are executed as well.
+        Within a pytest session, the selected hosts are held while the task runs,
+        so that contexts which run in the background do not use them at the
+        same time. Contexts with their own setup/teardown hold all hosts.
+
+        :param on_host_result: Called for every host as soon as its result
+            is available
+        :return: The raw result as provided by nornir's executed task
+        """
+        if not self.nornir:
+            raise NutsSetupError("Nornir instance not found in context object")
+        recording = get_recording(self.pytestconfig) if self.pytestconfig else None
+        if recording is not None and recording.replay:
+            return self._replay(recording, on_host_result)
+        if not self.pytestconfig:
+            return self._run(None, recording, on_host_result)
+        locks = get_host_locks(self.pytestconfig)
+        if self._customizes_setup():
+            # setup and teardown may access any device
+            with locks.exclusive():
+                return self._run(None, recording, on_host_result)
+        selected_hosts = self.select_hosts()
+        with locks.hold(selected_hosts.inventory.hosts):
+            return self._run(selected_hosts, recording, on_host_result)
+
+    def _customizes_setup(self) -> bool:
+        """
+        :return: Whether the context overrides its setup or teardown
+        """
+        context_class = type(self)
+        return (
+            context_class.setup is not NornirNutsContext.setup
+            or context_class.teardown is not NornirNutsContext.teardown
+        )
+
+    def _run(
+        self,
+        selected_hosts: Optional[Nornir],
+        recording: Optional[Recording],
+        on_host_result: Optional[HostResultCallback],
+    ) -> AggregatedResult:
+        """
+        Run setup, the task on the selected hosts and teardown.
+
+        :param selected_hosts: The hosts to run the task on, selected after
+            setup if not given
+        """
+        self.setup()
+        if selected_hosts is None:
+            selected_hosts = self.select_hosts()
+        pool = get_connection_pool(self.pytestconfig) if self.pytestconfig else None
+        if pool is not None:
+            pool.checkout(selected_hosts.inventory.hosts.values())
+        all_selected = selected_hosts
+        try:
+            open_circuits = self._open_circuits(selected_hosts)
+            cache = get_result_cache(self.pytestconfig) if self.pytestconfig else None
+            cached = (
+                cache.load(
+                    self,
+                    [
+                        host
+                        for name, host in selected_hosts.inventory.hosts.items()
+                        if name not in open_circuits
+                    ],
+                )
+                if cache is not None
+                else {}
+            )
+            skipped = {*open_circuits, *cached}
+            if skipped:
+                selected_hosts = selected_hosts.filter(
+                    filter_func=lambda host: host.name not in skipped
+                )
+                self._release_planned(skipped)
+
+            if selected_hosts.inventory.hosts:
+                overall_results = self.run_task(selected_hosts, on_host_result)
+                if cache is not None:
+                    cache.store(self, overall_results)
+            else:
+                overall_results = AggregatedResult(
+                    getattr(self.nuts_task(), "__name__", "")
+                )
+            for host, multi_result in cached.items():
+                overall_results[host] = multi_result
+                if on_host_result:
+                    on_host_result(host, multi_result)
+            for host, exception in open_circuits.items():
+                overall_results[host] = open_circuit_result(
+                    all_selected.inventory.hosts[host], overall_results.name, exception
+                )
+                if on_host_result:
+                    on_host_result(host, overall_results[host])
+
+            self.teardown()
+        finally:
+            # the connections of skipped hosts have been checked out, too
+            if pool is None:
+                selected_hosts.close_connections(on_good=True, on_failed=True)
+            else:
+                pool.checkin(all_selected.inventory.hosts.values())
+        if recording is not None:
+            recording.record(self, overall_results)
         return overall_results
 
+    def _replay(
+        self, recording: Recording, on_host_result: Optional[HostResultCallback]
+    ) -> AggregatedResult:
+        """
+        Read the results of the selected hosts from a recording.
+        Neither setup/teardown nor the task are run.
+        """
+        selected_hosts = self.select_hosts()
+        self._release_planned(selected_hosts.inventory.hosts)
+        overall_results = recording.load(self, selected_hosts.inventory.hosts.values())
+        if on_host_result:
+            for host, multi_result in overall_results.items():
+                on_host_result(host, multi_result)
+        return overall_results
+
+    def _release_planned(self, hosts: Iterable[str]) -> None:
+        """
+        Release the getters or the task planned for hosts whose task is not run,
+        so that they are neither fetched for this context nor kept for it.
+        """
+        if not self.pytestconfig:
+            return
+        plan = get_getter_plan(self.pytestconfig)
+        if plan.covers(self):
+            plan.release(self, hosts)
+            return
+        memo = get_task_memo(self.pytestconfig)
+        if memo.covers(self):
+            memo.release(self, hosts)
+
+    def _open_circuits(self, selected_hosts: Nornir) -> Dict[str, BaseException]:
+        """
+        :return: The selected hosts which could not be connected to
+            by an earlier context or the pre-flight, mapped to their failure
+        """
+        if not self.pytestconfig:
+            return {}
+        open_circuits = {}
+        preflight = get_preflight(self.pytestconfig)
+        if preflight is not None:
+            open_circuits.update(
+                preflight.check(
+                    selected_hosts.inventory.hosts.values(), connection_plugin(self)
+                )
+            )
+        breaker = get_circuit_breaker(self.pytestconfig)
+        if breaker is not None:
+            open_circuits.update(breaker.open_hosts(selected_hosts.inventory.hosts))
+        return open_circuits
+
     def setup(self) -> None:
         """
         Defines code which is executed before the nornir task.
@@ -0,0 +1,127 @@
+"""
+Session-wide circuit breaker for unreachable hosts.
+
+Once connecting to a host has failed, e.g. because of a timeout, a refused
+connection or a failed authentication, the circuit of the host is opened.
+Later contexts do not try to connect to the host again and report the
+original failure instead of waiting for the same timeout once more.
+"""
+
+import socket
+import threading
+from typing import Dict, Iterable, Optional, Tuple, Type
+
+from pytest import Config, StashKey
+from napalm.base.exceptions import ConnectionException
+from netmiko.exceptions import (
+    NetmikoAuthenticationException,
+    NetmikoTimeoutException,
+)
+from nornir.core.inventory import Host
+from nornir.core.task import MultiResult, Result
+from paramiko.ssh_exception import AuthenticationException, NoValidConnectionsError
+
+#: Exceptions which show that a host cannot be connected to
+CONNECTION_FAILURES: Tuple[Type[BaseException], ...] = (
+    ConnectionError,
+    TimeoutError,
+    socket.timeout,
+    ConnectionException,
+    NetmikoTimeoutException,
+    NetmikoAuthenticationException,
+    AuthenticationException,
+    NoValidConnectionsError,
+)
+
+
+def is_connection_failure(exception: Optional[BaseException]) -> bool:
+    """
+    Check whether an exception, or one of the exceptions it has been
+    raised from, shows that the host cannot be connected to.
+
+    :param exception: The exception raised while running a task
+    :return: Whether the exception is caused by a failed connection
+    """
+    seen = set()
+    while exception is not None and id(exception) not in seen:
+        if isinstance(exception, CONNECTION_FAILURES):
+            return True
+        seen.add(id(exception))
+        exception = exception.__cause__ or exception.__context__
+    return False
+
+
+class CircuitBreaker:
+    """
+    Remembers the hosts which cannot be connected to
+    together with the exception that has shown it.
+    """
+
+    def __init__(self) -> None:
+        self._open: Dict[str, BaseException] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, host: object) -> bool:
+        return host in self._open
+
+    def trip(self, host: str, exception: BaseException) -> None:
+        """
+        Open the circuit of a host. The first failure of a host is kept.
+
+        :param host: The name of the host
+        :param exception: The exception raised when connecting to the host
+        """
+        with self._lock:
+            self._open.setdefault(host, exception)
+
+    def open_hosts(self, hosts: Iterable[str]) -> Dict[str, BaseException]:
+        """
+        :param hosts: The names of the hosts to check
+        :return: The hosts with an open circuit mapped to their failure
+        """
+        with self._lock:
+            return {host: self._open[host] for host in hosts if host in self._open}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._open.clear()
+
+
+def open_circuit_result(host: Host, name: str, exception: BaseException) -> MultiResult:
+    """
+    Create the result of a host which is skipped because its circuit is open.
+
+    :param host: The skipped host
+    :param name: The name of the task
+    :param exception: The failure which has opened the circuit
+    :return: A failed result which carries the original exception
+    """
+    multi_result = MultiResult(name)
+    multi_result.append(
+        Result(
+            host=host,
+            result=f"Skipped {host.name}, connecting to it has already failed "
+            f"in this session.",
+            failed=True,
+            exception=exception,
+            name=name,
+        )
+    )
+    return multi_result
+
+
+circuit_breaker_key = StashKey[CircuitBreaker]()
+
+
+def get_circuit_breaker(config: Config) -> Optional[CircuitBreaker]:
+    """
+    Return the circuit breaker of a pytest session, creating it if necessary.
+
+    :param config: The pytest config of the session
+    :return: The session-wide circuit breaker or None if it is disabled
+    """
+    if config.getoption("nuts_circuit_breaker_disabled"):
+        return None
+    if circuit_breaker_key not in config.stash:
+        config.stash[circuit_breaker_key] = CircuitBreaker()
+    return config.stash[circuit_breaker_key]
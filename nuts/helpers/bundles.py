@@ -0,0 +1,108 @@
+"""
+Parsing of test bundles.
+
+Bundles are parsed with the libyaml loader if PyYAML has been built with it.
+The parsed content of every bundle is kept in the pytest cache with marshal,
+together with the modification time and size of the bundle file. As long as
+neither changes, later collections read the cached content instead of the
+YAML. Unlike pickle, marshal only restores plain data and never runs code
+while loading, so a tampered cache file cannot run code either. Bundles with
+values marshal cannot represent, e.g. dates, are parsed on every collection.
+"""
+
+import hashlib
+import marshal
+import pathlib
+from typing import Any, Optional, Tuple
+
+import yaml
+from pytest import Config, StashKey
+
+from nuts.helpers.recording import write_atomically
+
+#: Version of the cached bundles, part of the key of every cached bundle
+BUNDLE_CACHE_FORMAT = 2
+
+#: Directory of the parsed bundles within the pytest cache
+BUNDLE_CACHE_DIR = "nuts-bundles"
+
+#: The fastest available loader for YAML files, restricted to standard tags
+SafeLoader: Any = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+_BundleKey = Tuple[int, str, int, int]
+
+
+def parse_bundle(path: pathlib.Path) -> Any:
+    """
+    :param path: The test bundle
+    :return: The parsed content of the test bundle
+    """
+    with path.open() as fo:
+        return yaml.load(fo, Loader=SafeLoader)
+
+
+class BundleCache:
+    """
+    Directory of parsed test bundles.
+
+    :param directory: The directory which holds the parsed bundles
+    """
+
+    def __init__(self, directory: pathlib.Path) -> None:
+        self.directory = directory
+
+    @staticmethod
+    def key(path: pathlib.Path) -> _BundleKey:
+        """
+        :param path: The test bundle
+        :return: The key under which the parsed content of the bundle is valid
+        """
+        stat = path.stat()
+        return BUNDLE_CACHE_FORMAT, str(path.resolve()), stat.st_mtime_ns, stat.st_size
+
+    def _path(self, key: _BundleKey) -> pathlib.Path:
+        return self.directory / f"{hashlib.sha256(key[1].encode()).hexdigest()}.marshal"
+
+    def load(self, path: pathlib.Path) -> Any:
+        """
+        Return the parsed content of a test bundle, from the cache if the
+        bundle has not changed since it has been cached.
+
+        :param path: The test bundle
+        :return: The parsed content of the test bundle
+        """
+        key = self.key(path)
+        cache_path = self._path(key)
+        try:
+            with cache_path.open("rb") as file:
+                cached_key, content = marshal.load(file)
+            if cached_key == key:
+                return content
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
+        content = parse_bundle(path)
+        try:
+            write_atomically(cache_path, marshal.dumps((key, content)))
+        except (OSError, ValueError):
+            # values which marshal cannot represent are parsed every time
+            pass
+        return content
+
+
+bundle_cache_key = StashKey[BundleCache]()
+
+
+def get_bundle_cache(config: Config) -> Optional[BundleCache]:
+    """
+    Return the bundle cache of a pytest session, creating it if necessary.
+
+    :param config: The pytest config of the session
+    :return: The bundle cache or None if there is no directory to keep it in
+    """
+    # the cache is missing if the cacheprovider plugin is disabled
+    cache = getattr(config, "cache", None)
+    if cache is None:
+        return None
+    if bundle_cache_key not in config.stash:
+        config.stash[bundle_cache_key] = BundleCache(cache.mkdir(BUNDLE_CACHE_DIR))
+    return config.stash[bundle_cache_key]
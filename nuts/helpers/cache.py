@@ -1,10 +1,111 @@
-from typing import Any, Dict
+"""
+Cache of the nornir inventory between executions.
 
+The inventory is cached in a binary file: a header with the offset of the
+index, followed by one JSON record per host and the JSON index. The
+index holds the fingerprint of the inventory, the offset of every host
+record, all groups and the defaults. The file is memory-mapped and a host
+record is only decoded once the host is accessed.
 
+The cache holds plain data only, so a tampered cache file cannot run code
+when it is loaded. Inventories with data that JSON cannot represent are
+not cached.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import pathlib
+import struct
+import tempfile
+import threading
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    Mapping,
+    Optional,
+    Tuple,
+    cast,
+)
+
+
+from nornir.core.configuration import Config
 from nornir.core.inventory import Group, Groups, Host, Hosts, Inventory, ParentGroups
 from nornir.plugins.inventory.simple import _get_defaults, _get_inventory_element
 
 
+#: Version of the serialized inventory, part of its fingerprint
+CACHE_FORMAT = 3
+
+#: Directory of the cached inventory within the pytest cache
+INVENTORY_CACHE_DIR = "nuts-inventory"
+INVENTORY_CACHE_FILE = "inventory.bin"
+
+_MAGIC = b"NUTSINV3"
+_HEADER = struct.Struct("<8sQ")
+
+#: Inventory plugins which only read local files, mapped to the default values
+#: of the options which name these files
+FILE_INVENTORIES = {
+    "SimpleInventory": {
+        "host_file": "hosts.yaml",
+        "group_file": "groups.yaml",
+        "defaults_file": "defaults.yaml",
+    },
+}
+
+
+def file_digest(path: pathlib.Path) -> Optional[str]:
+    """
+    :param path: The file to hash
+    :return: The hash of the content of the file or None if it does not exist
+    """
+    try:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    except OSError:
+        return None
+
+
+def inventory_fingerprint(config_file: pathlib.Path) -> Optional[str]:
+    """
+    Identify the inventory a nornir configuration file loads.
+    The fingerprint covers the configuration file, the inventory plugin
+    with its options and the content of the files the inventory is read from.
+
+    :param config_file: The nornir configuration file
+    :return: The fingerprint or None if the inventory is not read from
+        local files only, so that changes of the inventory cannot be detected
+    """
+    try:
+        config = Config.from_file(str(config_file))
+    except Exception:
+        return None
+    inventory = config.inventory
+    file_options = FILE_INVENTORIES.get(inventory.plugin or "")
+    if file_options is None:
+        return None
+    options = {**file_options, **(inventory.options or {})}
+    data = {
+        "format": CACHE_FORMAT,
+        "config_file": str(config_file.resolve()),
+        "config": file_digest(config_file),
+        "plugin": inventory.plugin,
+        "options": options,
+        "transform_function": inventory.transform_function,
+        "transform_function_options": inventory.transform_function_options,
+        "files": {
+            option: file_digest(pathlib.Path(options[option]).expanduser())
+            for option in file_options
+        },
+    }
+    serialized = json.dumps(data, sort_keys=True, default=repr)
+    return hashlib.sha256(serialized.encode()).hexdigest()
+
+
 def serialize_inventory(inventory: Inventory) -> Dict[str, Dict[str, Any]]:
     data = {
         "hosts": {host: data.dict() for host, data in inventory.hosts.items()},
@@ -14,19 +115,182 @@ def serialize_inventory(inventory: Inventory) -> Dict[str, Dict[str, Any]]:
     return data
 
 
+def write_inventory_cache(
+    path: pathlib.Path, inventory: Inventory, fingerprint: Optional[str]
+) -> None:
+    """
+    Write an inventory to a binary cache file. The file is replaced atomically.
+    Inventories with data that JSON cannot represent are not written.
+
+    :param path: The cache file
+    :param inventory: The inventory to cache
+    :param fingerprint: The fingerprint of the inventory, if known
+    """
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(_HEADER.pack(_MAGIC, 0))
+            offsets: Dict[str, Tuple[int, int]] = {}
+            for name, host in inventory.hosts.items():
+                record = json.dumps(host.dict()).encode()
+                offsets[name] = (file.tell(), len(record))
+                file.write(record)
+            index_offset = file.tell()
+            index = {
+                "format": CACHE_FORMAT,
+                "fingerprint": fingerprint,
+                "hosts": offsets,
+                "groups": {
+                    name: group.dict() for name, group in inventory.groups.items()
+                },
+                "defaults": inventory.defaults.dict(),
+            }
+            file.write(json.dumps(index).encode())
+            file.seek(0)
+            file.write(_HEADER.pack(_MAGIC, index_offset))
+        os.replace(tmp, path)
+    except (TypeError, ValueError):
+        # the inventory holds data which JSON cannot represent
+        os.unlink(tmp)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class _HostRecords(Mapping[str, Dict[str, Any]]):
+    """The host records of a cache file, decoded when they are accessed."""
+
+    def __init__(self, buffer: mmap.mmap, offsets: Dict[str, Tuple[int, int]]):
+        self._buffer = buffer
+        self._offsets = offsets
+
+    def __getitem__(self, name: str) -> Dict[str, Any]:
+        offset, length = self._offsets[name]
+        return json.loads(self._buffer[offset : offset + length])  # noqa: E203
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._offsets)
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+
+class InventoryCacheFile:
+    """
+    A memory-mapped inventory cache file.
+
+    :param fingerprint: The fingerprint of the cached inventory
+    :param hosts: The host records, decoded when they are accessed
+    :param groups: The group records
+    :param defaults: The defaults record
+    """
+
+    def __init__(
+        self,
+        fingerprint: Optional[str],
+        hosts: Mapping[str, Dict[str, Any]],
+        groups: Dict[str, Dict[str, Any]],
+        defaults: Dict[str, Any],
+    ) -> None:
+        self.fingerprint = fingerprint
+        self.hosts = hosts
+        self.groups = groups
+        self.defaults = defaults
+
+    @classmethod
+    def open(cls, path: pathlib.Path) -> Optional["InventoryCacheFile"]:
+        """
+        :param path: The cache file
+        :return: The opened cache file or None if it is missing or unreadable
+        """
+        try:
+            with open(path, "rb") as file:
+                buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, index_offset = _HEADER.unpack_from(buffer)
+            if magic != _MAGIC or not index_offset:
+                return None
+            index = json.loads(buffer[index_offset:])
+        except (OSError, ValueError, struct.error):
+            return None
+        if not isinstance(index, dict) or index.get("format") != CACHE_FORMAT:
+            return None
+        return cls(
+            index["fingerprint"],
+            _HostRecords(buffer, index["hosts"]),
+            index["groups"],
+            index["defaults"],
+        )
+
+
+class LazyHosts(Hosts):
+    """
+    Hosts which are only built once they are accessed.
+    Names, membership and length are known without building any host.
+
+    :param names: The names of all hosts
+    :param build: Builds the host of a name
+    """
+
+    def __init__(self, names: Iterable[str], build: Callable[[str], Host]) -> None:
+        # hosts which have not been built yet are None
+        unbuilt: Dict[str, Any] = dict.fromkeys(names)
+        super().__init__(unbuilt)
+        self._build = build
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name: str) -> Host:
+        host = cast(Optional[Host], super().__getitem__(name))
+        if host is None:
+            with self._lock:
+                host = cast(Optional[Host], super().__getitem__(name))
+                if host is None:
+                    host = self._build(name)
+                    super().__setitem__(name, host)
+        return host
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self[name] if name in self else default
+
+    def values(self) -> Any:
+        return [self[name] for name in self]
+
+    def items(self) -> Any:
+        return [(name, self[name]) for name in self]
+
+    def copy(self) -> Hosts:
+        return Hosts(self.items())
+
+    def loaded(self) -> Iterator[Host]:
+        """:return: The hosts which have been built so far"""
+        return (host for host in super().values() if host is not None)
+
+
+def loaded_hosts(hosts: Hosts) -> Iterable[Host]:
+    """
+    :param hosts: The hosts of an inventory
+    :return: The hosts which have been built, i.e. all hosts
+        unless they are built lazily
+    """
+    return hosts.loaded() if isinstance(hosts, LazyHosts) else hosts.values()
+
+
 class CacheInventory:
     def __init__(
         self,
-        hosts: Dict[str, Dict[str, Any]],
+        hosts: Mapping[str, Dict[str, Any]],
         groups: Dict[str, Dict[str, Any]],
         defaults: Dict[str, Any],
     ) -> None:
         """
         CacheInventory inspired by the SimpleInventory.
+        Hosts are only built once they are accessed.
 
         Args:
 
-          hosts: Dict with host name and host.dict() data
+          hosts: Mapping with host name and host.dict() data
           groups: Dict with group name and group.dict() data
           default: defaults.dict() dict data
         """
@@ -39,11 +303,6 @@ class CacheInventory:
 
         defaults = _get_defaults(self.defaults_dict)
 
-        hosts = Hosts()
-
-        for n, h in self.hosts_dict.items():
-            hosts[n] = _get_inventory_element(Host, h, n, defaults)
-
         groups = Groups()
 
         for n, g in self.groups_dict.items():
@@ -52,7 +311,11 @@ class CacheInventory:
         for group in groups.values():
             group.groups = ParentGroups([groups[str(g)] for g in group.groups])
 
-        for host in hosts.values():
+        def build(name: str) -> Host:
+            host = _get_inventory_element(Host, self.hosts_dict[name], name, defaults)
             host.groups = ParentGroups([groups[str(g)] for g in host.groups])
+            return host
+
+        hosts = LazyHosts(self.hosts_dict, build)
 
         return Inventory(hosts=hosts, groups=groups, defaults=defaults)
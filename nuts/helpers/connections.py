@@ -0,0 +1,134 @@
+"""
+Session-wide pool of device connections.
+
+Instead of closing all connections at the end of every test class, the pool
+keeps them open so that later contexts can reuse them. Connections are
+evicted when they have been idle for too long or when too many are open.
+Connections which are checked out by a context are not evicted until the
+context checks them in again.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+from pytest import Config, StashKey
+from nornir.core.inventory import Host
+
+_PoolKey = Tuple[int, str]
+
+
+class ConnectionPool:
+    """
+    Keeps track of the open connections of hosts and closes them
+    in least-recently-used order.
+
+    :param max_idle: seconds after which an unused connection is closed
+    :param max_open: maximum number of connections kept open
+    """
+
+    def __init__(
+        self, max_idle: Optional[float] = None, max_open: Optional[int] = None
+    ) -> None:
+        self.max_idle = max_idle
+        self.max_open = max_open
+        self._connections: "OrderedDict[_PoolKey, Tuple[Host, str, float]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._connections)
+
+    def checkout(self, hosts: Iterable[Host]) -> None:
+        """
+        Take the connections of hosts which are about to be used out of the
+        pool, so that they are not evicted while they are in use.
+
+        :param hosts: hosts whose connections are used
+        """
+        with self._lock:
+            for host in hosts:
+                for connection in list(host.connections):
+                    self._connections.pop((id(host), connection), None)
+
+    def checkin(self, hosts: Iterable[Host]) -> None:
+        """
+        Register the open connections of hosts that have just been used
+        and evict connections according to the pool limits.
+
+        :param hosts: hosts whose connections have been used
+        """
+        now = time.monotonic()
+        with self._lock:
+            for host in hosts:
+                for connection in list(host.connections):
+                    key = (id(host), connection)
+                    self._connections.pop(key, None)
+                    self._connections[key] = (host, connection, now)
+            self._evict(now)
+
+    def close_all(self) -> None:
+        """Close all connections of the pool."""
+        with self._lock:
+            while self._connections:
+                self._close(next(iter(self._connections)))
+
+    def _evict(self, now: float) -> None:
+        if self.max_idle is not None:
+            while self._connections:
+                key = next(iter(self._connections))
+                if now - self._connections[key][2] <= self.max_idle:
+                    break
+                self._close(key)
+        if self.max_open is not None:
+            while len(self._connections) > self.max_open:
+                self._close(next(iter(self._connections)))
+
+    def _close(self, key: _PoolKey) -> None:
+        host, connection, _ = self._connections.pop(key)
+        _close_connection(host, connection)
+
+
+def _close_connection(host: Host, connection: str) -> None:
+    if connection in host.connections:
+        try:
+            host.close_connection(connection)
+        except Exception:
+            # a broken connection must not prevent closing the others
+            pass
+
+
+def close_connections(hosts: Iterable[Host]) -> None:
+    """
+    Close all open connections of the given hosts.
+
+    :param hosts: hosts whose connections should be closed
+    """
+    for host in hosts:
+        for connection in list(host.connections):
+            _close_connection(host, connection)
+
+
+connection_pool_key = StashKey[ConnectionPool]()
+
+
+def get_connection_pool(config: Config) -> Optional[ConnectionPool]:
+    """
+    Return the connection pool of a pytest session, creating it if necessary.
+
+    :param config: The pytest config of the session
+    :return: The session-wide connection pool or None if connections
+        should be closed after every test class
+    """
+    if config.getoption("nuts_close_connections"):
+        return None
+    if connection_pool_key not in config.stash:
+        max_idle = config.getoption("nuts_connection_idle_timeout")
+        max_open = config.getoption("nuts_max_connections")
+        config.stash[connection_pool_key] = ConnectionPool(
+            max_idle=max_idle if max_idle and max_idle > 0 else None,
+            max_open=max_open if max_open and max_open > 0 else None,
+        )
+    return config.stash[connection_pool_key]
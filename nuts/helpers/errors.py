@@ -17,5 +17,17 @@ class NutsNornirError(Error):
     """Errors caused by nornir."""
 
 
+class NutsDeadlineError(Error):
+    """The task of a host has not completed within its deadline."""
+
+
+class NutsRecordedError(Error):
+    """An exception which has been raised while a result was recorded."""
+
+    def __init__(self, type_name: str, message: str):
+        super(NutsRecordedError, self).__init__(f"{type_name}: {message}")
+        self.type_name = type_name
+
+
 class NutsUnvalidatedResultError(Error):
     """Internal error: An unvalidated NutsResult was accessed."""
@@ -3,16 +3,234 @@ Functions to filter the nornir inventory and used in conjunction with
 a context's nornir_filter function.
 """
 
-from typing import Optional, Dict, Any, List, Union
+import re
+from fnmatch import fnmatchcase
+from typing import Optional, Dict, Any, Iterable, List, Mapping, Union
+from nornir.core import Nornir
 from nornir.core.filter import F, OR
+from nornir.core.inventory import Host, Hosts, Inventory
 
+from nuts.helpers.cache import LazyHosts
 from nuts.helpers.errors import NutsSetupError
+from nuts.helpers.inventory_index import InventoryIndex, as_list
+from nuts.helpers.parametrization import ExpandedTestData
 
+#: Keys of `test_data` which select hosts
+SELECTOR_KEYS = ("host", "host_match", "host_regex", "tags", "groups")
 
-def filter_hosts(test_data: Optional[List[Dict[str, Any]]]) -> F:
+
+class HostSelector:
+    """
+    Selects the hosts with any of the given names, hostnames, tags or groups,
+    or with a name which matches any of the given patterns.
+
+    Like the nornir filter `F(name__any=...) | F(tags__any=...) | ...`, a
+    selector can be passed to `Nornir.filter`. However, it checks a host with
+    a few set lookups instead of evaluating a chain of filters, and it can be
+    resolved against an inventory index without checking any host at all.
+    Hosts belong to the groups they belong to by inheritance, too.
+
+    :param names: Names of the selected hosts
+    :param hostnames: Hostnames of the selected hosts
+    :param tags: Tags of the selected hosts
+    :param groups: Groups of the selected hosts
+    :param patterns: Shell-style wildcard patterns of the names of the
+        selected hosts, e.g. `core-*-zrh`
+    :param regexes: Regular expressions which match the whole names
+        of the selected hosts
+    :raises NutsSetupError: if a regular expression is invalid
+    """
+
+    def __init__(
+        self,
+        names: Iterable[str] = (),
+        hostnames: Iterable[str] = (),
+        tags: Iterable[Any] = (),
+        groups: Iterable[str] = (),
+        patterns: Iterable[str] = (),
+        regexes: Iterable[str] = (),
+    ) -> None:
+        self.names = frozenset(names)
+        self.hostnames = frozenset(hostnames)
+        self.tags = frozenset(tags)
+        self.groups = frozenset(groups)
+        self.patterns = frozenset(patterns)
+        self.regexes = frozenset(regexes)
+        try:
+            self._compiled = [re.compile(regex) for regex in self.regexes]
+        except (re.error, TypeError) as exc:
+            raise NutsSetupError(f"Invalid host_regex: {exc}") from exc
+
+    @classmethod
+    def from_entry(cls, test_data_entry: Dict[str, Any]) -> "HostSelector":
+        """
+        :param test_data_entry: An entry of `test_data` with `host`,
+            `host_match`, `host_regex`, `tags` or `groups`
+        :raises NutsSetupError: if the entry does not select any hosts
+            or if a regular expression is invalid
+        :return: The selector of the hosts of the entry
+        """
+        if not any(key in test_data_entry for key in SELECTOR_KEYS):
+            raise NutsSetupError(
+                "No Nornir filter could be created. Check if `host`, "
+                "`host_match`, `host_regex`, `tags` or `groups` are specified."
+            )
+        return cls(
+            names=as_list(test_data_entry.get("host")),
+            tags=as_list(test_data_entry.get("tags")),
+            groups=as_list(test_data_entry.get("groups")),
+            patterns=map(str, as_list(test_data_entry.get("host_match"))),
+            regexes=as_list(test_data_entry.get("host_regex")),
+        )
+
+    @property
+    def filters(self) -> Dict[str, List[Any]]:
+        """
+        The values the selector selects hosts by, in the notation
+        of nornir's filters, e.g. `name__any`.
+        """
+        fields = {
+            "name__any": self.names,
+            "hostname__any": self.hostnames,
+            "tags__any": self.tags,
+            "groups__any": self.groups,
+            "name__match": self.patterns,
+            "name__regex": self.regexes,
+        }
+        return {
+            field: sorted(values, key=str) for field, values in fields.items() if values
+        }
+
+    def __call__(self, host: Host) -> bool:
+        if host.name in self.names or host.hostname in self.hostnames:
+            return True
+        if self.tags:
+            for tag in as_list(host.get("tags")):
+                try:
+                    if tag in self.tags:
+                        return True
+                except TypeError:
+                    continue
+        if self.groups and any(
+            group.name in self.groups for group in host.extended_groups()
+        ):
+            return True
+        if any(fnmatchcase(host.name, pattern) for pattern in self.patterns):
+            return True
+        return any(regex.fullmatch(host.name) for regex in self._compiled)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(
+            f"{field.replace('__any', '')}={values}"
+            for field, values in self.filters.items()
+        )
+        return f"{type(self).__name__}({fields})"
+
+    def resolve(self, index: InventoryIndex) -> List[str]:
+        """
+        :param index: The index of the inventory
+        :return: The names of the selected hosts in the order of the inventory
+        """
+        selected = index.names(self.names)
+        if self.hostnames:
+            selected |= index.hostnames(self.hostnames)
+        if self.tags:
+            selected |= index.tagged(self.tags)
+        if self.groups:
+            selected |= index.grouped(self.groups)
+        if self.patterns:
+            selected |= index.matching(self.patterns)
+        if self.regexes:
+            selected |= index.matching_regex(self.regexes)
+        return index.ordered(selected)
+
+
+def is_expanded(test_data: Any) -> bool:
+    """
+    :param test_data: The test data of a context
+    :return: Whether every entry selects a single host by its name only,
+        like the entries of parametrized test data do
+    """
+    if isinstance(test_data, ExpandedTestData):
+        return True
+    return isinstance(test_data, list) and all(
+        isinstance(entry, Mapping)
+        and isinstance(entry.get("host"), str)
+        and not any(key in entry for key in SELECTOR_KEYS if key != "host")
+        for entry in test_data
+    )
+
+
+def filter_hosts(test_data: Optional[Iterable[Dict[str, Any]]]) -> HostSelector:
     assert test_data is not None
-    hosts: List[str] = list({entry["host"] for entry in test_data})
-    return F(name__any=hosts)
+    if isinstance(test_data, ExpandedTestData):
+        return HostSelector(names=test_data.hosts())
+    return HostSelector(names=(entry["host"] for entry in test_data))
+
+
+def selected_names(nornir_filter: Any) -> Optional[List[str]]:
+    """
+    :param nornir_filter: A nornir filter or host selector
+    :return: The names of the hosts the filter selects if it selects
+        hosts by their name only, None otherwise
+    """
+    if isinstance(nornir_filter, HostSelector):
+        if set(nornir_filter.filters) - {"name__any"}:
+            return None
+        return list(nornir_filter.names)
+    if type(nornir_filter) is F and set(nornir_filter.filters) == {"name__any"}:
+        return list(nornir_filter.filters["name__any"])
+    return None
+
+
+def select_names(nornir: Nornir, names: Iterable[str]) -> Nornir:
+    """
+    Restrict a nornir instance to the hosts with the given names, like
+    `F(name__any=names)` does. Other hosts are not accessed at all,
+    so they are not built if the inventory is loaded lazily.
+
+    :param nornir: The nornir instance to restrict
+    :param names: The names of the hosts to select
+    :return: A nornir instance with the selected hosts of the inventory
+    """
+    wanted = set(names)
+    inventory = nornir.inventory
+    hosts = Hosts(
+        {
+            name: inventory.hosts[name]
+            for name in inventory.hosts.keys()
+            if name in wanted
+        }
+    )
+    return Nornir(
+        inventory=Inventory(
+            hosts=hosts, groups=inventory.groups, defaults=inventory.defaults
+        ),
+        config=nornir.config,
+        data=nornir.data,
+        processors=nornir.processors,
+        runner=nornir._runner,
+    )
+
+
+def apply_filter(nornir: Nornir, nornir_filter: Any) -> Nornir:
+    """
+    Apply a nornir filter. Host selectors which select hosts by their name
+    only pick the hosts from the inventory without checking the other hosts.
+    Nornir filters which select hosts by their name only do the same if the
+    hosts of the inventory are built lazily.
+
+    :param nornir: The nornir instance to filter
+    :param nornir_filter: The nornir filter
+    :return: A nornir instance with the selected hosts of the inventory
+    """
+    names = selected_names(nornir_filter)
+    if names is not None and (
+        isinstance(nornir_filter, HostSelector)
+        or isinstance(nornir.inventory.hosts, LazyHosts)
+    ):
+        return select_names(nornir, names)
+    return nornir.filter(nornir_filter)
 
 
 def get_filter_object(test_data_entry: Dict[str, Any]) -> Union[F, OR]:
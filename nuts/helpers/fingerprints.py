@@ -0,0 +1,100 @@
+"""
+Fingerprints of the results tests have passed with, kept between executions.
+
+Whenever a test receives its `single_result`, a fingerprint of the entry of
+the test bundle and of the transformed result is taken. The fingerprints of
+the tests which passed are stored in the pytest cache at the end of every
+execution. With ``--nuts-changed-only``, a test whose fingerprint has not
+changed since it last passed is not evaluated again and is reported as
+passed from cache.
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, Optional
+
+from pytest import Config, StashKey, TestReport
+
+#: Key of the fingerprints in the pytest cache
+FINGERPRINTS_KEY = "nuts/fingerprints"
+
+#: Test status category of tests which are passed from cache
+PASSED_FROM_CACHE = "passed-from-cache"
+
+#: Fingerprint of the result a test item has received
+item_fingerprint_key = StashKey[str]()
+
+
+def result_fingerprint(entry: Any, result: Any) -> str:
+    """
+    :param entry: The entry of the test bundle a test is run with
+    :param result: The transformed result the test receives
+    :return: The fingerprint of the entry and the result
+    """
+    state = json.dumps({"entry": entry, "result": result}, sort_keys=True, default=repr)
+    return hashlib.sha256(state.encode()).hexdigest()
+
+
+class Fingerprints:
+    """
+    The fingerprints of the passed tests of the last and of the current execution.
+
+    :param last: The fingerprints of the tests which passed in the last
+        execution, keyed by the node id of the test
+    """
+
+    def __init__(self, last: Dict[str, str]) -> None:
+        self.last = last
+        self.current: Dict[str, Optional[str]] = {}
+
+    def unchanged(self, nodeid: str, fingerprint: str) -> bool:
+        """
+        :param nodeid: The node id of a test
+        :param fingerprint: The fingerprint of the result the test has received
+        :return: Whether the test has passed with the same result before
+        """
+        return self.last.get(nodeid) == fingerprint
+
+    def report(self, report: TestReport, fingerprint: Optional[str]) -> None:
+        """
+        Keep the fingerprint of a test if it passes.
+
+        :param report: The report of a phase of the test
+        :param fingerprint: The fingerprint of the result the test has received
+        """
+        if report.failed or fingerprint is None:
+            self.current[report.nodeid] = None
+        elif report.when == "call" and report.passed:
+            self.current.setdefault(report.nodeid, fingerprint)
+
+    def merged(self) -> Dict[str, str]:
+        """
+        :return: The fingerprints of the last execution, updated with
+            the outcomes of the tests which have been run in this execution
+        """
+        merged = dict(self.last)
+        for nodeid, fingerprint in self.current.items():
+            if fingerprint is None:
+                merged.pop(nodeid, None)
+            else:
+                merged[nodeid] = fingerprint
+        return merged
+
+
+fingerprints_key = StashKey[Fingerprints]()
+
+
+def get_fingerprints(config: Config) -> Optional[Fingerprints]:
+    """
+    Return the fingerprints of a pytest session, creating them if necessary.
+
+    :param config: The pytest config of the session
+    :return: The fingerprints or None if there is no cache to keep them in
+    """
+    # the cache is missing if the cacheprovider plugin is disabled
+    cache = getattr(config, "cache", None)
+    if cache is None:
+        return None
+    if fingerprints_key not in config.stash:
+        config.stash[fingerprints_key] = Fingerprints(cache.get(FINGERPRINTS_KEY, {}))
+    return config.stash[fingerprints_key]
@@ -0,0 +1,213 @@
+"""
+Index of the hosts of a nornir inventory by name, tag and group.
+
+Selecting the hosts of a `test_data` entry with a nornir filter checks every
+host of the inventory, for every entry. The index is built once per session
+and inventory instead, so that the hosts of an entry are resolved with a few
+set unions. Wildcard patterns and regular expressions are only matched against
+the names which start with their literal prefix.
+"""
+
+import bisect
+import re
+import threading
+from fnmatch import fnmatchcase
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from pytest import Config, StashKey
+from nornir.core.inventory import Hosts, Inventory
+
+_Index = Dict[Any, Set[str]]
+
+
+def glob_prefix(pattern: str) -> str:
+    """
+    :param pattern: A shell-style wildcard pattern
+    :return: The literal beginning of all names which match the pattern
+    """
+    return re.split(r"[*?\[]", pattern, maxsplit=1)[0]
+
+
+def regex_prefix(pattern: str) -> str:
+    """
+    :param pattern: A regular expression which must match whole names
+    :return: The literal beginning of all names which match the expression,
+        may be shorter than necessary
+    """
+    if "|" in pattern:
+        return ""
+    prefix = re.split(r"[.^$*+?{}\[\]\\|()]", pattern, maxsplit=1)[0]
+    if pattern.startswith(("*", "?", "{"), len(prefix)):
+        # the last literal character is optional
+        prefix = prefix[:-1]
+    return prefix
+
+
+def as_list(value: Any) -> List[Any]:
+    """
+    :param value: A single value or a list of values from `test_data`
+        or the inventory
+    :return: The values as a list
+    """
+    if value is None:
+        return []
+    return list(value) if isinstance(value, (list, tuple, set, frozenset)) else [value]
+
+
+class InventoryIndex:
+    """
+    Hosts of an inventory by name, hostname, tag and group. Hosts are members
+    of the groups they belong to by inheritance, too.
+
+    Hostnames, tags and groups are only indexed once they are needed first,
+    as this builds all hosts of a lazily loaded inventory. Names are matched
+    against wildcard patterns and regular expressions in a sorted table of
+    all names, and every pattern is matched only once.
+
+    :param hosts: The hosts of the inventory
+    """
+
+    def __init__(self, hosts: Hosts) -> None:
+        self._hosts = hosts
+        self._positions = {name: position for position, name in enumerate(hosts)}
+        self._indexes: Optional[Tuple[_Index, _Index, _Index]] = None
+        self._sorted_names: Optional[List[str]] = None
+        self._matches: Dict[Tuple[str, str], Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def _build(self) -> Tuple[_Index, _Index, _Index]:
+        with self._lock:
+            if self._indexes is None:
+                hostnames: _Index = {}
+                tags: _Index = {}
+                groups: _Index = {}
+                for name, host in self._hosts.items():
+                    hostnames.setdefault(host.hostname, set()).add(name)
+                    for tag in as_list(host.get("tags")):
+                        try:
+                            tags.setdefault(tag, set()).add(name)
+                        except TypeError:
+                            # unhashable tags cannot be selected anyway
+                            continue
+                    for group in host.extended_groups():
+                        groups.setdefault(group.name, set()).add(name)
+                self._indexes = hostnames, tags, groups
+            return self._indexes
+
+    @staticmethod
+    def _lookup(index: _Index, keys: Iterable[Any]) -> Set[str]:
+        selected: Set[str] = set()
+        for key in keys:
+            try:
+                selected.update(index.get(key, ()))
+            except TypeError:
+                continue
+        return selected
+
+    def names(self, names: Iterable[str]) -> Set[str]:
+        """
+        :param names: Names of hosts
+        :return: The names of the hosts which are part of the inventory
+        """
+        return {name for name in names if name in self._positions}
+
+    def hostnames(self, hostnames: Iterable[str]) -> Set[str]:
+        """
+        :param hostnames: Hostnames of hosts
+        :return: The names of the hosts with any of the hostnames
+        """
+        return self._lookup(self._build()[0], hostnames)
+
+    def tagged(self, tags: Iterable[Any]) -> Set[str]:
+        """
+        :param tags: Tags of hosts
+        :return: The names of the hosts with any of the tags
+        """
+        return self._lookup(self._build()[1], tags)
+
+    def grouped(self, groups: Iterable[str]) -> Set[str]:
+        """
+        :param groups: Names of groups
+        :return: The names of the hosts which belong to any of the groups
+        """
+        return self._lookup(self._build()[2], groups)
+
+    def _with_prefix(self, prefix: str) -> Iterable[str]:
+        if self._sorted_names is None:
+            self._sorted_names = sorted(self._positions)
+        names = self._sorted_names
+        for position in range(bisect.bisect_left(names, prefix), len(names)):
+            if not names[position].startswith(prefix):
+                break
+            yield names[position]
+
+    def _match(self, kind: str, pattern: str) -> Set[str]:
+        with self._lock:
+            key = (kind, pattern)
+            if key not in self._matches:
+                if kind == "glob":
+                    self._matches[key] = {
+                        name
+                        for name in self._with_prefix(glob_prefix(pattern))
+                        if fnmatchcase(name, pattern)
+                    }
+                else:
+                    regex = re.compile(pattern)
+                    self._matches[key] = {
+                        name
+                        for name in self._with_prefix(regex_prefix(pattern))
+                        if regex.fullmatch(name)
+                    }
+            return self._matches[key]
+
+    def matching(self, patterns: Iterable[str]) -> Set[str]:
+        """
+        :param patterns: Shell-style wildcard patterns, e.g. `core-*-zrh`
+        :return: The names of the hosts which match any of the patterns
+        """
+        selected: Set[str] = set()
+        for pattern in patterns:
+            selected |= self._match("glob", pattern)
+        return selected
+
+    def matching_regex(self, regexes: Iterable[str]) -> Set[str]:
+        """
+        :param regexes: Regular expressions which must match whole names
+        :return: The names of the hosts which match any of the expressions
+        """
+        selected: Set[str] = set()
+        for regex in regexes:
+            selected |= self._match("regex", regex)
+        return selected
+
+    def ordered(self, names: Iterable[str]) -> List[str]:
+        """
+        :param names: Names of hosts of the inventory
+        :return: The names in the order of the inventory
+        """
+        return sorted(names, key=self._positions.__getitem__)
+
+
+inventory_indexes_key = StashKey[Dict[int, Tuple[Inventory, InventoryIndex]]]()
+
+
+def get_inventory_index(
+    config: Optional[Config], inventory: Inventory
+) -> InventoryIndex:
+    """
+    Return the index of an inventory, creating it if necessary.
+
+    :param config: The pytest config of the session, if any. Without a
+        session, a new index is created every time.
+    :param inventory: The inventory to index
+    :return: The index of the inventory
+    """
+    if config is None:
+        return InventoryIndex(inventory.hosts)
+    if inventory_indexes_key not in config.stash:
+        config.stash[inventory_indexes_key] = {}
+    indexes = config.stash[inventory_indexes_key]
+    # the inventory is kept along with its index, so its id is not reused
+    if id(inventory) not in indexes:
+        indexes[id(inventory)] = (inventory, InventoryIndex(inventory.hosts))
+    return indexes[id(inventory)][1]
@@ -0,0 +1,85 @@
+"""
+Exclusive access to the devices of a session.
+
+Test classes are fetched in background threads while others run, either
+prefetched or with streamed results. Host objects and their open connections
+are shared by all contexts of a session, so a context holds its hosts while
+it runs its task and closes or checks in their connections. Contexts which
+hold different hosts run at the same time, contexts which share a host wait
+for each other. A context with its own setup or teardown may access any
+device and runs on its own.
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Iterable, Iterator, Set
+
+from pytest import Config, StashKey
+
+
+class HostLocks:
+    """
+    Hosts which are in use by a context.
+    All hosts of a context are acquired at once, so contexts cannot
+    deadlock by waiting for the hosts of each other.
+    """
+
+    def __init__(self) -> None:
+        self._held: Set[str] = set()
+        self._exclusive = False
+        self._exclusive_waiting = 0
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def hold(self, hosts: Iterable[str]) -> Iterator[None]:
+        """
+        Hold hosts, waiting until no other context uses any of them.
+
+        :param hosts: The names of the hosts
+        """
+        names = set(hosts)
+        with self._condition:
+            self._condition.wait_for(
+                lambda: not self._exclusive
+                and not self._exclusive_waiting
+                and self._held.isdisjoint(names)
+            )
+            self._held |= names
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._held -= names
+                self._condition.notify_all()
+
+    @contextmanager
+    def exclusive(self) -> Iterator[None]:
+        """Hold all hosts, waiting until no other context uses any host."""
+        with self._condition:
+            self._exclusive_waiting += 1
+            try:
+                self._condition.wait_for(lambda: not self._exclusive and not self._held)
+            finally:
+                self._exclusive_waiting -= 1
+            self._exclusive = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._exclusive = False
+                self._condition.notify_all()
+
+
+host_locks_key = StashKey[HostLocks]()
+
+
+def get_host_locks(config: Config) -> HostLocks:
+    """
+    Return the host locks of a pytest session, creating them if necessary.
+
+    :param config: The pytest config of the session
+    :return: The session-wide host locks
+    """
+    if host_locks_key not in config.stash:
+        config.stash[host_locks_key] = HostLocks()
+    return config.stash[host_locks_key]
@@ -0,0 +1,221 @@
+"""
+Session-wide memo of task results.
+
+Different test bundles often run the same task with the same arguments against
+the same hosts. The memo makes sure such a call reaches the device only once:
+concurrent requests wait for the one in flight, later requests are served from
+memory. A result is kept until the last context that has been planned for it
+has consumed it.
+"""
+
+import json
+import threading
+from concurrent.futures import Future
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    TYPE_CHECKING,
+)
+
+from pytest import Config, StashKey
+from nornir.core import Nornir
+from nornir.core.task import AggregatedResult, MultiResult
+
+from nuts.helpers.processors import HostResultCallback, with_host_result_callback
+
+if TYPE_CHECKING:
+    from nuts.context import NornirNutsContext
+
+
+_TaskKey = Tuple[Callable[..., Any], str]
+_MemoKey = Tuple[str, Hashable, str]
+
+
+def normalize_arguments(arguments: Dict[str, Any]) -> Optional[str]:
+    """
+    Normalize task arguments so that equal arguments result in equal keys.
+
+    :param arguments: The arguments passed to the nornir task
+    :return: A canonical representation of the arguments or None if
+        they cannot be represented
+    """
+    try:
+        return json.dumps(arguments, sort_keys=True)
+    except (TypeError, ValueError):
+        return None
+
+
+def task_key(ctx: "NornirNutsContext") -> Optional[_TaskKey]:
+    """
+    Identify the task and arguments a context runs.
+
+    Bound methods are only equal if they belong to the same context,
+    so tasks implemented on a context are never shared with other contexts.
+
+    :param ctx: The context whose task should be identified
+    :return: The task identity or None if the task cannot be memoized
+    """
+    try:
+        task = ctx.nuts_task()
+    except NotImplementedError:
+        return None
+    arguments = normalize_arguments(ctx.nuts_arguments())
+    if arguments is None:
+        return None
+    return task, arguments
+
+
+class TaskMemo:
+    """
+    Single-flight memo of nornir task results per host, task and arguments.
+    """
+
+    def __init__(self) -> None:
+        # number of contexts which still need the result
+        self._pending: Dict[_MemoKey, int] = {}
+        self._results: Dict[_MemoKey, "Future[MultiResult]"] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def add(self, ctx: "NornirNutsContext", hosts: List[str]) -> None:
+        """
+        Plan the task of a context.
+
+        :param ctx: The context whose task is planned
+        :param hosts: The hosts the context will run its task on
+        """
+        key = task_key(ctx)
+        if key is None:
+            return
+        with self._lock:
+            for host in hosts:
+                memo_key = (host, *key)
+                self._pending[memo_key] = self._pending.get(memo_key, 0) + 1
+
+    def covers(self, ctx: "NornirNutsContext") -> bool:
+        """
+        :return: Whether the results of the context can be memoized
+        """
+        return task_key(ctx) is not None
+
+    def run(
+        self,
+        ctx: "NornirNutsContext",
+        selected_hosts: Nornir,
+        on_host_result: Optional[HostResultCallback] = None,
+    ) -> AggregatedResult:
+        """
+        Run the task of a context on all selected hosts whose results are
+        neither in memory nor currently being fetched by another context.
+
+        :param ctx: The context to run the task for
+        :param selected_hosts: The hosts the context runs its task on
+        :param on_host_result: Called for every host as soon as its result
+            is available
+        :return: The results of all selected hosts
+        """
+        key = task_key(ctx)
+        assert key is not None
+        task, _ = key
+        futures: Dict[str, "Future[MultiResult]"] = {}
+        owned: List[str] = []
+        with self._lock:
+            for host in selected_hosts.inventory.hosts:
+                memo_key = (host, *key)
+                if memo_key not in self._results:
+                    self._results[memo_key] = Future()
+                    owned.append(host)
+                futures[host] = self._results[memo_key]
+
+        if on_host_result:
+            report = on_host_result
+
+            def reporter(host: str) -> Callable[["Future[MultiResult]"], None]:
+                def done(future: "Future[MultiResult]") -> None:
+                    if future.exception() is None:
+                        report(host, future.result())
+
+                return done
+
+            for host, future in futures.items():
+                future.add_done_callback(reporter(host))
+
+        def complete(host: str, multi_result: MultiResult) -> None:
+            # results of other hosts may be waited for before the run is over
+            if not futures[host].done():
+                futures[host].set_result(multi_result)
+
+        if owned:
+            hosts = selected_hosts.filter(filter_func=lambda h: h.name in owned)
+            try:
+                fetched = with_host_result_callback(hosts, complete).run(
+                    task=task, on_failed=True, **ctx.nuts_arguments()
+                )
+            except BaseException as exception:
+                with self._lock:
+                    for host in owned:
+                        self._results.pop((host, *key), None)
+                        if not futures[host].done():
+                            futures[host].set_exception(exception)
+                raise
+            for host in owned:
+                complete(host, fetched[host])
+
+        overall_results = AggregatedResult(getattr(task, "__name__", str(task)))
+        for host, future in futures.items():
+            overall_results[host] = future.result()
+            self._release((host, *key), failed=overall_results[host].failed)
+        return overall_results
+
+    def release(self, ctx: "NornirNutsContext", hosts: Iterable[str]) -> None:
+        """
+        Release the task of a context on hosts it does not run it on after all,
+        e.g. because they are unreachable or their result is cached.
+
+        :param ctx: The context whose task is released
+        :param hosts: The hosts the context does not run its task on
+        """
+        key = task_key(ctx)
+        if key is None:
+            return
+        for host in hosts:
+            self._release((host, *key), failed=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pending.clear()
+            self._results.clear()
+
+    def _release(self, memo_key: _MemoKey, failed: bool) -> None:
+        with self._lock:
+            remaining = self._pending.get(memo_key, 0) - 1
+            if remaining > 0:
+                self._pending[memo_key] = remaining
+            else:
+                self._pending.pop(memo_key, None)
+            if remaining <= 0 or failed:
+                # failed results are not reused, later contexts try again
+                self._results.pop(memo_key, None)
+
+
+task_memo_key = StashKey[TaskMemo]()
+
+
+def get_task_memo(config: Config) -> TaskMemo:
+    """
+    Return the task memo of a pytest session, creating it if necessary.
+
+    :param config: The pytest config of the session
+    :return: The session-wide task memo
+    """
+    if task_memo_key not in config.stash:
+        config.stash[task_memo_key] = TaskMemo()
+    return config.stash[task_memo_key]
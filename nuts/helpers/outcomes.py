@@ -0,0 +1,149 @@
+"""
+Outcomes of the hosts of every test class, kept between executions.
+
+At the end of every execution, the outcome of each host of every test class
+is stored in the pytest cache. A host has failed in a test class if one of
+its tests failed or raised an error. With ``--nuts-rerun-failed-hosts``, the
+tests of hosts which passed in the last execution are deselected, and the
+task of a test class is only run on its hosts which failed.
+"""
+
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from pytest import Config, Item, StashKey, TestReport
+
+from nuts.helpers.parametrization import ExpandedTestData
+
+#: Key of the host outcomes in the pytest cache
+HOST_OUTCOMES_KEY = "nuts/host_outcomes"
+
+FAILED = "failed"
+PASSED = "passed"
+
+_Outcomes = Dict[str, Dict[str, str]]
+
+
+def item_host(item: Item) -> Optional[str]:
+    """
+    :param item: A test item
+    :return: The host the item tests or None if it does not test a single host
+    """
+    callspec = getattr(item, "callspec", None)
+    entry = callspec.params.get("nuts_test_entry") if callspec else None
+    host = entry.get("host") if isinstance(entry, Mapping) else None
+    return host if isinstance(host, str) else None
+
+
+class HostOutcomes:
+    """
+    The outcomes of the hosts of the last and of the current execution.
+
+    :param last: The outcome of every host of every test class in the last
+        execution, keyed by the node id of the test class
+    """
+
+    def __init__(self, last: _Outcomes) -> None:
+        self.last = last
+        self.current: _Outcomes = {}
+        self._items: Dict[str, Tuple[str, str]] = {}
+
+    def add(self, items: Iterable[Item], class_id: str) -> None:
+        """
+        Track the outcomes of test items of a test class.
+
+        :param items: The items which are run
+        :param class_id: The node id of the test class of the items
+        """
+        for item in items:
+            host = item_host(item)
+            if host is not None:
+                self._items[item.nodeid] = (class_id, host)
+
+    def report(self, report: TestReport) -> None:
+        """
+        Update the outcome of the host of a test item.
+
+        :param report: The report of a phase of the test item
+        """
+        if report.nodeid not in self._items:
+            return
+        class_id, host = self._items[report.nodeid]
+        outcomes = self.current.setdefault(class_id, {})
+        if report.failed:
+            outcomes[host] = FAILED
+        else:
+            outcomes.setdefault(host, PASSED)
+
+    def has_failures(self) -> bool:
+        """
+        :return: Whether any host failed in the last execution
+        """
+        return any(FAILED in outcomes.values() for outcomes in self.last.values())
+
+    def select(self, items: List[Item], class_id: str) -> Tuple[List[Item], Set[str]]:
+        """
+        Select the test items of the hosts which failed in the last execution.
+
+        :param items: The items of a test class
+        :param class_id: The node id of the test class
+        :return: The items to deselect and the hosts whose items remain. If the
+            test class has not been run in the last execution, all items remain.
+        """
+        last = self.last.get(class_id)
+        if last is None:
+            return [], set(filter(None, map(item_host, items)))
+        deselected = []
+        hosts = set()
+        for item in items:
+            host = item_host(item)
+            if host is not None and last.get(host) == PASSED:
+                deselected.append(item)
+            elif host is not None:
+                hosts.add(host)
+        return deselected, hosts
+
+    def merged(self) -> _Outcomes:
+        """
+        :return: The outcomes of the last execution, updated with the
+            outcomes of the hosts which have been run in this execution
+        """
+        merged = {class_id: dict(outcomes) for class_id, outcomes in self.last.items()}
+        for class_id, outcomes in self.current.items():
+            merged.setdefault(class_id, {}).update(outcomes)
+        return merged
+
+
+def narrow_test_data(test_data: Any, hosts: Set[str]) -> Any:
+    """
+    :param test_data: The parametrized test data of a context
+    :param hosts: The hosts whose tests are run
+    :return: The test data of the given hosts. Test data with entries that do
+        not belong to a single host is returned unchanged.
+    """
+    if isinstance(test_data, ExpandedTestData):
+        return test_data.narrow(hosts)
+    if not isinstance(test_data, list) or not all(
+        isinstance(entry, Mapping) and isinstance(entry.get("host"), str)
+        for entry in test_data
+    ):
+        return test_data
+    return [entry for entry in test_data if entry["host"] in hosts]
+
+
+host_outcomes_key = StashKey[HostOutcomes]()
+
+
+def get_host_outcomes(config: Config) -> Optional[HostOutcomes]:
+    """
+    Return the host outcomes of a pytest session, creating them if necessary.
+
+    :param config: The pytest config of the session
+    :return: The host outcomes or None if there is no cache to keep them in
+    """
+    # the cache is missing if the cacheprovider plugin is disabled
+    cache = getattr(config, "cache", None)
+    if cache is None:
+        return None
+    if host_outcomes_key not in config.stash:
+        config.stash[host_outcomes_key] = HostOutcomes(cache.get(HOST_OUTCOMES_KEY, {}))
+    return config.stash[host_outcomes_key]
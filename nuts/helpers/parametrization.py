@@ -0,0 +1,235 @@
+"""
+Cache of parametrized test data between executions.
+
+Test data which selects hosts by `tags`, `groups` or patterns of their names
+is expanded into one entry per host. The expanded entries are kept in the
+pytest cache, keyed by the test data and the fingerprint of the inventory they
+were expanded with. As long as neither changes, later executions reuse them
+without filtering the inventory.
+
+Expanded test data keeps the other fields of every entry once, along with
+the hosts the entry has been expanded to, in the pytest cache as well as in
+memory. The entries of the single hosts are built as new dicts whenever they
+are accessed, so they can be modified and serialized like the entries of a
+test bundle. Tests are parametrized with a compact `HostEntry` per host
+instead, which is turned into a dict once a test requests it.
+"""
+
+import hashlib
+import json
+import pathlib
+from bisect import bisect_right
+from itertools import accumulate
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+    overload,
+)
+
+from pytest import Config, StashKey
+
+#: Prefix of the keys of expanded test data in the pytest cache
+PARAMETRIZATION_CACHE_KEY = "nuts/parametrization"
+
+#: Version of the expanded test data, part of the key of cached test data
+PARAMETRIZATION_CACHE_FORMAT = 2
+
+inventory_fingerprints_key = StashKey[Dict[str, Optional[str]]]()
+
+
+def _fingerprints(config: Config) -> Dict[str, Optional[str]]:
+    if inventory_fingerprints_key not in config.stash:
+        config.stash[inventory_fingerprints_key] = {}
+    return config.stash[inventory_fingerprints_key]
+
+
+def set_inventory_fingerprint(
+    config: Config, config_file: pathlib.Path, fingerprint: Optional[str]
+) -> None:
+    """
+    Remember the fingerprint of the inventory a nornir configuration
+    has been loaded with in this pytest session.
+
+    :param config: The pytest config of the session
+    :param config_file: The nornir configuration file
+    :param fingerprint: The fingerprint of the loaded inventory, if known
+    """
+    _fingerprints(config)[str(config_file.resolve())] = fingerprint
+
+
+def get_inventory_fingerprint(
+    config: Config, config_file: pathlib.Path
+) -> Optional[str]:
+    """
+    :param config: The pytest config of the session
+    :param config_file: The nornir configuration file
+    :return: The fingerprint of the inventory the configuration has been
+        loaded with or None if it is not known
+    """
+    return _fingerprints(config).get(str(config_file.resolve()))
+
+
+def parametrization_key(test_data: Any, fingerprint: Optional[str]) -> Optional[str]:
+    """
+    :param test_data: The test data of a test bundle
+    :param fingerprint: The fingerprint of the inventory the data is expanded with
+    :return: The key of the expanded test data in the pytest cache or None
+        if the data does not select any hosts or cannot be cached
+    """
+    # filters depends on this module for the expanded test data
+    from nuts.helpers.filters import SELECTOR_KEYS
+
+    if fingerprint is None or not isinstance(test_data, list):
+        return None
+    if not any(
+        isinstance(data, dict)
+        and any(key in data for key in SELECTOR_KEYS if key != "host")
+        for data in test_data
+    ):
+        return None
+    try:
+        data_json = json.dumps(test_data, sort_keys=True)
+    except (TypeError, ValueError):
+        return None
+    # keys which are no strings do not survive the pytest cache
+    if json.loads(data_json) != test_data:
+        return None
+    state = f"{PARAMETRIZATION_CACHE_FORMAT}\n{fingerprint}\n{data_json}"
+    digest = hashlib.sha256(state.encode()).hexdigest()
+    return f"{PARAMETRIZATION_CACHE_KEY}/{digest}"
+
+
+_Expanded = List[Tuple[Dict[str, Any], List[Any]]]
+
+
+class HostEntry(Mapping[str, Any]):
+    """
+    Entry of expanded test data for a single host, which refers to the other
+    fields of the entry it has been expanded from instead of copying them.
+    It is read-only, `dict(entry)` is a modifiable copy.
+
+    :param base: The fields of the entry besides the host, which must not
+        be changed
+    :param host: The name of the host
+    """
+
+    __slots__ = ("_base", "_host")
+
+    def __init__(self, base: Dict[str, Any], host: Any) -> None:
+        self._base = base
+        self._host = host
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "host":
+            return self._host
+        return self._base[key]
+
+    def __contains__(self, key: object) -> bool:
+        return key == "host" or key in self._base
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._base
+        yield "host"
+
+    def __len__(self) -> int:
+        return len(self._base) + 1
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class ExpandedTestData(Sequence[Dict[str, Any]]):
+    """
+    Test data expanded to one entry per host. The other fields of every entry
+    are kept once together with its hosts, the entries of the single hosts
+    are built as new dicts when they are accessed.
+
+    :param expanded: The fields besides the host of every entry of the test
+        data, each with the hosts the entry has been expanded to
+    """
+
+    def __init__(self, expanded: Iterable[Tuple[Dict[str, Any], List[Any]]]) -> None:
+        self.expanded: _Expanded = [(base, hosts) for base, hosts in expanded if hosts]
+        self._ends = list(accumulate(len(hosts) for _, hosts in self.expanded))
+
+    def __len__(self) -> int:
+        return self._ends[-1] if self._ends else 0
+
+    @overload
+    def __getitem__(self, index: int) -> Dict[str, Any]: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Dict[str, Any]]: ...
+
+    def __getitem__(
+        self, index: Union[int, slice]
+    ) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("expanded test data index out of range")
+        position = bisect_right(self._ends, index)
+        base, hosts = self.expanded[position]
+        start = self._ends[position - 1] if position else 0
+        return {**base, "host": hosts[index - start]}
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return (dict(entry) for entry in self.host_entries())
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, ExpandedTestData):
+            return self.expanded == other.expanded
+        if isinstance(other, Sequence) and not isinstance(other, str):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({list(self)!r})"
+
+    def host_entries(self) -> Iterator[HostEntry]:
+        """:return: The compact entries of the single hosts"""
+        for base, hosts in self.expanded:
+            for host in hosts:
+                yield HostEntry(base, host)
+
+    def hosts(self) -> Iterator[Any]:
+        """:return: The host of every entry"""
+        for _, hosts in self.expanded:
+            yield from hosts
+
+    def narrow(self, hosts: Set[str]) -> "ExpandedTestData":
+        """
+        :param hosts: The hosts to keep
+        :return: The expanded test data of the given hosts
+        """
+        return ExpandedTestData(
+            (base, [host for host in entry_hosts if host in hosts])
+            for base, entry_hosts in self.expanded
+        )
+
+
+def load_expanded(cached: Any) -> Optional[_Expanded]:
+    """
+    :param cached: Expanded test data from the pytest cache
+    :return: The expanded test data or None if it is not valid
+    """
+    if not isinstance(cached, list) or not all(
+        isinstance(item, list)
+        and len(item) == 2
+        and isinstance(item[0], dict)
+        and isinstance(item[1], list)
+        for item in cached
+    ):
+        return None
+    return [(base, hosts) for base, hosts in cached]
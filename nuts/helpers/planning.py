@@ -0,0 +1,223 @@
+"""
+Session planning of napalm getters.
+
+Many test bundles run `napalm_get` with a single getter against the same
+devices. Before the tests run, the plan collects the getters of all contexts
+per host. The first context which queries a host then fetches the union of
+all getters planned for it in a single `napalm_get` call, and the results of
+the other getters are kept until the contexts that need them consume them.
+"""
+
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple, TYPE_CHECKING
+
+from pytest import Config, StashKey
+from nornir.core import Nornir
+from nornir.core.task import AggregatedResult, MultiResult, Result, Task
+from nornir_napalm.plugins.connections import CONNECTION_NAME
+from nornir_napalm.plugins.tasks import napalm_get
+
+from nuts.helpers.processors import HostResultCallback, with_host_result_callback
+
+if TYPE_CHECKING:
+    from nuts.context import NornirNutsContext
+
+
+def coalescible_getters(ctx: "NornirNutsContext") -> Optional[List[str]]:
+    """
+    Return the getters of a context if its task can be merged with others.
+    Only plain `napalm_get` calls without further arguments are merged.
+
+    :param ctx: The context to check
+    :return: The getters of the context or None if it cannot be merged
+    """
+    try:
+        if ctx.nuts_task() is not napalm_get:
+            return None
+    except NotImplementedError:
+        return None
+    arguments = ctx.nuts_arguments()
+    if set(arguments) != {"getters"}:
+        return None
+    getters = arguments["getters"]
+    if isinstance(getters, str):
+        return [getters]
+    return list(getters)
+
+
+def _napalm_get_per_host(task: Task, getters_per_host: Dict[str, List[str]]) -> Result:
+    return napalm_get(task, getters=getters_per_host[task.host.name])
+
+
+class GetterPlan:
+    """
+    Merges the napalm getters of all planned contexts per host and hands
+    out every context the slice of the merged result it asked for.
+    """
+
+    def __init__(self) -> None:
+        # host -> getter -> number of contexts which still need the result
+        self._pending: Dict[str, Counter[str]] = {}
+        # (host, getter) -> fetched result
+        self._results: Dict[Tuple[str, str], Tuple[Result, Any]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, ctx: "NornirNutsContext", hosts: List[str]) -> None:
+        """
+        Plan the getters of a context.
+
+        :param ctx: The context whose getters are planned
+        :param hosts: The hosts the context will query
+        """
+        getters = coalescible_getters(ctx)
+        if getters is None:
+            return
+        with self._lock:
+            for host in hosts:
+                self._pending.setdefault(host, Counter()).update(set(getters))
+
+    def covers(self, ctx: "NornirNutsContext") -> bool:
+        """
+        :return: Whether the getters of the context can be served by the plan
+        """
+        return coalescible_getters(ctx) is not None
+
+    def run(
+        self,
+        ctx: "NornirNutsContext",
+        selected_hosts: Nornir,
+        on_host_result: Optional[HostResultCallback] = None,
+    ) -> AggregatedResult:
+        """
+        Run `napalm_get` for a context. Hosts whose getters have already been
+        fetched by another context are served from the plan, all other hosts
+        are queried for the union of their planned getters.
+
+        :param ctx: The context to run napalm_get for
+        :param selected_hosts: The hosts the context queries
+        :param on_host_result: Called for every host as soon as its result
+            is available
+        :return: The result of the getters of the context
+        """
+        getters = coalescible_getters(ctx)
+        assert getters is not None
+        overall_results = AggregatedResult(napalm_get.__name__)
+        to_fetch: Dict[str, List[str]] = {}
+        with self._lock:
+            for host in selected_hosts.inventory.hosts:
+                if all((host, getter) in self._results for getter in getters):
+                    overall_results[host] = self._slice(host, getters)
+                    self._consume(host, getters)
+                else:
+                    extra = [
+                        getter
+                        for getter, count in self._pending.get(host, {}).items()
+                        if count > 0
+                        and getter not in getters
+                        and (host, getter) not in self._results
+                    ]
+                    to_fetch[host] = [*getters, *sorted(extra)]
+        if on_host_result:
+            for host, multi_result in list(overall_results.items()):
+                on_host_result(host, multi_result)
+        if not to_fetch:
+            return overall_results
+
+        retry: Dict[str, List[str]] = {}
+
+        def complete(host: str, multi_result: MultiResult) -> None:
+            if (
+                multi_result.failed
+                and host not in retry
+                and len(to_fetch[host]) > len(getters)
+                and CONNECTION_NAME in selected_hosts.inventory.hosts[host].connections
+            ):
+                # one of the additional getters failed on a reachable device,
+                # query the getters of this context on their own
+                retry[host] = getters
+                return
+            with self._lock:
+                if not multi_result.failed:
+                    for getter, value in multi_result[0].result.items():
+                        self._results[(host, getter)] = (multi_result[0], value)
+                    multi_result = self._slice(host, getters)
+                    self._consume(host, getters)
+                overall_results[host] = multi_result
+            if on_host_result:
+                on_host_result(host, multi_result)
+
+        self._fetch(selected_hosts, to_fetch, complete)
+        if retry:
+            self._fetch(selected_hosts, dict(retry), complete)
+        return overall_results
+
+    def release(self, ctx: "NornirNutsContext", hosts: Iterable[str]) -> None:
+        """
+        Release the getters of a context on hosts it does not query after all,
+        e.g. because they are unreachable or their result is cached.
+
+        :param ctx: The context whose getters are released
+        :param hosts: The hosts the context does not query
+        """
+        getters = coalescible_getters(ctx)
+        if getters is None:
+            return
+        with self._lock:
+            for host in hosts:
+                self._consume(host, getters)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pending.clear()
+            self._results.clear()
+
+    def _fetch(
+        self,
+        selected_hosts: Nornir,
+        getters_per_host: Dict[str, List[str]],
+        complete: HostResultCallback,
+    ) -> None:
+        hosts = selected_hosts.filter(filter_func=lambda h: h.name in getters_per_host)
+        with_host_result_callback(hosts, complete).run(
+            task=_napalm_get_per_host,
+            name=napalm_get.__name__,
+            on_failed=True,
+            getters_per_host=getters_per_host,
+        )
+
+    def _slice(self, host: str, getters: List[str]) -> MultiResult:
+        template = self._results[(host, getters[0])][0]
+        result = Result(
+            host=template.host,
+            result={getter: self._results[(host, getter)][1] for getter in getters},
+            name=napalm_get.__name__,
+        )
+        multi_result = MultiResult(napalm_get.__name__)
+        multi_result.append(result)
+        return multi_result
+
+    def _consume(self, host: str, getters: List[str]) -> None:
+        pending = self._pending.get(host, Counter())
+        for getter in getters:
+            pending[getter] -= 1
+            if pending[getter] <= 0:
+                del pending[getter]
+                self._results.pop((host, getter), None)
+        if not pending:
+            self._pending.pop(host, None)
+
+
+getter_plan_key = StashKey[GetterPlan]()
+
+
+def get_getter_plan(config: Config) -> GetterPlan:
+    """
+    Return the getter plan of a pytest session, creating it if necessary.
+
+    :param config: The pytest config of the session
+    :return: The session-wide getter plan
+    """
+    if getter_plan_key not in config.stash:
+        config.stash[getter_plan_key] = GetterPlan()
+    return config.stash[getter_plan_key]
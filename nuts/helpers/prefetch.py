@@ -0,0 +1,88 @@
+"""
+Background prefetch of the results of upcoming test classes.
+
+While pytest evaluates the tests of one class, the devices are idle. The
+prefetcher uses this time to run the network tasks of the next test classes
+in background threads, so that their results are ready when their tests start.
+"""
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Dict, List, Optional
+
+from pytest import Config, Item, StashKey
+
+from nuts.yamlloader import NutsTestClass
+
+
+class Prefetcher:
+    """
+    Fetches the results of the test classes that follow the current one.
+
+    :param depth: number of upcoming test classes to prefetch
+    :param max_inflight: maximum number of test classes fetched at the same time
+    """
+
+    def __init__(self, depth: int, max_inflight: int = 1) -> None:
+        self.depth = depth
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_inflight, thread_name_prefix="nuts-prefetch"
+        )
+        self._futures: List["Future[Any]"] = []
+        # test classes in the order their tests are run
+        self._classes: List[NutsTestClass] = []
+        self._positions: Dict[NutsTestClass, int] = {}
+
+    def schedule(self, item: Item) -> None:
+        """
+        Prefetch the test classes that are run after the class of an item.
+
+        :param item: The test item that has just been run
+        """
+        nuts_class = item.getparent(NutsTestClass)
+        if nuts_class is None:
+            return
+        if not self._positions:
+            classes = (i.getparent(NutsTestClass) for i in item.session.items)
+            self._classes = [c for c in dict.fromkeys(classes) if c is not None]
+            self._positions = {c: index for index, c in enumerate(self._classes)}
+        position = self._positions.get(nuts_class)
+        if position is None:
+            return
+        upcoming = islice(self._classes, position + 1, position + 1 + self.depth)
+        for next_class in upcoming:
+            try:
+                ctx = next_class.nuts_ctx
+            except Exception:
+                # reported when the tests of the class are run
+                continue
+            future = ctx.extractor.prefetch(self._executor)
+            if future is not None:
+                self._futures.append(future)
+
+    def shutdown(self) -> None:
+        """Cancel pending fetches and wait for running ones to complete."""
+        for future in self._futures:
+            future.cancel()
+        self._futures.clear()
+        self._executor.shutdown(wait=True)
+
+
+prefetcher_key = StashKey[Prefetcher]()
+
+
+def get_prefetcher(config: Config) -> Optional[Prefetcher]:
+    """
+    Return the prefetcher of a pytest session, creating it if necessary.
+
+    :param config: The pytest config of the session
+    :return: The session-wide prefetcher or None if prefetching is disabled
+    """
+    depth = config.getoption("nuts_prefetch")
+    if not depth or depth <= 0:
+        return None
+    if prefetcher_key not in config.stash:
+        config.stash[prefetcher_key] = Prefetcher(
+            depth, max(1, config.getoption("nuts_prefetch_inflight"))
+        )
+    return config.stash[prefetcher_key]
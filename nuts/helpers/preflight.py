@@ -0,0 +1,239 @@
+"""
+TCP reachability pre-flight of the hosts of a session.
+
+Before the first task of the session is run, the management address of every
+planned host is probed with a TCP connect. Probes run concurrently on an
+asyncio event loop, so thousands of hosts are checked within a single short
+timeout. Hosts that do not accept the connection are removed from all runs
+and reported as failed, instead of blocking nornir workers until the
+connection of the driver times out.
+
+A host is probed at the port its connection plugin connects to. The port is
+taken from the connection options of the plugin in the inventory, or else
+from the default of the plugin and platform, e.g. 443 for napalm on EOS.
+Hosts whose port cannot be determined are not probed.
+"""
+
+import asyncio
+import threading
+from typing import TYPE_CHECKING, Dict, Iterable, Optional, Set, Tuple
+
+from pytest import Config, StashKey
+from nornir.core.inventory import Host
+
+if TYPE_CHECKING:
+    from nuts.context import NornirNutsContext
+
+#: Connection plugins used by the tasks of a package, by its top-level module
+TASK_CONNECTIONS = {
+    "nornir_napalm": "napalm",
+    "nornir_netmiko": "netmiko",
+}
+
+#: Default ports of the napalm drivers, by platform
+NAPALM_PORTS = {
+    "eos": 443,
+    "ios": 22,
+    "iosxr": 22,
+    "junos": 830,
+    "nxos": 443,
+    "nxos_ssh": 22,
+}
+
+_Address = Tuple[str, int]
+# a host and the connection plugin it is probed for
+_Target = Tuple[str, Optional[str]]
+
+
+def connection_plugin(ctx: "NornirNutsContext") -> Optional[str]:
+    """
+    :param ctx: The context of a test class
+    :return: The connection plugin the task of the context uses
+        or None if it cannot be determined
+    """
+    try:
+        task = ctx.nuts_task()
+    except Exception:
+        return None
+    module = getattr(task, "__module__", None) or ""
+    return TASK_CONNECTIONS.get(module.split(".")[0])
+
+
+def default_port(connection: str, platform: Optional[str]) -> Optional[int]:
+    """
+    :param connection: The name of a connection plugin
+    :param platform: The platform of the host
+    :return: The port the plugin connects to by default
+        or None if it is not known
+    """
+    if connection == "napalm":
+        return NAPALM_PORTS.get(platform or "")
+    if connection == "netmiko":
+        return 23 if (platform or "").endswith("_telnet") else 22
+    return None
+
+
+def address(host: Host, connection: Optional[str]) -> Optional[_Address]:
+    """
+    :param host: The host to probe
+    :param connection: The connection plugin used to connect to the host
+        or None if it is not known
+    :return: The hostname and port the host is probed at
+        or None if the port cannot be determined
+    """
+    hostname, port = host.hostname, host.port
+    if connection is not None:
+        parameters = host.get_connection_parameters(connection)
+        hostname = parameters.hostname
+        port = parameters.port or default_port(connection, parameters.platform)
+    if port is None:
+        return None
+    return hostname or host.name, port
+
+
+async def _probe(
+    target: _Address, timeout: float, semaphore: asyncio.Semaphore
+) -> Optional[BaseException]:
+    async with semaphore:
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(*target), timeout
+            )
+        except asyncio.TimeoutError:
+            return TimeoutError(
+                f"TCP connection to {target[0]}:{target[1]} "
+                f"timed out after {timeout} seconds"
+            )
+        except OSError as exception:
+            return exception
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return None
+
+
+def probe(
+    targets: Iterable[_Address], timeout: float, concurrency: int
+) -> Dict[_Address, BaseException]:
+    """
+    Try to open a TCP connection to every target.
+
+    :param targets: The hostnames and ports to probe
+    :param timeout: Seconds after which a probe fails
+    :param concurrency: Maximum number of probes at the same time
+    :return: The targets which cannot be connected to, mapped to the failure
+    """
+    unique_targets = list(dict.fromkeys(targets))
+
+    async def probe_all() -> Dict[_Address, BaseException]:
+        semaphore = asyncio.Semaphore(concurrency)
+        failures = await asyncio.gather(
+            *(_probe(target, timeout, semaphore) for target in unique_targets)
+        )
+        return {
+            target: failure
+            for target, failure in zip(unique_targets, failures)
+            if failure is not None
+        }
+
+    if not unique_targets:
+        return {}
+    return asyncio.run(probe_all())
+
+
+class Preflight:
+    """
+    Probes the hosts of a session once per connection plugin. All hosts
+    planned so far are probed together when the first context asks for
+    the results of its hosts.
+
+    :param timeout: Seconds after which a probe fails
+    :param concurrency: Maximum number of probes at the same time
+    """
+
+    def __init__(self, timeout: float, concurrency: int) -> None:
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self._planned: Dict[_Target, Host] = {}
+        self._probed: Set[_Target] = set()
+        self._failures: Dict[_Target, BaseException] = {}
+        self._lock = threading.Lock()
+
+    def add(self, hosts: Iterable[Host], connection: Optional[str] = None) -> None:
+        """
+        Plan hosts which are probed together with the first check.
+
+        :param hosts: The hosts a context will run its task on
+        :param connection: The connection plugin the task uses
+        """
+        with self._lock:
+            for host in hosts:
+                self._planned.setdefault((host.name, connection), host)
+
+    def check(
+        self, hosts: Iterable[Host], connection: Optional[str] = None
+    ) -> Dict[str, BaseException]:
+        """
+        Probe all planned hosts and the given ones, if not done yet.
+
+        :param hosts: The hosts a context is about to run its task on
+        :param connection: The connection plugin the task uses
+        :return: The given hosts which cannot be reached, mapped to the failure
+        """
+        hosts = list(hosts)
+        with self._lock:
+            pending = {
+                target: host
+                for target, host in (
+                    *self._planned.items(),
+                    *(((host.name, connection), host) for host in hosts),
+                )
+                if target not in self._probed
+            }
+            self._planned.clear()
+            if pending:
+                addresses = {
+                    target: address(host, target[1]) for target, host in pending.items()
+                }
+                failures = probe(
+                    (addr for addr in addresses.values() if addr is not None),
+                    self.timeout,
+                    self.concurrency,
+                )
+                for target, addr in addresses.items():
+                    if addr in failures:
+                        self._failures[target] = failures[addr]
+                self._probed.update(pending)
+            return {
+                host.name: self._failures[(host.name, connection)]
+                for host in hosts
+                if (host.name, connection) in self._failures
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._planned.clear()
+            self._probed.clear()
+            self._failures.clear()
+
+
+preflight_key = StashKey[Preflight]()
+
+
+def get_preflight(config: Config) -> Optional[Preflight]:
+    """
+    Return the pre-flight of a pytest session, creating it if necessary.
+
+    :param config: The pytest config of the session
+    :return: The session-wide pre-flight or None if it is disabled
+    """
+    if not config.getoption("nuts_preflight"):
+        return None
+    if preflight_key not in config.stash:
+        config.stash[preflight_key] = Preflight(
+            config.getoption("nuts_preflight_timeout"),
+            max(1, config.getoption("nuts_preflight_concurrency")),
+        )
+    return config.stash[preflight_key]
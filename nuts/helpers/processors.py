@@ -0,0 +1,62 @@
+"""
+Nornir processors used by nuts.
+"""
+
+from typing import Callable, Optional
+
+from nornir.core import Nornir
+from nornir.core.inventory import Host
+from nornir.core.task import AggregatedResult, MultiResult, Task
+
+HostResultCallback = Callable[[str, MultiResult], None]
+
+
+class HostResultProcessor:
+    """
+    Nornir processor that reports the result of every host
+    as soon as the host has completed its task.
+
+    :param callback: called with the host name and its result
+    """
+
+    def __init__(self, callback: HostResultCallback) -> None:
+        self.callback = callback
+
+    def task_started(self, task: Task) -> None:
+        pass
+
+    def task_completed(self, task: Task, result: AggregatedResult) -> None:
+        pass
+
+    def task_instance_started(self, task: Task, host: Host) -> None:
+        pass
+
+    def task_instance_completed(
+        self, task: Task, host: Host, result: MultiResult
+    ) -> None:
+        self.callback(host.name, result)
+
+    def subtask_instance_started(self, task: Task, host: Host) -> None:
+        pass
+
+    def subtask_instance_completed(
+        self, task: Task, host: Host, result: MultiResult
+    ) -> None:
+        pass
+
+
+def with_host_result_callback(
+    nornir: Nornir, callback: Optional[HostResultCallback]
+) -> Nornir:
+    """
+    Attach a callback to a nornir instance that is called for
+    every host as soon as its task has been completed.
+
+    :param nornir: The nornir instance the task will be run with
+    :param callback: called with the host name and its result
+    :return: A copy of the nornir instance which reports its results
+        or the instance itself if there is no callback
+    """
+    if callback is None:
+        return nornir
+    return nornir.with_processors([*nornir.processors, HostResultProcessor(callback)])
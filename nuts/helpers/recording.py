@@ -0,0 +1,234 @@
+"""
+Record and replay the raw results of nornir tasks.
+
+With ``--nuts-record DIR``, the result of every host is written to a JSON file
+in DIR. With ``--nuts-replay DIR``, the results are read from these files
+instead of running the task, so that no device is connected to. A recording
+is identified by the test class, the host, the task and its arguments.
+A task which is a method of its context may read the test data of the context
+besides its arguments, e.g. the destinations to ping, so the recordings of
+such tasks are identified by the entries of the host in the test data, too.
+"""
+
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
+from typing import Any, Dict, Iterable, Mapping, Optional, TYPE_CHECKING, Union
+
+from pytest import Config, StashKey
+from nornir.core.inventory import Host
+from nornir.core.task import AggregatedResult, MultiResult, Result
+
+from nuts.helpers.errors import NutsRecordedError, NutsSetupError, NutsUsageError
+from nuts.helpers.filters import is_expanded
+
+if TYPE_CHECKING:
+    from nuts.context import NornirNutsContext
+
+#: Attributes of a nornir Result which are recorded besides the exception
+RECORDED_ATTRIBUTES = ("name", "result", "failed", "changed", "diff", "destination")
+
+
+def qualified_name(obj: Any) -> str:
+    """
+    :param obj: A class or function
+    :return: The name of the object including its module
+    """
+    return f"{getattr(obj, '__module__', '')}.{getattr(obj, '__qualname__', obj)}"
+
+
+def task_test_data(ctx: "NornirNutsContext", host: str) -> Optional[str]:
+    """
+    :param ctx: The context which runs the task
+    :param host: The name of the host
+    :return: The entries of test_data the task may read on the host besides its
+        arguments, serialized, or None if the task is no method of the context
+    """
+    if getattr(ctx.nuts_task(), "__self__", None) is not ctx:
+        return None
+    test_data = ctx.nuts_parameters.get("test_data")
+    if is_expanded(test_data):
+        test_data = [
+            entry
+            for entry in test_data
+            if isinstance(entry, Mapping) and entry["host"] == host
+        ]
+    return json.dumps(test_data, sort_keys=True, default=repr)
+
+
+def recording_id(ctx: "NornirNutsContext", host: str) -> Dict[str, str]:
+    """
+    :param ctx: The context which runs the task
+    :param host: The name of the host
+    :return: The fields which identify the recording of a host
+    """
+    identity = {
+        "test_class": qualified_name(type(ctx)),
+        "host": host,
+        "task": qualified_name(ctx.nuts_task()),
+        "arguments": json.dumps(ctx.nuts_arguments(), sort_keys=True, default=repr),
+    }
+    test_data = task_test_data(ctx, host)
+    if test_data is not None:
+        identity["test_data"] = test_data
+    return identity
+
+
+def recording_hash(identity: Dict[str, str]) -> str:
+    """
+    :param identity: The fields which identify a recording
+    :return: A file name safe key of the recording
+    """
+    identity_json = json.dumps(identity, sort_keys=True)
+    return hashlib.sha256(identity_json.encode()).hexdigest()
+
+
+def dump_result(result: Result) -> Dict[str, Any]:
+    """
+    :param result: A single nornir result
+    :return: The JSON serializable fields of the result
+    """
+    fields = {
+        attribute: getattr(result, attribute)
+        for attribute in RECORDED_ATTRIBUTES
+        if hasattr(result, attribute)
+    }
+    exception = result.exception
+    fields["exception"] = (
+        None
+        if exception is None
+        else {"type": type(exception).__name__, "message": str(exception)}
+    )
+    return fields
+
+
+def load_result(host: Host, fields: Dict[str, Any]) -> Result:
+    """
+    :param host: The host the result belongs to
+    :param fields: The recorded fields of the result
+    :return: The nornir result with a `NutsRecordedError` instead of
+        the original exception
+    """
+    fields = dict(fields)
+    exception = fields.pop("exception", None)
+    return Result(
+        host=host,
+        exception=(
+            NutsRecordedError(exception["type"], exception["message"])
+            if exception
+            else None
+        ),
+        **fields,
+    )
+
+
+def write_atomically(path: pathlib.Path, content: Union[str, bytes]) -> None:
+    """
+    Write a file so that readers in other threads or processes
+    never see it partially written.
+
+    :param path: The file to write
+    :param content: The content of the file, written in binary mode if bytes
+    """
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb" if isinstance(content, bytes) else "w") as file:
+            file.write(content)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class Recording:
+    """
+    Directory of recorded task results.
+
+    :param directory: The directory which holds the recordings
+    :param replay: Whether results are replayed instead of recorded
+    """
+
+    def __init__(self, directory: pathlib.Path, replay: bool) -> None:
+        self.directory = directory
+        self.replay = replay
+
+    def path(self, identity: Dict[str, str]) -> pathlib.Path:
+        return self.directory / f"{recording_hash(identity)}.json"
+
+    def record(self, ctx: "NornirNutsContext", results: AggregatedResult) -> None:
+        """
+        Write the result of every host to the recording directory.
+
+        :param ctx: The context which has run the task
+        :param results: The results of the task
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for host, multi_result in results.items():
+            identity = recording_id(ctx, host)
+            content = json.dumps(
+                {**identity, "results": [dump_result(r) for r in multi_result]},
+                indent=2,
+                default=str,
+            )
+            write_atomically(self.path(identity), content)
+
+    def load(self, ctx: "NornirNutsContext", hosts: Iterable[Host]) -> AggregatedResult:
+        """
+        Read the recorded results of the given hosts.
+
+        :param ctx: The context whose task has been recorded
+        :param hosts: The hosts whose results are replayed
+        :return: The replayed results. Hosts without a recording fail.
+        """
+        name = getattr(ctx.nuts_task(), "__name__", "")
+        results = AggregatedResult(name)
+        for host in hosts:
+            multi_result = MultiResult(name)
+            path = self.path(recording_id(ctx, host.name))
+            try:
+                recorded = json.loads(path.read_text())
+            except FileNotFoundError:
+                exception = NutsSetupError(
+                    f"No result of host {host.name} has been recorded "
+                    f"in {self.directory} for {type(ctx).__name__}."
+                )
+                multi_result.append(
+                    Result(
+                        host=host,
+                        result=str(exception),
+                        failed=True,
+                        exception=exception,
+                        name=name,
+                    )
+                )
+            else:
+                multi_result.extend(load_result(host, r) for r in recorded["results"])
+            results[host.name] = multi_result
+        return results
+
+
+recording_key = StashKey[Recording]()
+
+
+def get_recording(config: Config) -> Optional[Recording]:
+    """
+    Return the recording of a pytest session, creating it if necessary.
+
+    :param config: The pytest config of the session
+    :raises NutsUsageError: if results should be recorded and replayed at once
+    :return: The session-wide recording or None if results are
+        neither recorded nor replayed
+    """
+    record = config.getoption("nuts_record")
+    replay = config.getoption("nuts_replay")
+    if not record and not replay:
+        return None
+    if record and replay:
+        raise NutsUsageError("--nuts-record and --nuts-replay cannot be combined.")
+    if recording_key not in config.stash:
+        config.stash[recording_key] = Recording(
+            pathlib.Path(replay or record), bool(replay)
+        )
+    return config.stash[recording_key]
@@ -0,0 +1,109 @@
+"""
+Session-wide registry of loaded nornir instances.
+
+Loading nornir (parsing the configuration, running the inventory plugin,
+setting up the runner) is expensive. The registry makes sure this happens
+only once per pytest session for every configuration and hands out cheap
+views of the shared instance to the contexts.
+"""
+
+import json
+import pathlib
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from pytest import Config, StashKey
+from nornir.core import Nornir
+from nornir.core.state import GlobalState
+
+_RegistryKey = Tuple[str, str]
+
+
+class NornirRegistry:
+    """
+    Holds one loaded nornir instance per configuration file and inventory options.
+    """
+
+    def __init__(self) -> None:
+        self._instances: Dict[_RegistryKey, Nornir] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(
+        config_file: str, inventory: Optional[Dict[str, Any]] = None
+    ) -> _RegistryKey:
+        """
+        Build the registry key of a nornir configuration.
+
+        :param config_file: path to the nornir configuration file
+        :param inventory: inventory options which override those of the config file
+        :return: The key under which the nornir instance is registered
+        """
+        path = str(pathlib.Path(config_file).resolve())
+        return path, json.dumps(inventory, sort_keys=True, default=str)
+
+    def get(
+        self,
+        config_file: str,
+        loader: Callable[[], Nornir],
+        inventory: Optional[Dict[str, Any]] = None,
+    ) -> Nornir:
+        """
+        Return the shared nornir instance of a configuration. The loader is only
+        called if no instance has been registered for the configuration yet.
+
+        :param config_file: path to the nornir configuration file
+        :param loader: callable that initializes a new nornir instance
+        :param inventory: inventory options which override those of the config file
+        :return: The shared nornir instance
+        """
+        key = self.key(config_file, inventory)
+        with self._lock:
+            if key not in self._instances:
+                self._instances[key] = loader()
+            return self._instances[key]
+
+    def view(
+        self,
+        config_file: str,
+        loader: Callable[[], Nornir],
+        inventory: Optional[Dict[str, Any]] = None,
+    ) -> Nornir:
+        """
+        Return a view of the shared nornir instance of a configuration.
+
+        The view shares inventory, configuration and runner with the shared
+        instance but has its own global state, so hosts that failed in one
+        context are not skipped in another one.
+        """
+        nornir = self.get(config_file, loader, inventory)
+        return Nornir(
+            inventory=nornir.inventory,
+            config=nornir.config,
+            data=GlobalState(dry_run=nornir.data.dry_run),
+            processors=nornir.processors,
+            runner=nornir._runner,
+        )
+
+    def instances(self) -> Tuple[Nornir, ...]:
+        with self._lock:
+            return tuple(self._instances.values())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._instances.clear()
+
+
+nornir_registry_key = StashKey[NornirRegistry]()
+
+
+def get_nornir_registry(config: Config) -> NornirRegistry:
+    """
+    Return the nornir registry of a pytest session, creating it if necessary.
+
+    :param config: The pytest config of the session
+    :return: The session-wide nornir registry
+    """
+    if nornir_registry_key not in config.stash:
+        config.stash[nornir_registry_key] = NornirRegistry()
+    return config.stash[nornir_registry_key]
@@ -1,13 +1,26 @@
 """Results of a network query."""
 
+import threading
 import traceback
-from typing import Any, Optional, TYPE_CHECKING, Dict
+from concurrent.futures import Executor, Future
+from typing import (
+    Any,
+    Callable,
+    Iterator,
+    Mapping,
+    Optional,
+    TYPE_CHECKING,
+    Dict,
+    cast,
+)
 
 from nornir.core.task import MultiResult, AggregatedResult
+from nuts.helpers.breaker import get_circuit_breaker, is_connection_failure
 from nuts.helpers.errors import NutsNornirError, NutsUnvalidatedResultError
 
 if TYPE_CHECKING:
-    from nuts.context import NutsContext
+    from nuts.context import NutsContext, NornirNutsContext
+    from nuts.helpers.processors import HostResultCallback
 
 
 _TransformedResult = Dict[str, Any]
@@ -61,6 +74,100 @@ class NutsResult:
         return self._result
 
 
+class _FailedDestinations(Dict[str, NutsResult]):
+    """
+    Destinations of a host whose task has failed before any destination
+    could be queried. Every destination maps to the failure of the host.
+    """
+
+    def __init__(self, failure: NutsResult) -> None:
+        super().__init__()
+        self.failure = failure
+
+    def __contains__(self, destination: object) -> bool:
+        return True
+
+    def __missing__(self, destination: str) -> NutsResult:
+        return self.failure
+
+
+class StreamedResult(Mapping[str, Any]):
+    """
+    Transformed result which is filled host by host while the network
+    task is running. The task is run by `run`, either in a thread of its own
+    started with `start` or in a thread of the caller.
+
+    Accessing the result of a host only waits until that host has completed,
+    iterating over the result waits until all hosts have completed.
+    If the task raises an exception, the exception is re-raised on access.
+
+    :param general_result: Runs the network task and calls the given callback
+        for every host as soon as its result is available
+    :param transform_result: Transforms the raw result of a single host
+    """
+
+    def __init__(
+        self,
+        general_result: Callable[["HostResultCallback"], AggregatedResult],
+        transform_result: Callable[[AggregatedResult], _TransformedResult],
+    ) -> None:
+        self._general_result = general_result
+        self._transform_result = transform_result
+        self._results: _TransformedResult = {}
+        self._completed = False
+        self._exception: Optional[BaseException] = None
+        self._condition = threading.Condition()
+
+    def __getitem__(self, host: str) -> Any:
+        self._wait(lambda: host in self._results)
+        return self._results[host]
+
+    def __contains__(self, host: object) -> bool:
+        self._wait(lambda: host in self._results)
+        return host in self._results
+
+    def __iter__(self) -> Iterator[str]:
+        self._wait(lambda: False)
+        return iter(self._results)
+
+    def __len__(self) -> int:
+        self._wait(lambda: False)
+        return len(self._results)
+
+    def _wait(self, available: Callable[[], bool]) -> None:
+        with self._condition:
+            self._condition.wait_for(lambda: available() or self._completed)
+            if not available() and self._exception is not None:
+                raise self._exception
+
+    def start(self) -> None:
+        """Run the network task in a background thread."""
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def run(self) -> None:
+        """Run the network task and collect the results of all hosts."""
+        try:
+            general_result = self._general_result(self._add)
+            # hosts whose results have not been reported while the task was running
+            for host, multi_result in general_result.items():
+                if host not in self._results:
+                    self._add(host, multi_result)
+        except BaseException as exception:
+            self._exception = exception
+        finally:
+            with self._condition:
+                self._completed = True
+                self._condition.notify_all()
+
+    def _add(self, host: str, multi_result: MultiResult) -> None:
+        host_result = AggregatedResult(multi_result.name or "")
+        host_result[host] = multi_result
+        transformed = self._transform_result(host_result)
+        with self._condition:
+            self._results.update(transformed)
+            self._condition.notify_all()
+
+
 class AbstractResultExtractor:
     """Processes the general result that contains the raw overall results
     from the network query (mostly a nornir task)
@@ -76,7 +183,8 @@ class AbstractResultExtractor:
     """
 
     def __init__(self, context: "NutsContext") -> None:
-        self._cached_result: Optional[_TransformedResult] = None
+        self._cached_result: Optional[Mapping[str, Any]] = None
+        self._prefetched: "Optional[Future[Any]]" = None
         self._nuts_ctx = context
 
     def single_transform(self, result: Any) -> Any:
@@ -151,6 +259,9 @@ class AbstractResultExtractor:
         :param task_results: The results of the nornir task per host
         :return: The destination mapped to the desired information
         """
+        if len(task_results) == 1 and task_results.failed:
+            # e.g. the host could not be connected to
+            return _FailedDestinations(self.nuts_result_wrapper(task_results[0]))
         return {
             single_result.destination: self.nuts_result_wrapper(  # type: ignore[attr-defined]  # noqa: E501
                 single_result
@@ -167,6 +278,7 @@ class AbstractResultExtractor:
                  information if the network query has failed or thrown an exception.
         """
         if nornir_result.failed:
+            self._trip_circuit(nornir_result)
             return NutsResult(failed=True, exception=nornir_result.exception)
         try:
             return NutsResult(self.single_transform(nornir_result))
@@ -174,6 +286,19 @@ class AbstractResultExtractor:
             tb = traceback.format_exc()
             return NutsResult(failed=True, exception=exception, result=tb)
 
+    def _trip_circuit(self, nornir_result: Any) -> None:
+        """
+        Open the circuit of a host if the nornir_result shows
+        that the host cannot be connected to.
+        """
+        config = self._nuts_ctx.pytestconfig
+        breaker = get_circuit_breaker(config) if config else None
+        host = getattr(nornir_result, "host", None)
+        if breaker is None or host is None:
+            return
+        if is_connection_failure(nornir_result.exception):
+            breaker.trip(host.name, nornir_result.exception)
+
     def transform_result(self, general_result: Any) -> _TransformedResult:
         """
         In most cases:
@@ -188,16 +313,61 @@ class AbstractResultExtractor:
     @property
     def transformed_result(
         self,
-    ) -> _TransformedResult:
+    ) -> Mapping[str, Any]:
         """
         The (processed) results of the network task, ready to be passed on to a test's
         fixture. The results are cached, so that general_result does not need
         to be called multiple times as it might access the network.
+
+        If the context streams its results, the network task is run in the
+        background and the results of single hosts are available as soon as
+        these hosts have completed.
         """
+        if self._prefetched is not None:
+            prefetched, self._prefetched = self._prefetched, None
+            if prefetched.cancel():
+                # the prefetch has not started yet, do not wait for a free slot
+                if isinstance(self._cached_result, StreamedResult):
+                    self._cached_result.start()
+            elif self._cached_result is None:
+                self._cached_result = prefetched.result()
         if self._cached_result is None:
-            self._cached_result = self.transform_result(self._nuts_ctx.general_result())
+            if self._nuts_ctx.stream_results:
+                streamed = self._streamed_result()
+                streamed.start()
+                self._cached_result = streamed
+            else:
+                self._cached_result = self.transform_result(
+                    self._nuts_ctx.general_result()
+                )
         return self._cached_result
 
+    def prefetch(self, executor: Executor) -> "Optional[Future[Any]]":
+        """
+        Start fetching the results of the network task on an executor
+        before they are accessed. Does nothing if the results have already
+        been fetched or are being fetched.
+
+        :param executor: The executor which runs the network task
+        :return: The future of the prefetch or None if nothing is fetched
+        """
+        if self._cached_result is not None or self._prefetched is not None:
+            return None
+        if self._nuts_ctx.stream_results:
+            streamed = self._streamed_result()
+            self._cached_result = streamed
+            self._prefetched = executor.submit(streamed.run)
+        else:
+            self._prefetched = executor.submit(
+                lambda: self.transform_result(self._nuts_ctx.general_result())
+            )
+        return self._prefetched
+
+    def _streamed_result(self) -> StreamedResult:
+        # only nornir contexts stream their results
+        nornir_ctx = cast("NornirNutsContext", self._nuts_ctx)
+        return StreamedResult(nornir_ctx.general_result, self.transform_result)
+
     def single_result(self, nuts_test_entry: Dict[str, Any]) -> NutsResult:
         """The single result that belongs to one host.
         Must be overwritten in the case a host-destination pair is tested
@@ -0,0 +1,218 @@
+"""
+Persistent cache of task results across consecutive pytest runs.
+
+A test bundle opts in with a time to live in seconds, either for its task or,
+for `napalm_get`, per getter::
+
+    test_execution:
+      cache_ttl: 300
+
+    test_execution:
+      cache_ttl:
+        users: 3600
+        bgp_neighbors: 30
+
+Successful results are kept per host, task and arguments, and for tasks which
+are methods of their context, per entries of the host in the test data as well,
+see `nuts.helpers.recording.task_test_data`. A cached result is
+used as long as it is younger than the time to live of the bundle which
+reads it. The least recently used results are evicted once the cache
+exceeds its size.
+"""
+
+import json
+import pathlib
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, TYPE_CHECKING
+
+from pytest import Config, StashKey
+from nornir.core.inventory import Host
+from nornir.core.task import AggregatedResult, MultiResult
+
+from nuts.helpers.errors import NutsSetupError
+from nuts.helpers.memo import normalize_arguments
+from nuts.helpers.recording import (
+    dump_result,
+    load_result,
+    qualified_name,
+    recording_hash,
+    task_test_data,
+    write_atomically,
+)
+
+if TYPE_CHECKING:
+    from nuts.context import NornirNutsContext
+
+#: Key in `test_execution` which holds the time to live of cached results
+CACHE_TTL_KEY = "cache_ttl"
+
+
+def _seconds(value: Any) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise NutsSetupError(
+            f"{CACHE_TTL_KEY} must be a number of seconds or map getters "
+            f"to a number of seconds: {value}"
+        )
+    return float(value)
+
+
+def cache_ttl(ctx: "NornirNutsContext") -> Optional[float]:
+    """
+    Determine how long the results of a context may be served from the cache.
+    If the time to live is given per getter, the shortest time to live of the
+    getters of the context is used.
+
+    :param ctx: The context whose results are cached
+    :raises NutsSetupError: if the time to live is invalid
+    :return: The time to live in seconds or None if results are not cached
+    """
+    setting = ctx.execution_settings().get(CACHE_TTL_KEY)
+    if setting is None:
+        return None
+    if not isinstance(setting, dict):
+        ttl = _seconds(setting)
+    else:
+        getters = ctx.nuts_arguments().get("getters")
+        if not getters:
+            raise NutsSetupError(
+                f"{CACHE_TTL_KEY} per getter requires a task with getters."
+            )
+        if isinstance(getters, str):
+            getters = [getters]
+        if not all(getter in setting for getter in getters):
+            return None
+        ttl = min(_seconds(setting[getter]) for getter in getters)
+    return ttl if ttl > 0 else None
+
+
+class ResultCache:
+    """
+    Directory of cached task results.
+
+    :param directory: The directory which holds the cached results
+    :param max_size: Maximum size of all cached results in bytes
+    :param bypass: Whether cached results are ignored. Fresh results
+        are cached nonetheless.
+    """
+
+    def __init__(
+        self, directory: pathlib.Path, max_size: int, bypass: bool = False
+    ) -> None:
+        self.directory = directory
+        self.max_size = max_size
+        self.bypass = bypass
+        self._lock = threading.Lock()
+
+    def _path(self, ctx: "NornirNutsContext", host: str) -> Optional[pathlib.Path]:
+        arguments = normalize_arguments(ctx.nuts_arguments())
+        if arguments is None:
+            return None
+        identity = {
+            "host": host,
+            "task": qualified_name(ctx.nuts_task()),
+            "arguments": arguments,
+        }
+        test_data = task_test_data(ctx, host)
+        if test_data is not None:
+            identity["test_data"] = test_data
+        return self.directory / f"{recording_hash(identity)}.json"
+
+    def load(
+        self, ctx: "NornirNutsContext", hosts: Iterable[Host]
+    ) -> Dict[str, MultiResult]:
+        """
+        :param ctx: The context which is about to run its task
+        :param hosts: The hosts the context runs its task on
+        :return: The hosts with a cached result, mapped to the result
+        """
+        ttl = cache_ttl(ctx)
+        if ttl is None or self.bypass:
+            return {}
+        now = time.time()
+        cached = {}
+        for host in hosts:
+            path = self._path(ctx, host.name)
+            if path is None:
+                return {}
+            try:
+                entry = json.loads(path.read_text())
+                if now - entry["stored"] > ttl:
+                    continue
+                path.touch()
+            except (OSError, ValueError, KeyError):
+                continue
+            multi_result = MultiResult(entry["name"])
+            multi_result.extend(load_result(host, r) for r in entry["results"])
+            cached[host.name] = multi_result
+        return cached
+
+    def store(self, ctx: "NornirNutsContext", results: AggregatedResult) -> None:
+        """
+        Cache the successful results of a context.
+
+        :param ctx: The context which has run its task
+        :param results: The results of the task
+        """
+        if cache_ttl(ctx) is None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stored = time.time()
+        for host, multi_result in results.items():
+            path = self._path(ctx, host)
+            if path is None:
+                return
+            if multi_result.failed:
+                continue
+            entry = {
+                "stored": stored,
+                "name": multi_result.name,
+                "results": [dump_result(r) for r in multi_result],
+            }
+            write_atomically(path, json.dumps(entry, default=str))
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove the least recently used results until the cache fits its size."""
+        with self._lock:
+            entries = []
+            for path in self.directory.glob("*.json"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            size = sum(entry[1] for entry in entries)
+            for _, entry_size, path in sorted(entries):
+                if size <= self.max_size:
+                    break
+                path.unlink(missing_ok=True)
+                size -= entry_size
+
+
+result_cache_key = StashKey[ResultCache]()
+
+
+def get_result_cache(config: Config) -> Optional[ResultCache]:
+    """
+    Return the result cache of a pytest session, creating it if necessary.
+
+    :param config: The pytest config of the session
+    :return: The result cache or None if there is no directory to keep it in
+    """
+    if result_cache_key not in config.stash:
+        directory = config.getoption("nuts_cache_dir")
+        # the cache is missing if the cacheprovider plugin is disabled
+        cache = getattr(config, "cache", None)
+        if directory:
+            path = pathlib.Path(directory)
+        elif cache is not None:
+            path = cache.mkdir("nuts-results")
+        else:
+            return None
+        config.stash[result_cache_key] = ResultCache(
+            path,
+            int(config.getoption("nuts_cache_max_size") * 1024 * 1024),
+            config.getoption("nuts_cache_bypass"),
+        )
+    return config.stash[result_cache_key]
@@ -0,0 +1,301 @@
+"""
+Runners which control how many hosts a task is run on at the same time.
+
+A test bundle can choose its own nornir runner in `test_execution`, e.g. to
+query cheap getters on many hosts at once or to throttle expensive commands::
+
+    test_execution:
+      runner:
+        plugin: threaded
+        options:
+          num_workers: 5
+
+A deadline bounds how long the task of a single host may run. Hosts which
+are still running at the deadline are abandoned and fail. Time a host waits
+for the concurrency limits below does not count towards its deadline::
+
+    test_execution:
+      deadline: 120
+
+Independently of the runner, the inventory can limit how many hosts of a
+group or with a tag are queried at the same time by all test bundles of a
+session, which protects fragile devices::
+
+    # defaults.yaml
+    data:
+      nuts_max_concurrency:
+        groups:
+          core: 2
+        tags:
+          slow_cpu: 1
+"""
+
+import threading
+from contextlib import ExitStack
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pytest import Config, StashKey
+from nornir.core import Nornir
+from nornir.core.exceptions import PluginNotRegistered
+from nornir.core.inventory import Host
+from nornir.core.plugins.runners import RunnerPlugin, RunnersPluginRegister
+from nornir.core.processor import Processors
+from nornir.core.task import AggregatedResult, MultiResult, Result, Task
+
+from nuts.helpers.connections import close_connections
+from nuts.helpers.errors import NutsDeadlineError, NutsSetupError
+
+#: Key in the data of the inventory defaults which holds the concurrency limits
+MAX_CONCURRENCY_KEY = "nuts_max_concurrency"
+
+_Limits = Dict[str, Dict[str, int]]
+_SemaphoreKey = Tuple[str, str]
+
+
+def build_runner(nornir: Nornir, settings: Any) -> RunnerPlugin:
+    """
+    Create the runner a test bundle asks for.
+    If no plugin is given, the runner of the nornir configuration is used
+    with the given options.
+
+    :param nornir: The nornir instance the runner is used for
+    :param settings: The `runner` settings of `test_execution`
+    :raises NutsSetupError: if the runner cannot be created
+    :return: The configured runner
+    """
+    if not isinstance(settings, dict):
+        raise NutsSetupError(
+            "The runner in test_execution must be a mapping "
+            "with the keys `plugin` and `options`."
+        )
+    options = settings.get("options") or {}
+    if "plugin" in settings:
+        plugin = settings["plugin"]
+    else:
+        plugin = nornir.config.runner.plugin
+        options = {**nornir.config.runner.options, **options}
+    try:
+        return RunnersPluginRegister.get_plugin(plugin)(**options)
+    except PluginNotRegistered:
+        raise NutsSetupError(f"Runner plugin {plugin} is not registered.")
+    except TypeError as exception:
+        raise NutsSetupError(
+            f"Runner plugin {plugin} does not accept the options {options}: "
+            f"{exception}"
+        )
+
+
+class _LimitedTask:
+    """Task which waits for a free slot of its host before it is started."""
+
+    def __init__(
+        self, task: Task, semaphores: Callable[[Host], List[threading.Semaphore]]
+    ) -> None:
+        self._task = task
+        self._semaphores = semaphores
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._task, name)
+
+    def copy(self) -> "_LimitedTask":
+        return _LimitedTask(self._task.copy(), self._semaphores)
+
+    def start(self, host: Host) -> MultiResult:
+        with ExitStack() as stack:
+            for semaphore in self._semaphores(host):
+                stack.enter_context(semaphore)
+            return self._task.start(host)
+
+
+class _DeadlineTask:
+    """
+    Task which is abandoned if it has not completed within the deadline.
+
+    The task runs in a thread of its own, so that the worker of the runner
+    is released at the deadline even if the task hangs. Processors are
+    informed by this wrapper only, hence the result of an abandoned task
+    is never reported.
+    """
+
+    def __init__(self, task: Task, deadline: float) -> None:
+        self._task = task
+        self._deadline = deadline
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._task, name)
+
+    def copy(self) -> "_DeadlineTask":
+        return _DeadlineTask(self._task.copy(), self._deadline)
+
+    def start(self, host: Host) -> MultiResult:
+        task = self._task
+        silent_task = task.copy()
+        # wrappers only forward reads, so the processors are replaced
+        # on the nornir task which informs them
+        inner_task: Any = silent_task
+        while isinstance(inner_task, (_LimitedTask, _DeadlineTask)):
+            inner_task = inner_task._task
+        inner_task.processors = Processors()
+        results: List[MultiResult] = []
+        worker = threading.Thread(
+            target=lambda: results.append(silent_task.start(host)), daemon=True
+        )
+        task.processors.task_instance_started(task, host)
+        worker.start()
+        worker.join(self._deadline)
+        if results:
+            multi_result = results[0]
+        else:
+            # drop the connections, this may also unblock the abandoned task
+            threading.Thread(
+                target=close_connections, args=([host],), daemon=True
+            ).start()
+            exception = NutsDeadlineError(
+                f"Task {task.name} on host {host.name} has not completed "
+                f"within {self._deadline} seconds."
+            )
+            multi_result = MultiResult(task.name)
+            multi_result.append(
+                Result(
+                    host=host,
+                    result=str(exception),
+                    failed=True,
+                    exception=exception,
+                    name=task.name,
+                )
+            )
+        task.processors.task_instance_completed(task, host, multi_result)
+        return multi_result
+
+
+class DeadlineRunner:
+    """
+    Wraps a runner so that every host is abandoned if its task
+    has not completed within the deadline.
+
+    :param runner: The runner which runs the task
+    :param deadline: Seconds a host may run its task
+    """
+
+    def __init__(self, runner: RunnerPlugin, deadline: float) -> None:
+        self.runner = runner
+        self.deadline = deadline
+
+    def run(self, task: Task, hosts: List[Host]) -> AggregatedResult:
+        deadline_task: Any = _DeadlineTask(task, self.deadline)
+        return self.runner.run(deadline_task, hosts)
+
+
+def deadline(value: Any) -> Optional[float]:
+    """
+    :param value: The configured deadline in seconds
+    :raises NutsSetupError: if the deadline is not a number
+    :return: The deadline or None if hosts may run without a deadline
+    """
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise NutsSetupError(f"The deadline must be a number of seconds: {value}")
+    return float(value) if value > 0 else None
+
+
+class ConcurrencyLimits:
+    """
+    Session-wide semaphores which limit how many hosts of a group
+    or with a tag run a task at the same time.
+    """
+
+    def __init__(self) -> None:
+        self._semaphores: Dict[_SemaphoreKey, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def semaphores(self, host: Host, limits: _Limits) -> List[threading.Semaphore]:
+        """
+        :param host: The host which is about to run a task
+        :param limits: Maximum number of concurrent hosts per group and tag
+        :return: The semaphores the host must acquire, always in the same order
+        """
+        tags = host.get("tags") or []
+        names = {
+            "groups": [group.name for group in host.extended_groups()],
+            "tags": [tags] if isinstance(tags, str) else list(tags),
+        }
+        keys = sorted(
+            (kind, name)
+            for kind, values in names.items()
+            for name in set(values)
+            if name in (limits.get(kind) or {})
+        )
+        with self._lock:
+            return [
+                self._semaphores.setdefault(
+                    key, threading.BoundedSemaphore(limits[key[0]][key[1]])
+                )
+                for key in keys
+            ]
+
+    def runner(self, runner: RunnerPlugin, limits: _Limits) -> RunnerPlugin:
+        """
+        :param runner: The runner which runs the task
+        :param limits: Maximum number of concurrent hosts per group and tag
+        :return: A runner which respects the limits
+        """
+        return ConcurrencyLimitedRunner(
+            runner, lambda host: self.semaphores(host, limits)
+        )
+
+
+class ConcurrencyLimitedRunner:
+    """
+    Wraps a runner so that a host only starts its task once it has acquired
+    the semaphores of all its limited groups and tags.
+
+    :param runner: The runner which runs the task
+    :param semaphores: Returns the semaphores a host must acquire
+    """
+
+    def __init__(
+        self,
+        runner: RunnerPlugin,
+        semaphores: Callable[[Host], List[threading.Semaphore]],
+    ) -> None:
+        self.runner = runner
+        self.semaphores = semaphores
+
+    def run(self, task: Task, hosts: List[Host]) -> AggregatedResult:
+        limited_task: Any = _LimitedTask(task, self.semaphores)
+        return self.runner.run(limited_task, hosts)
+
+
+def concurrency_limits(nornir: Nornir) -> Optional[_Limits]:
+    """
+    :param nornir: The nornir instance whose inventory defines the limits
+    :raises NutsSetupError: if the limits are not a mapping of groups and tags
+    :return: Maximum number of concurrent hosts per group and tag, if any
+    """
+    limits = nornir.inventory.defaults.data.get(MAX_CONCURRENCY_KEY)
+    if not limits:
+        return None
+    if not isinstance(limits, dict) or not all(
+        isinstance(limits.get(kind) or {}, dict) for kind in ("groups", "tags")
+    ):
+        raise NutsSetupError(
+            f"{MAX_CONCURRENCY_KEY} must map `groups` and `tags` to their "
+            f"maximum number of concurrent hosts."
+        )
+    return limits
+
+
+concurrency_limits_key = StashKey[ConcurrencyLimits]()
+
+
+def get_concurrency_limits(config: Config) -> ConcurrencyLimits:
+    """
+    Return the concurrency limits of a pytest session, creating them if necessary.
+
+    :param config: The pytest config of the session
+    :return: The session-wide concurrency limits
+    """
+    if concurrency_limits_key not in config.stash:
+        config.stash[concurrency_limits_key] = ConcurrencyLimits()
+    return config.stash[concurrency_limits_key]
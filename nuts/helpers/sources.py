@@ -0,0 +1,135 @@
+"""
+External sources of `test_data`.
+
+Instead of inlining its entries, a test bundle can refer to a file with
+``test_data_source``. The file is a CSV or TSV table with a header row, or
+a file with one JSON object per line (NDJSON). It is read row by row, and
+every row becomes one entry of `test_data`. The test collection reads the
+whole source, since every entry is needed to parametrize the tests. Cells of
+tables are strings, unless ``test_data_types`` assigns a type to their
+column. Empty cells are left out of the entry, like fields which are missing
+in YAML.
+"""
+
+import csv
+import json
+import pathlib
+from typing import Any, Callable, Dict, Iterator, Mapping, Optional
+
+from nuts.helpers.errors import NutsSetupError, NutsUsageError
+
+#: Formats of the sources by file extension
+SOURCE_FORMATS = {
+    ".csv": "csv",
+    ".tsv": "tsv",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+}
+
+_TRUE = frozenset({"true", "yes", "on", "1"})
+_FALSE = frozenset({"false", "no", "off", "0"})
+
+
+def parse_bool(value: str) -> bool:
+    """
+    :param value: A cell of a table, e.g. `true`, `no` or `1`
+    :raises ValueError: if the cell is not a boolean
+    :return: The boolean value of the cell
+    """
+    normalized = value.strip().lower()
+    if normalized in _TRUE:
+        return True
+    if normalized in _FALSE:
+        return False
+    raise ValueError(f"invalid boolean: {value!r}")
+
+
+#: Types which can be assigned to columns by `test_data_types`
+COLUMN_TYPES: Dict[str, Callable[[str], Any]] = {
+    "str": str,
+    "int": int,
+    "float": float,
+    "bool": parse_bool,
+}
+
+
+def column_converters(
+    types: Optional[Mapping[str, str]]
+) -> Dict[str, Callable[[str], Any]]:
+    """
+    :param types: The name of the type of every typed column
+    :raises NutsUsageError: if a type is not supported
+    :return: The converter of every typed column
+    """
+    converters = {}
+    for column, type_name in (types or {}).items():
+        if type_name not in COLUMN_TYPES:
+            raise NutsUsageError(
+                f"Unsupported type {type_name!r} of column {column!r} in "
+                f"test_data_types, use one of {', '.join(COLUMN_TYPES)}."
+            )
+        converters[column] = COLUMN_TYPES[type_name]
+    return converters
+
+
+def _rows(path: pathlib.Path, source_format: str) -> Iterator[Dict[str, Any]]:
+    with path.open(newline="", encoding="utf-8-sig") as file:
+        if source_format == "ndjson":
+            for line_number, line in enumerate(file, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as ex:
+                    raise NutsUsageError(f"{path}:{line_number}: {ex}") from ex
+                if not isinstance(row, dict):
+                    raise NutsUsageError(
+                        f"{path}:{line_number}: Every line must be a JSON object."
+                    )
+                yield row
+            return
+        delimiter = "\t" if source_format == "tsv" else ","
+        reader = csv.DictReader(file, delimiter=delimiter)
+        for row in reader:
+            if None in row:
+                raise NutsUsageError(
+                    f"{path}:{reader.line_num}: The row has more cells than the header."
+                )
+            yield {column: cell for column, cell in row.items() if cell}
+
+
+def read_test_data(
+    path: pathlib.Path, types: Optional[Mapping[str, str]] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Read the entries of `test_data` from a source, one row at a time.
+
+    :param path: The source file
+    :param types: The name of the type of every typed column
+    :raises NutsSetupError: if the source cannot be read
+    :raises NutsUsageError: if the source or the types are invalid
+    :return: The entries of the source
+    """
+    source_format = SOURCE_FORMATS.get(path.suffix.lower())
+    if source_format is None:
+        raise NutsUsageError(
+            f"Unsupported test_data_source {path.name}, "
+            f"use one of {', '.join(SOURCE_FORMATS)}."
+        )
+    converters = column_converters(types)
+    try:
+        for number, row in enumerate(_rows(path, source_format), 1):
+            for column, convert in converters.items():
+                value = row.get(column)
+                if not isinstance(value, str):
+                    continue
+                try:
+                    row[column] = convert(value)
+                except ValueError as ex:
+                    raise NutsUsageError(
+                        f"{path}: Invalid value in column {column!r} "
+                        f"of entry {number}: {ex}"
+                    ) from ex
+            yield row
+    except OSError as ex:
+        raise NutsSetupError(f"Could not read test_data_source:\n{ex}")
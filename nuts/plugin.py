@@ -1,6 +1,7 @@
 """Fixtures"""
 
-from typing import Optional, Dict, Any
+from collections import Counter
+from typing import Optional, Dict, Any, List, Set
 from pathlib import Path
 
 import pytest
@@ -10,11 +11,47 @@ from pytest import Collector
 from pytest import Metafunc
 from pytest import FixtureRequest
 from pytest import Config
+from pytest import Item
+from pytest import CallInfo
+from pytest import Function
+from pytest import TestReport
 
 from nuts.context import NutsContext
 from nuts.context import NornirNutsContext
 from nuts.helpers.result import NutsResult
-from nuts.yamlloader import NutsYamlFile, get_parametrize_data
+from nuts.helpers.breaker import circuit_breaker_key
+from nuts.helpers.cache import (
+    INVENTORY_CACHE_DIR,
+    INVENTORY_CACHE_FILE,
+    loaded_hosts,
+)
+from nuts.helpers.connections import connection_pool_key, close_connections
+from nuts.helpers.errors import NutsSetupError
+from nuts.helpers.fingerprints import (
+    FINGERPRINTS_KEY,
+    PASSED_FROM_CACHE,
+    fingerprints_key,
+    get_fingerprints,
+    item_fingerprint_key,
+    result_fingerprint,
+)
+from nuts.helpers.memo import get_task_memo, task_key, task_memo_key
+from nuts.helpers.outcomes import (
+    HOST_OUTCOMES_KEY,
+    get_host_outcomes,
+    host_outcomes_key,
+    narrow_test_data,
+)
+from nuts.helpers.planning import get_getter_plan, getter_plan_key
+from nuts.helpers.prefetch import get_prefetcher, prefetcher_key
+from nuts.helpers.preflight import connection_plugin, get_preflight, preflight_key
+from nuts.helpers.registry import nornir_registry_key
+from nuts.yamlloader import (
+    NutsYamlFile,
+    NutsTestClass,
+    get_parametrize_data,
+    module_cache_key,
+)
 
 
 def pytest_addhooks(pluginmanager):
@@ -25,11 +62,28 @@ def pytest_addhooks(pluginmanager):
 
 @pytest.fixture(scope="class")
 def nuts_ctx(request: FixtureRequest) -> NutsContext:
-    params = request.node.params
-    context_class = getattr(request.module, "CONTEXT", NutsContext)
-    ctx: NutsContext = context_class(params, pytestconfig=request.config)
-    ctx.initialize()
-    return ctx
+    """
+    The context of a test class. It is built once per class and
+    shared with the parametrization of its test methods.
+    """
+    if not isinstance(request.node, NutsTestClass):
+        raise NutsSetupError(
+            f"Pytest Node is not from type 'NutsTestClass:\n{request.node}"
+        )
+    return request.node.nuts_ctx
+
+
+@pytest.fixture
+def nuts_test_entry(request: FixtureRequest) -> Dict[str, Any]:
+    """
+    The entry of the test bundle a test is parametrized with,
+    as a dict which the test may modify.
+    """
+    if not hasattr(request, "param"):
+        raise NutsSetupError(
+            "nuts_test_entry is only available in tests marked with pytest.mark.nuts"
+        )
+    return dict(request.param)
 
 
 @pytest.fixture
@@ -48,6 +102,10 @@ def single_result(
     """
     res = nuts_ctx.extractor.single_result(nuts_test_entry)
     res.validate()
+    if get_fingerprints(request.config) is not None:
+        request.node.stash[item_fingerprint_key] = result_fingerprint(
+            nuts_test_entry, res.result
+        )
 
     # Invoke the pytest_nuts_single_result hook to extend result reports.
     request.config.hook.pytest_nuts_single_result(
@@ -71,7 +129,108 @@ def pytest_generate_tests(metafunc: Metafunc) -> None:
         parametrize_args, parametrize_data = get_parametrize_data(
             metafunc, *nuts.args, **nuts.kwargs
         )
-        metafunc.parametrize(parametrize_args, parametrize_data)
+        metafunc.parametrize(
+            parametrize_args, parametrize_data, indirect=["nuts_test_entry"]
+        )
+
+
+def _track_host_outcomes(config: Config, items: List[Item]) -> None:
+    """
+    Track the outcome of every host of every test class. If only failed hosts
+    are rerun, deselect the tests of the hosts which passed in the last
+    execution and restrict the contexts to the remaining hosts.
+    """
+    outcomes = get_host_outcomes(config)
+    if outcomes is None:
+        return
+    rerun = config.getoption("nuts_rerun_failed_hosts") and outcomes.has_failures()
+    classes: Dict[NutsTestClass, List[Item]] = {}
+    for item in items:
+        nuts_class = item.getparent(NutsTestClass)
+        if nuts_class is not None:
+            classes.setdefault(nuts_class, []).append(item)
+    deselected: List[Item] = []
+    for nuts_class, class_items in classes.items():
+        if rerun:
+            class_deselected, hosts = outcomes.select(class_items, nuts_class.nodeid)
+            if class_deselected:
+                deselected.extend(class_deselected)
+                ctx = nuts_class.nuts_ctx
+                ctx.nuts_parameters["test_data"] = narrow_test_data(
+                    ctx.nuts_parameters["test_data"], hosts
+                )
+        outcomes.add(class_items, nuts_class.nodeid)
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+        remaining = set(deselected)
+        items[:] = [item for item in items if item not in remaining]
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_collection_modifyitems(
+    session: Session, config: Config, items: List[Item]
+) -> None:
+    """
+    Session planning stage: registers the contexts of all selected test classes
+    with the getter plan and the task memo, so that napalm getters of different
+    test bundles are fetched with a single call per host and identical tasks
+    are run only once. The hosts of all contexts are registered with the
+    pre-flight, if enabled, to be probed at once.
+
+    The hosts of a context are only selected here if it shares its getters
+    or its task with another context, or if the pre-flight is enabled.
+    Contexts whose hosts cannot be selected before their setup has run
+    are left out and run on their own.
+    """
+    _track_host_outcomes(config, items)
+    plan = get_getter_plan(config)
+    memo = get_task_memo(config)
+    preflight = get_preflight(config)
+    contexts: List[NornirNutsContext] = []
+    for nuts_class in dict.fromkeys(item.getparent(NutsTestClass) for item in items):
+        if nuts_class is None:
+            continue
+        try:
+            ctx = nuts_class.nuts_ctx
+        except Exception:
+            # reported when the tests of the class are run
+            continue
+        if isinstance(ctx, NornirNutsContext):
+            contexts.append(ctx)
+
+    # the getters or tasks of a context are only worth planning
+    # if another context shares them
+    planned: Set[NornirNutsContext] = set()
+    memoized: Set[NornirNutsContext] = set()
+    task_keys: Dict[NornirNutsContext, Any] = {}
+    for ctx in contexts:
+        try:
+            if plan.covers(ctx):
+                planned.add(ctx)
+            elif memo.covers(ctx):
+                task_keys[ctx] = task_key(ctx)
+        except Exception:
+            continue
+    if len(planned) < 2:
+        planned.clear()
+    shared = Counter(task_keys.values())
+    memoized.update(ctx for ctx, key in task_keys.items() if shared[key] > 1)
+
+    for ctx in contexts:
+        if ctx not in planned and ctx not in memoized and preflight is None:
+            continue
+        try:
+            # the filter may rely on state which is only set up before its
+            # task is run, such contexts are neither planned nor pre-flighted
+            hosts = ctx.select_hosts().inventory.hosts
+        except Exception:
+            continue
+        if ctx in planned:
+            plan.add(ctx, list(hosts))
+        elif ctx in memoized:
+            memo.add(ctx, list(hosts))
+        if preflight is not None:
+            preflight.add(hosts.values(), connection_plugin(ctx))
 
 
 # https://docs.pytest.org/en/latest/example/nonpython.html#yaml-plugin
@@ -117,7 +276,185 @@ def pytest_addoption(parser: Parser) -> None:
         action="store_true",
         dest="nornir_cached_inventory",
         default=False,
-        help="Uses the chached inventory from the last executions if possible",
+        help="Uses the chached inventory from the last executions if possible, "
+        "even if the inventory may have changed since",
+    )
+
+    # Connection handling
+    group.addoption(
+        "--nuts-close-connections",
+        action="store_true",
+        dest="nuts_close_connections",
+        default=False,
+        help="close device connections at the end of every test class "
+        "instead of keeping them open for the whole session",
+    )
+
+    group.addoption(
+        "--nuts-connection-idle-timeout",
+        action="store",
+        dest="nuts_connection_idle_timeout",
+        type=float,
+        default=300.0,
+        metavar="SECONDS",
+        help="close pooled connections which have not been used for SECONDS. "
+        "0 disables the idle timeout. Default is 300",
+    )
+
+    group.addoption(
+        "--nuts-max-connections",
+        action="store",
+        dest="nuts_max_connections",
+        type=int,
+        default=1000,
+        metavar="N",
+        help="maximum number of pooled connections kept open, the least recently "
+        "used ones are closed first. 0 disables the limit. Default is 1000",
+    )
+
+    group.addoption(
+        "--nuts-stream-results",
+        action="store_true",
+        dest="nuts_stream_results",
+        default=False,
+        help="run the tests of a host as soon as its result is available "
+        "instead of waiting for all hosts of the test class",
+    )
+
+    group.addoption(
+        "--nuts-circuit-breaker-disable",
+        action="store_true",
+        dest="nuts_circuit_breaker_disabled",
+        default=False,
+        help="keep connecting to hosts whose connection has already failed "
+        "in an earlier test class",
+    )
+
+    group.addoption(
+        "--nuts-preflight",
+        action="store_true",
+        dest="nuts_preflight",
+        default=False,
+        help="probe the hosts of all test classes with a TCP connect before "
+        "the first task is run and skip the unreachable ones",
+    )
+
+    group.addoption(
+        "--nuts-preflight-timeout",
+        action="store",
+        dest="nuts_preflight_timeout",
+        type=float,
+        default=3.0,
+        metavar="SECONDS",
+        help="seconds after which a pre-flight probe fails. Default is 3",
+    )
+
+    group.addoption(
+        "--nuts-preflight-concurrency",
+        action="store",
+        dest="nuts_preflight_concurrency",
+        type=int,
+        default=1000,
+        metavar="N",
+        help="maximum number of concurrent pre-flight probes. Default is 1000",
+    )
+
+    group.addoption(
+        "--nuts-host-deadline",
+        action="store",
+        dest="nuts_host_deadline",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="abandon hosts whose task has not completed within SECONDS and "
+        "report them as failed. Default is no deadline",
+    )
+
+    group.addoption(
+        "--nuts-record",
+        action="store",
+        dest="nuts_record",
+        default=None,
+        metavar="DIR",
+        help="write the raw result of every host and task to DIR",
+    )
+
+    group.addoption(
+        "--nuts-replay",
+        action="store",
+        dest="nuts_replay",
+        default=None,
+        metavar="DIR",
+        help="read the raw results of all hosts and tasks from DIR, "
+        "written by --nuts-record, instead of connecting to the devices",
+    )
+
+    group.addoption(
+        "--nuts-cache-bypass",
+        action="store_true",
+        dest="nuts_cache_bypass",
+        help="ignore cached results of test bundles with a cache_ttl. "
+        "Fresh results are cached nonetheless",
+    )
+
+    group.addoption(
+        "--nuts-cache-dir",
+        action="store",
+        dest="nuts_cache_dir",
+        default=None,
+        metavar="DIR",
+        help="keep cached results in DIR. Default is the pytest cache directory",
+    )
+
+    group.addoption(
+        "--nuts-cache-max-size",
+        action="store",
+        dest="nuts_cache_max_size",
+        type=float,
+        default=100.0,
+        metavar="MB",
+        help="evict the least recently used results once the cached results "
+        "exceed MB megabytes. Default is 100",
+    )
+
+    group.addoption(
+        "--nuts-rerun-failed-hosts",
+        action="store_true",
+        dest="nuts_rerun_failed_hosts",
+        default=False,
+        help="only run the tests of the hosts which failed in the last "
+        "execution. Runs all tests if no host failed",
+    )
+
+    group.addoption(
+        "--nuts-changed-only",
+        action="store_true",
+        dest="nuts_changed_only",
+        default=False,
+        help="do not evaluate tests again whose result has not changed since "
+        "they last passed. They are reported as passed from cache",
+    )
+
+    group.addoption(
+        "--nuts-prefetch",
+        action="store",
+        dest="nuts_prefetch",
+        type=int,
+        default=0,
+        metavar="N",
+        help="fetch the results of the next N test classes in the background "
+        "while the tests of the current class are run. Default is 0 (disabled)",
+    )
+
+    group.addoption(
+        "--nuts-prefetch-inflight",
+        action="store",
+        dest="nuts_prefetch_inflight",
+        type=int,
+        default=1,
+        metavar="N",
+        help="maximum number of test classes which are prefetched at the same "
+        "time. Default is 1",
     )
 
 
@@ -127,5 +464,97 @@ def pytest_sessionstart(session: Session) -> None:
 
     :param pytest.Session session: The pytest session object.
     """
-    if not session.config.getoption("nornir_cached_inventory") and session.config.cache:
-        session.config.cache.set("nuts/NORNIR_CACHE", None)
+    # the cache is missing if the cacheprovider plugin is disabled
+    cache = getattr(session.config, "cache", None)
+    if session.config.getoption("nornir_cache_disabled") and cache:
+        cached_inventory = cache.mkdir(INVENTORY_CACHE_DIR) / INVENTORY_CACHE_FILE
+        cached_inventory.unlink(missing_ok=True)
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_protocol(item: Item, nextitem: Optional[Item]) -> Any:
+    """
+    Once a test has been run, the results of the upcoming test classes are
+    prefetched in the background if prefetching is enabled.
+    """
+    yield
+    prefetcher = get_prefetcher(item.config)
+    if prefetcher is not None and nextitem is not None:
+        prefetcher.schedule(item)
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem: Function) -> Optional[bool]:
+    """
+    With ``--nuts-changed-only``, a test which has passed with the same result
+    before is not evaluated again.
+    """
+    fingerprint = pyfuncitem.stash.get(item_fingerprint_key, None)
+    fingerprints = get_fingerprints(pyfuncitem.config)
+    if (
+        fingerprint is None
+        or fingerprints is None
+        or not pyfuncitem.config.getoption("nuts_changed_only")
+        or not fingerprints.unchanged(pyfuncitem.nodeid, fingerprint)
+    ):
+        return None
+    pyfuncitem.user_properties.append((PASSED_FROM_CACHE, fingerprint))
+    return True
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item: Item, call: CallInfo[None]) -> Any:
+    """Record the outcome of the host and the fingerprint of the result of a test."""
+    outcome = yield
+    report = outcome.get_result()
+    if host_outcomes_key in item.config.stash:
+        item.config.stash[host_outcomes_key].report(report)
+    if fingerprints_key in item.config.stash:
+        item.config.stash[fingerprints_key].report(
+            report, item.stash.get(item_fingerprint_key, None)
+        )
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_report_teststatus(report: TestReport) -> Any:
+    """Report tests which have not been evaluated again as passed from cache."""
+    if report.when != "call" or not report.passed:
+        return None
+    fingerprint = dict(report.user_properties).get(PASSED_FROM_CACHE)
+    if fingerprint is None:
+        return None
+    return (
+        PASSED_FROM_CACHE,
+        "c",
+        (f"PASSED FROM CACHE ({str(fingerprint)[:12]})", {"green": True}),
+    )
+
+
+def pytest_sessionfinish(session: Session) -> None:
+    """Called after the whole test run finished.
+    Closes all device connections which have been kept open during the session.
+
+    :param pytest.Session session: The pytest session object.
+    """
+    if prefetcher_key in session.config.stash:
+        session.config.stash[prefetcher_key].shutdown()
+    cache = getattr(session.config, "cache", None)
+    if host_outcomes_key in session.config.stash and cache is not None:
+        cache.set(HOST_OUTCOMES_KEY, session.config.stash[host_outcomes_key].merged())
+    if fingerprints_key in session.config.stash and cache is not None:
+        cache.set(FINGERPRINTS_KEY, session.config.stash[fingerprints_key].merged())
+    if getter_plan_key in session.config.stash:
+        session.config.stash[getter_plan_key].clear()
+    if task_memo_key in session.config.stash:
+        session.config.stash[task_memo_key].clear()
+    if preflight_key in session.config.stash:
+        session.config.stash[preflight_key].clear()
+    if circuit_breaker_key in session.config.stash:
+        session.config.stash[circuit_breaker_key].clear()
+    if module_cache_key in session.config.stash:
+        session.config.stash[module_cache_key].clear()
+    if connection_pool_key in session.config.stash:
+        session.config.stash[connection_pool_key].close_all()
+    if nornir_registry_key in session.config.stash:
+        for nornir in session.config.stash[nornir_registry_key].instances():
+            close_connections(loaded_hosts(nornir.inventory.hosts))
@@ -6,18 +6,25 @@ import importlib
 from nuts.helpers.context import load_context
 import types
 from importlib import util
-from typing import Iterable, Union, Any, Optional, List, Set, Dict, Tuple
+from typing import Iterable, Mapping, Union, Any, Optional, List, Set, Dict, Tuple
 
-import yaml
 import pytest
-from pytest import Item, Collector
+from pytest import Config, Item, Collector, StashKey
 from pytest import Metafunc
 from _pytest.mark import ParameterSet
 from _pytest.nodes import Node
 
+from nuts.context import NutsContext
+from nuts.helpers.bundles import get_bundle_cache, parse_bundle
 from nuts.helpers.errors import NutsUsageError, NutsSetupError
+from nuts.helpers.parametrization import ExpandedTestData
+from nuts.helpers.sources import read_test_data
 from nuts import index
 
+#: Module attribute with which a test module asks to be loaded anew
+#: for every entry of a test bundle
+ISOLATED_MODULE = "NUTS_ISOLATED_MODULE"
+
 
 class NutsYamlFile(pytest.File):
     """
@@ -28,16 +35,20 @@ class NutsYamlFile(pytest.File):
         yield from self._collect_path()
 
     def _collect_path(self) -> Iterable[Union[Item, Collector]]:
+        bundle_cache = get_bundle_cache(self.config)
         try:
-            with self.path.open() as fo:
-                raw = yaml.safe_load(fo)
+            if bundle_cache is None:
+                raw = parse_bundle(self.path)
+            else:
+                raw = bundle_cache.load(self.path)
         except OSError as ex:
             raise NutsSetupError(
                 f"Could not open YAML file containing test bundle:\n{ex}"
             )
 
+        module_cache = get_module_cache(self.config)
         for test_entry in raw:
-            module = find_and_load_module(test_entry)
+            module = find_and_load_module(test_entry, module_cache)
             yield NutsTestFile.from_parent(
                 self,
                 path=self.path,
@@ -46,12 +57,16 @@ class NutsYamlFile(pytest.File):
             )
 
 
-def find_and_load_module(test_entry: Dict[str, str]) -> types.ModuleType:
+def find_and_load_module(
+    test_entry: Dict[str, str], module_cache: Optional["ModuleCache"] = None
+) -> types.ModuleType:
     test_class = test_entry.get("test_class")
     if not test_class:
         raise NutsUsageError("Class name of the specific test missing in YAML file.")
     module_path = find_module_path(test_entry.get("test_module"), test_class)
-    return load_module(module_path)
+    if module_cache is None:
+        return load_module(module_path)
+    return module_cache.get(module_path)
 
 
 def find_module_path(module_path: Optional[str], class_name: str) -> str:
@@ -80,6 +95,55 @@ def load_module(module_path: str) -> types.ModuleType:
     return module
 
 
+class ModuleCache:
+    """
+    Test modules loaded within a pytest session.
+
+    Every test module is executed once for all entries of all test bundles
+    which refer to it. A module which sets ``NUTS_ISOLATED_MODULE = True``
+    is executed anew for every entry instead.
+
+    pytest parses the fixtures of a module object only once per session,
+    hence every entry receives a namespace of its own, which shares the
+    classes, functions and fixtures of the executed module.
+    """
+
+    def __init__(self) -> None:
+        self._modules: Dict[str, types.ModuleType] = {}
+
+    def get(self, module_path: str) -> types.ModuleType:
+        """
+        :param module_path: The dotted path of the test module
+        :return: The loaded test module
+        """
+        module = self._modules.get(module_path)
+        if module is None:
+            module = self._modules[module_path] = load_module(module_path)
+        elif getattr(module, ISOLATED_MODULE, False):
+            return load_module(module_path)
+        namespace = types.ModuleType(module.__name__, module.__doc__)
+        namespace.__dict__.update(module.__dict__)
+        return namespace
+
+    def clear(self) -> None:
+        self._modules.clear()
+
+
+module_cache_key = StashKey[ModuleCache]()
+
+
+def get_module_cache(config: Config) -> ModuleCache:
+    """
+    Return the module cache of a pytest session, creating it if necessary.
+
+    :param config: The pytest config of the session
+    :return: The session-wide module cache
+    """
+    if module_cache_key not in config.stash:
+        config.stash[module_cache_key] = ModuleCache()
+    return config.stash[module_cache_key]
+
+
 class NutsTestFile(pytest.Module):
     """
     Custom nuts collector for test classes and functions.
@@ -95,6 +159,9 @@ class NutsTestFile(pytest.Module):
         Collects a single NutsTestClass instance from this NutsTestFile.
         At the start inject setup_module fixture and parse all fixtures from the module.
         This is directly adopted from pytest.Module.
+        The entries of `test_data_source` are appended to `test_data`.
+        The whole source is read here, as the parametrization of the test
+        methods needs all of its entries.
         """
 
         self._inject_setup_module_fixture()
@@ -106,6 +173,13 @@ class NutsTestFile(pytest.Module):
         name = class_name if label is None else f"{class_name} - {label}"
 
         test_data = self.test_entry.get("test_data", [])
+        source = self.test_entry.get("test_data_source")
+        if source is not None:
+            # the source is relative to the test bundle
+            rows = read_test_data(
+                self.path.parent / source, self.test_entry.get("test_data_types")
+            )
+            test_data = [*(test_data or []), *rows]
         test_execution = self.test_entry.get("test_execution")
         test_extras = self.test_entry.get("test_extras")
         yield NutsTestClass.from_parent(
@@ -129,6 +203,32 @@ class NutsTestClass(pytest.Class):
         self.params: Any = kw
         self.name: str = name
         self.class_name: str = class_name
+        self._nuts_ctx: Optional[NutsContext] = None
+        self._nuts_ctx_error: Optional[Exception] = None
+
+    @property
+    def nuts_ctx(self) -> NutsContext:
+        """
+        The initialized and parametrized context of this test class.
+        It is built once and shared by the `nuts_ctx` fixture and
+        the parametrization of all test methods. If it cannot be built,
+        the error is raised again on every access instead of building
+        the context again.
+        """
+        if self._nuts_ctx_error is not None:
+            raise self._nuts_ctx_error
+        if self._nuts_ctx is None:
+            assert isinstance(self.parent, NutsTestFile)
+            try:
+                ctx = load_context(self.parent.obj, self.params, self.config)
+                ctx.nuts_parameters["test_data"] = ctx.parametrize(
+                    self.params.get("test_data", [])
+                )
+            except Exception as exception:
+                self._nuts_ctx_error = exception
+                raise
+            self._nuts_ctx = ctx
+        return self._nuts_ctx
 
     def _getobj(self) -> Any:
         """
@@ -165,6 +265,8 @@ def get_parametrize_data(
 
     For every single test run one entry from the test_data section in the yaml file is
     injected as a first entry to be parametrized (`nuts_test_entry`).
+    Entries of expanded test data are passed as compact `HostEntry` mappings,
+    which the `nuts_test_entry` fixture turns into a dict.
     In doing so, the `single_result` fixture in `plugin.py` can pass on
     the full entry to the extractor. The extractor can then decide in its
     own `single_result` method which property of the entry should be picked as key
@@ -188,29 +290,30 @@ def get_parametrize_data(
         optional_fields = {field.strip() for field in optional_fields_str.split(",")}
     required_fields = set(fields) - optional_fields
 
-    assert metafunc.definition.parent is not None
-    nuts_test_instance = metafunc.definition.parent.parent
-    # breakpoint()
-    if not isinstance(nuts_test_instance, NutsTestFile):
+    nuts_test_class = metafunc.definition.parent
+    if not isinstance(nuts_test_class, NutsTestClass):
         raise NutsSetupError(
-            f"Pytest Node is not from type 'NutsTestFile:\n{nuts_test_instance}"
+            f"Pytest Node is not from type 'NutsTestClass:\n{nuts_test_class}"
         )
 
-    data = getattr(nuts_test_instance, "test_entry")
-
-    ctx = load_context(nuts_test_instance.module, data, metafunc.config)
-    data["test_data"] = ctx.parametrize(data.get("test_data", []))
+    ctx = nuts_test_class.nuts_ctx
+    test_data = ctx.nuts_parameters.get("test_data", [])
+    if isinstance(test_data, ExpandedTestData):
+        test_data = test_data.host_entries()
 
     return (
         ["nuts_test_entry", *fields],
         dict_to_tuple_list(
-            data.get("test_data", []), fields, required_fields, id_format=ctx.id_format
+            test_data,
+            fields,
+            required_fields,
+            id_format=ctx.id_format,
         ),
     )
 
 
 def dict_to_tuple_list(
-    test_data: List[Dict[str, Any]],
+    test_data: Iterable[Mapping[str, Any]],
     fields: List[str],
     required_fields: Set[str],
     id_format: str,
@@ -224,7 +327,7 @@ def dict_to_tuple_list(
 
 
 def wrap_if_needed(
-    entry: Dict[str, Any],
+    entry: Mapping[str, Any],
     required_fields: Set[str],
     present_fields: Tuple[Optional[Any], ...],
     id_format: str,
@@ -243,7 +346,7 @@ def wrap_if_needed(
 
 
 def dict_to_tuple(
-    source: Dict[str, Any], fields: List[str]
+    source: Mapping[str, Any], fields: List[str]
 ) -> Tuple[Optional[Any], ...]:
     ordered_fields = [source.get(field) for field in fields]
     return tuple(ordered_fields)
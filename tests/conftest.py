@@ -1,7 +1,10 @@
 import pytest
 
 from nornir.core.plugins.connections import ConnectionPluginRegister
-from nornir.core.plugins.inventory import InventoryPluginRegister
+from nornir.core.plugins.inventory import (
+    InventoryPluginRegister,
+    TransformFunctionRegister,
+)
 from nornir.core.plugins.runners import RunnersPluginRegister
 
 from tests.utils import YAML_EXTENSION
@@ -21,6 +24,7 @@ def deregister_nornir_plugin():
     ConnectionPluginRegister.deregister_all()
     InventoryPluginRegister.deregister_all()
     RunnersPluginRegister.deregister_all()
+    TransformFunctionRegister.deregister_all()
 
 
 @pytest.fixture
@@ -0,0 +1,73 @@
+import socket
+
+import pytest
+from napalm.base.exceptions import ConnectionException
+from nornir.core.inventory import Host
+
+from nuts.helpers.breaker import (
+    CircuitBreaker,
+    is_connection_failure,
+    open_circuit_result,
+)
+
+
+def raise_from(exception: BaseException, cause: BaseException) -> BaseException:
+    try:
+        raise exception from cause
+    except BaseException as raised:
+        return raised
+
+
+def raise_during(exception: BaseException, context: BaseException) -> BaseException:
+    try:
+        try:
+            raise context
+        except BaseException:
+            raise exception
+    except BaseException as raised:
+        return raised
+
+
+@pytest.mark.parametrize(
+    "exception",
+    [
+        ConnectionRefusedError("refused"),
+        socket.timeout("timed out"),
+        ConnectionException("cannot connect"),
+        raise_from(ValueError("wrapped"), ConnectionResetError("reset")),
+        raise_during(KeyError("handling"), TimeoutError("timed out")),
+    ],
+)
+def test_detects_connection_failures(exception):
+    assert is_connection_failure(exception)
+
+
+@pytest.mark.parametrize(
+    "exception", [None, ValueError("wrong"), raise_from(KeyError(), ValueError())]
+)
+def test_ignores_other_failures(exception):
+    assert not is_connection_failure(exception)
+
+
+def test_keeps_first_failure_of_host():
+    breaker = CircuitBreaker()
+    first = ConnectionRefusedError("first")
+    breaker.trip("R1", first)
+    breaker.trip("R1", ConnectionRefusedError("second"))
+
+    assert "R1" in breaker
+    assert breaker.open_hosts(["R1", "R2"]) == {"R1": first}
+
+    breaker.clear()
+    assert breaker.open_hosts(["R1", "R2"]) == {}
+
+
+def test_open_circuit_result_carries_exception():
+    exception = ConnectionRefusedError("refused")
+    host = Host(name="R1")
+    result = open_circuit_result(host, "napalm_get", exception)
+
+    assert result.failed
+    assert result.name == "napalm_get"
+    assert result[0].exception is exception
+    assert result[0].host is host
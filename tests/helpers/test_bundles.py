@@ -0,0 +1,101 @@
+import os
+import pickle
+
+import pytest
+import yaml
+
+from nuts.helpers.bundles import BundleCache, SafeLoader, parse_bundle
+
+BUNDLE = """
+---
+- test_class: TestNapalmPing
+  test_data:
+    - host: R1
+      destination: 10.0.0.1
+"""
+
+
+class MakeDirectory:
+    """Creates a directory when it is unpickled."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def __reduce__(self):
+        return os.mkdir, (self.path,)
+
+
+@pytest.fixture
+def bundle(tmp_path):
+    path = tmp_path / "test_bundle.yaml"
+    path.write_text(BUNDLE)
+    return path
+
+
+@pytest.fixture
+def bundle_cache(tmp_path):
+    directory = tmp_path / "cache"
+    directory.mkdir()
+    return BundleCache(directory)
+
+
+def test_libyaml_loader_is_used_if_available():
+    assert SafeLoader is getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def test_parse_bundle(bundle):
+    assert parse_bundle(bundle) == yaml.safe_load(BUNDLE)
+
+
+def test_parse_bundle_rejects_python_tags(tmp_path):
+    path = tmp_path / "test_bundle.yaml"
+    path.write_text("- !!python/object/apply:os.getcwd []\n")
+    with pytest.raises(yaml.YAMLError):
+        parse_bundle(path)
+
+
+class TestBundleCache:
+    def test_unchanged_bundle_is_not_parsed_again(
+        self, bundle, bundle_cache, monkeypatch
+    ):
+        expected = yaml.safe_load(BUNDLE)
+        assert bundle_cache.load(bundle) == expected
+        assert len(list(bundle_cache.directory.iterdir())) == 1
+
+        def fail(path):
+            raise AssertionError("bundle parsed again")
+
+        monkeypatch.setattr("nuts.helpers.bundles.parse_bundle", fail)
+        assert bundle_cache.load(bundle) == expected
+
+    def test_changed_bundle_is_parsed_again(self, bundle, bundle_cache):
+        bundle_cache.load(bundle)
+        bundle.write_text(BUNDLE.replace("R1", "R2"))
+        stat = bundle.stat()
+        os.utime(bundle, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        assert bundle_cache.load(bundle)[0]["test_data"][0]["host"] == "R2"
+
+    def test_corrupt_cache_file_is_replaced(self, bundle, bundle_cache):
+        bundle_cache.load(bundle)
+        [cache_file] = bundle_cache.directory.iterdir()
+        cache_file.write_bytes(b"corrupt")
+        assert bundle_cache.load(bundle) == yaml.safe_load(BUNDLE)
+        assert cache_file.read_bytes() != b"corrupt"
+
+    def test_pickled_cache_file_is_not_run(self, bundle, bundle_cache):
+        bundle_cache.load(bundle)
+        [cache_file] = bundle_cache.directory.iterdir()
+        marker = bundle.parent / "unpickled"
+        cache_file.write_bytes(pickle.dumps(MakeDirectory(str(marker))))
+        assert bundle_cache.load(bundle) == yaml.safe_load(BUNDLE)
+        assert not marker.exists()
+
+    def test_bundle_with_dates_is_not_cached(self, tmp_path, bundle_cache):
+        path = tmp_path / "test_bundle.yaml"
+        path.write_text("- test_class: TestNapalmUsers\n  since: 2020-01-01\n")
+        assert bundle_cache.load(path)[0]["since"].year == 2020
+        assert list(bundle_cache.directory.iterdir()) == []
+
+    def test_missing_bundle(self, tmp_path, bundle_cache):
+        with pytest.raises(OSError):
+            bundle_cache.load(tmp_path / "missing.yaml")
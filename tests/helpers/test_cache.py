@@ -1,7 +1,29 @@
-from nornir.core.inventory import Inventory, Hosts, Groups, Defaults, Host, Group
+import datetime
+import pathlib
+import pickle
+import struct
+
+import pytest
+from nornir.core.inventory import (
+    Inventory,
+    Hosts,
+    Groups,
+    Defaults,
+    Host,
+    Group,
+    ParentGroups,
+)
 from typing import Any, Dict
 
-from nuts.helpers.cache import CacheInventory, serialize_inventory
+from nuts.helpers.cache import (
+    CacheInventory,
+    InventoryCacheFile,
+    LazyHosts,
+    inventory_fingerprint,
+    loaded_hosts,
+    serialize_inventory,
+    write_inventory_cache,
+)
 
 
 def test_serialize_inventory():
@@ -163,3 +185,130 @@ def test_empty_cache_inventory_load():
     assert inventory.hosts is not None
     assert inventory.groups is not None
     assert inventory.defaults is not None
+
+
+class TestInventoryFingerprint:
+    @pytest.fixture
+    def config_file(self, tmp_path: pathlib.Path) -> pathlib.Path:
+        (tmp_path / "hosts.yaml").write_text("R1: {}\n")
+        (tmp_path / "groups.yaml").write_text("{}\n")
+        config_file = tmp_path / "nr-config.yaml"
+        config_file.write_text(
+            f"""
+            inventory:
+              plugin: SimpleInventory
+              options:
+                host_file: {tmp_path / "hosts.yaml"}
+                group_file: {tmp_path / "groups.yaml"}
+            """
+        )
+        return config_file
+
+    def test_is_stable(self, config_file):
+        fingerprint = inventory_fingerprint(config_file)
+        assert fingerprint is not None
+        assert inventory_fingerprint(config_file) == fingerprint
+
+    @pytest.mark.parametrize("changed_file", ["hosts.yaml", "groups.yaml"])
+    def test_changes_with_inventory_files(self, config_file, changed_file):
+        fingerprint = inventory_fingerprint(config_file)
+        (config_file.parent / changed_file).write_text("R2: {}\n")
+        assert inventory_fingerprint(config_file) != fingerprint
+
+    def test_changes_with_config_file(self, config_file):
+        fingerprint = inventory_fingerprint(config_file)
+        config_file.write_text(config_file.read_text() + "runner:\n  plugin: serial\n")
+        assert inventory_fingerprint(config_file) != fingerprint
+
+    def test_none_for_non_file_inventories(self, tmp_path):
+        config_file = tmp_path / "nr-config.yaml"
+        config_file.write_text("inventory:\n  plugin: NetBoxInventory2\n")
+        assert inventory_fingerprint(config_file) is None
+
+    def test_none_without_config_file(self, tmp_path):
+        assert inventory_fingerprint(tmp_path / "nr-config.yaml") is None
+
+
+def make_inventory() -> Inventory:
+    core = Group(name="core", data={"role": "core"})
+    defaults = Defaults(username="admin")
+    hosts = Hosts(
+        {
+            name: Host(
+                name=name,
+                hostname=f"{name}.example.com",
+                groups=ParentGroups([core]),
+                data={"index": index},
+                defaults=defaults,
+            )
+            for index, name in enumerate(["R1", "R2", "R3"])
+        }
+    )
+    return Inventory(hosts=hosts, groups=Groups({"core": core}), defaults=defaults)
+
+
+class TestInventoryCacheFile:
+    def test_round_trip(self, tmp_path):
+        path = tmp_path / "inventory.bin"
+        write_inventory_cache(path, make_inventory(), "fingerprint")
+
+        cached = InventoryCacheFile.open(path)
+
+        assert cached is not None
+        assert cached.fingerprint == "fingerprint"
+        assert list(cached.hosts) == ["R1", "R2", "R3"]
+        assert cached.hosts["R2"]["data"] == {"index": 1}
+        assert cached.hosts["R2"]["groups"] == ["core"]
+        assert cached.groups["core"]["data"] == {"role": "core"}
+        assert cached.defaults["username"] == "admin"
+
+    def test_loads_hosts_lazily(self, tmp_path):
+        path = tmp_path / "inventory.bin"
+        write_inventory_cache(path, make_inventory(), None)
+        cached = InventoryCacheFile.open(path)
+        assert cached is not None
+
+        inventory = CacheInventory(
+            hosts=cached.hosts, groups=cached.groups, defaults=cached.defaults
+        ).load()
+        hosts = inventory.hosts
+
+        assert isinstance(hosts, LazyHosts)
+        assert len(hosts) == 3
+        assert "R3" in hosts
+        assert list(loaded_hosts(hosts)) == []
+        r2 = hosts["R2"]
+        assert r2.hostname == "R2.example.com"
+        assert r2.username == "admin"
+        assert r2["role"] == "core"
+        assert r2.groups[0] is inventory.groups["core"]
+        assert hosts["R2"] is r2
+        assert list(loaded_hosts(hosts)) == [r2]
+        assert [h.name for h in hosts.values()] == ["R1", "R2", "R3"]
+
+    def test_inventories_which_json_cannot_represent_are_not_written(self, tmp_path):
+        path = tmp_path / "inventory.bin"
+        inventory = make_inventory()
+        inventory.hosts["R1"].data["since"] = datetime.date(2020, 1, 1)
+
+        write_inventory_cache(path, inventory, "fingerprint")
+
+        assert list(tmp_path.iterdir()) == []
+
+    def test_pickled_files_are_not_loaded(self, tmp_path):
+        path = tmp_path / "inventory.bin"
+        write_inventory_cache(path, make_inventory(), "fingerprint")
+        content = path.read_bytes()
+        index_offset = struct.unpack_from("<8sQ", content)[1]
+        path.write_bytes(content[:index_offset] + pickle.dumps({"format": 3}))
+
+        assert InventoryCacheFile.open(path) is None
+
+    @pytest.mark.parametrize("content", [b"", b"NUTSINV3", b"not an inventory cache"])
+    def test_unreadable_files_are_ignored(self, tmp_path, content):
+        path = tmp_path / "inventory.bin"
+        path.write_bytes(content)
+        assert InventoryCacheFile.open(path) is None
+
+    def test_missing_file_is_ignored(self, tmp_path):
+        assert InventoryCacheFile.open(tmp_path / "inventory.bin") is None
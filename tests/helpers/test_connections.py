@@ -0,0 +1,101 @@
+from unittest.mock import Mock
+
+from nornir.core.inventory import Host
+
+from nuts.helpers.connections import ConnectionPool, close_connections
+
+
+def create_host(name: str, *connections: str) -> Host:
+    host = Host(name=name)
+    for connection in connections:
+        host.connections[connection] = Mock()
+    return host
+
+
+def get_mock(host: Host, connection: str) -> Mock:
+    mock = host.connections[connection]
+    assert isinstance(mock, Mock)
+    return mock
+
+
+def test_checkin_keeps_connections_open():
+    host = create_host("R1", "napalm")
+    connection = get_mock(host, "napalm")
+    pool = ConnectionPool()
+
+    pool.checkin([host])
+
+    assert len(pool) == 1
+    assert "napalm" in host.connections
+    connection.close.assert_not_called()
+
+
+def test_max_open_evicts_least_recently_used():
+    r1 = create_host("R1", "napalm")
+    r2 = create_host("R2", "napalm")
+    r3 = create_host("R3", "napalm")
+    pool = ConnectionPool(max_open=2)
+
+    pool.checkin([r1])
+    pool.checkin([r2])
+    pool.checkin([r1])
+    pool.checkin([r3])
+
+    assert len(pool) == 2
+    assert "napalm" in r1.connections
+    assert "napalm" not in r2.connections
+    assert "napalm" in r3.connections
+
+
+def test_checked_out_connections_are_not_evicted():
+    r1 = create_host("R1", "napalm")
+    r2 = create_host("R2", "napalm")
+    pool = ConnectionPool(max_open=1)
+    pool.checkin([r1])
+
+    pool.checkout([r1])
+    pool.checkin([r2])
+
+    get_mock(r1, "napalm").close.assert_not_called()
+    assert len(pool) == 1
+
+
+def test_idle_connections_are_evicted(monkeypatch):
+    r1 = create_host("R1", "napalm")
+    r2 = create_host("R2", "netmiko")
+    pool = ConnectionPool(max_idle=10)
+    clock = iter([100.0, 105.0, 112.0])
+    monkeypatch.setattr("nuts.helpers.connections.time.monotonic", lambda: next(clock))
+
+    pool.checkin([r1])
+    pool.checkin([r2])
+    pool.checkin([])
+
+    assert len(pool) == 1
+    assert "napalm" not in r1.connections
+    assert "netmiko" in r2.connections
+
+
+def test_close_all():
+    host = create_host("R1", "napalm", "netmiko")
+    connections = [get_mock(host, "napalm"), get_mock(host, "netmiko")]
+    pool = ConnectionPool()
+    pool.checkin([host])
+
+    pool.close_all()
+
+    assert len(pool) == 0
+    assert not host.connections
+    for connection in connections:
+        connection.close.assert_called_once()
+
+
+def test_close_connections_ignores_broken_connections():
+    host = create_host("R1", "napalm", "netmiko")
+    get_mock(host, "napalm").close.side_effect = OSError("broken pipe")
+    netmiko = get_mock(host, "netmiko")
+
+    close_connections([host])
+
+    assert not host.connections
+    netmiko.close.assert_called_once()
@@ -1,7 +1,20 @@
+from typing import List
+
 import pytest
+from nornir.core import Nornir
 from nornir.core.filter import F, OR
+from nornir.core.inventory import Group, Groups, Host, Hosts, Inventory, ParentGroups
 
-from nuts.helpers.filters import filter_hosts, get_filter_object
+from nuts.helpers.cache import LazyHosts
+from nuts.helpers.errors import NutsSetupError
+from nuts.helpers.filters import (
+    HostSelector,
+    apply_filter,
+    filter_hosts,
+    get_filter_object,
+    is_expanded,
+)
+from nuts.helpers.inventory_index import InventoryIndex
 
 
 @pytest.mark.parametrize(
@@ -41,3 +54,126 @@ def test_filter_host(test_data, expected):
 def test_get_filter_object(test_data, expected):
     # Would be nice if F_BASE objects would be comparable. Not the way we should do it.
     assert repr(get_filter_object(test_data)) == repr(expected)
+
+
+def lazy_nornir(built: List[str]) -> Nornir:
+    def build(name: str) -> Host:
+        built.append(name)
+        return Host(name=name, data={"tags": ["router"]})
+
+    return Nornir(inventory=Inventory(hosts=LazyHosts(["R1", "R2", "R3"], build)))
+
+
+def test_name_filter_only_builds_selected_hosts():
+    built: List[str] = []
+    nornir = lazy_nornir(built)
+
+    selected = apply_filter(nornir, F(name__any=["R3", "R1", "R9"]))
+
+    assert list(selected.inventory.hosts) == ["R1", "R3"]
+    assert built == ["R1", "R3"]
+    assert selected.config is nornir.config
+
+
+def test_other_filters_are_applied_by_nornir():
+    built: List[str] = []
+    nornir = lazy_nornir(built)
+
+    selected = apply_filter(nornir, F(tags__any=["router"]))
+
+    assert list(selected.inventory.hosts) == ["R1", "R2", "R3"]
+    assert built == ["R1", "R2", "R3"]
+
+
+def selector_inventory() -> Inventory:
+    routers = Group(name="routers")
+    site1 = Group(name="site1", groups=ParentGroups([routers]))
+    hosts = Hosts(
+        {
+            "S1": Host(name="S1", hostname="10.0.0.1", data={"tags": "switch"}),
+            "R2": Host(
+                name="R2", groups=ParentGroups([routers]), data={"tags": ["tag2"]}
+            ),
+            "R1": Host(name="R1", groups=ParentGroups([site1]), data={"tags": ["a"]}),
+        }
+    )
+    return Inventory(hosts=hosts, groups=Groups({"routers": routers, "site1": site1}))
+
+
+class TestHostSelector:
+    def test_from_entry(self):
+        selector = HostSelector.from_entry(
+            {"host": "R1", "tags": ["tag1", "tag2"], "destination": "10.0.0.1"}
+        )
+        assert selector.names == {"R1"}
+        assert selector.tags == {"tag1", "tag2"}
+        assert selector.groups == frozenset()
+
+    def test_from_entry_with_patterns(self):
+        selector = HostSelector.from_entry(
+            {"host_match": "core-*", "host_regex": ["R\\d", "S1"]}
+        )
+        assert selector.patterns == {"core-*"}
+        assert selector.regexes == {"R\\d", "S1"}
+
+    def test_from_entry_with_invalid_regex(self):
+        with pytest.raises(NutsSetupError, match="Invalid host_regex"):
+            HostSelector.from_entry({"host_regex": "R("})
+
+    def test_from_entry_without_selectors(self):
+        with pytest.raises(NutsSetupError):
+            HostSelector.from_entry({"destination": "10.0.0.1"})
+
+    def test_filters(self):
+        selector = HostSelector(names=["R2", "R1"], groups=["routers"])
+        assert selector.filters == {
+            "name__any": ["R1", "R2"],
+            "groups__any": ["routers"],
+        }
+        assert repr(selector) == "HostSelector(name=['R1', 'R2'], groups=['routers'])"
+        selector = HostSelector(patterns=["R*"], regexes=["S\\d"])
+        assert repr(selector) == (
+            "HostSelector(name__match=['R*'], name__regex=['S\\\\d'])"
+        )
+
+    @pytest.mark.parametrize(
+        "selector, expected",
+        [
+            (HostSelector(names=["R1", "R9"]), ["R1"]),
+            (HostSelector(hostnames=["10.0.0.1"]), ["S1"]),
+            (HostSelector(tags=["switch", "tag2"]), ["S1", "R2"]),
+            (HostSelector(groups=["routers"]), ["R2", "R1"]),
+            (HostSelector(names=["S1"], groups=["site1"]), ["S1", "R1"]),
+            (HostSelector(patterns=["R*"]), ["R2", "R1"]),
+            (HostSelector(regexes=["R[2-9]", "S"]), ["R2"]),
+            (HostSelector(tags=["a"], patterns=["S?"]), ["S1", "R1"]),
+            (HostSelector(), []),
+        ],
+    )
+    def test_filter_and_resolve(self, selector, expected):
+        inventory = selector_inventory()
+        nornir = Nornir(inventory=inventory)
+        assert list(nornir.filter(selector).inventory.hosts) == expected
+        assert selector.resolve(InventoryIndex(inventory.hosts)) == expected
+
+    def test_name_selector_picks_hosts(self, monkeypatch):
+        nornir = Nornir(inventory=selector_inventory())
+        selector = filter_hosts([{"host": "R1"}, {"host": "S1"}, {"host": "R1"}])
+        monkeypatch.setattr(HostSelector, "__call__", None)
+        assert list(apply_filter(nornir, selector).inventory.hosts) == ["S1", "R1"]
+
+
+@pytest.mark.parametrize(
+    "test_data, expected",
+    [
+        ([{"host": "R1", "destination": "10.0.0.1"}, {"host": "R2"}], True),
+        ([], True),
+        ([{"host": ["R1", "R2"]}], False),
+        ([{"host": "R1", "tags": ["router"]}], False),
+        ([{"host_match": "R*"}], False),
+        (["R1"], False),
+        (None, False),
+    ],
+)
+def test_is_expanded(test_data, expected):
+    assert is_expanded(test_data) is expected
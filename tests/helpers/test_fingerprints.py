@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+from typing import Any
+
+from nuts.helpers.fingerprints import Fingerprints, result_fingerprint
+
+
+def make_report(when: str, outcome: str) -> Any:
+    return SimpleNamespace(
+        nodeid="test[R1_]",
+        when=when,
+        failed=outcome == "failed",
+        passed=outcome == "passed",
+    )
+
+
+class TestResultFingerprint:
+    def test_fingerprint_is_stable(self):
+        first = result_fingerprint({"host": "R1"}, {"b": 1, "a": [1, 2]})
+        second = result_fingerprint({"host": "R1"}, {"a": [1, 2], "b": 1})
+        assert first == second
+
+    def test_fingerprint_depends_on_entry_and_result(self):
+        fingerprint = result_fingerprint({"host": "R1"}, "up")
+        assert fingerprint != result_fingerprint({"host": "R2"}, "up")
+        assert fingerprint != result_fingerprint({"host": "R1"}, "down")
+
+    def test_fingerprint_of_objects(self):
+        assert result_fingerprint({"host": "R1"}, object) == result_fingerprint(
+            {"host": "R1"}, object
+        )
+
+
+class TestFingerprints:
+    def test_passed_test_keeps_fingerprint(self):
+        fingerprints = Fingerprints({})
+        fingerprints.report(make_report("setup", "passed"), "abc")
+        fingerprints.report(make_report("call", "passed"), "abc")
+        fingerprints.report(make_report("teardown", "passed"), "abc")
+        assert fingerprints.merged() == {"test[R1_]": "abc"}
+
+    def test_failed_test_drops_fingerprint(self):
+        fingerprints = Fingerprints({"test[R1_]": "abc"})
+        fingerprints.report(make_report("call", "failed"), "abc")
+        assert fingerprints.merged() == {}
+
+    def test_failed_teardown_drops_fingerprint(self):
+        fingerprints = Fingerprints({})
+        fingerprints.report(make_report("call", "passed"), "abc")
+        fingerprints.report(make_report("teardown", "failed"), "abc")
+        assert fingerprints.merged() == {}
+
+    def test_test_without_fingerprint_drops_fingerprint(self):
+        fingerprints = Fingerprints({"test[R1_]": "abc"})
+        fingerprints.report(make_report("setup", "failed"), None)
+        assert fingerprints.merged() == {}
+
+    def test_tests_which_have_not_run_are_kept(self):
+        fingerprints = Fingerprints({"other": "def"})
+        fingerprints.report(make_report("call", "passed"), "abc")
+        assert fingerprints.merged() == {"other": "def", "test[R1_]": "abc"}
+
+    def test_unchanged(self):
+        fingerprints = Fingerprints({"test[R1_]": "abc"})
+        assert fingerprints.unchanged("test[R1_]", "abc")
+        assert not fingerprints.unchanged("test[R1_]", "def")
+        assert not fingerprints.unchanged("other", "abc")
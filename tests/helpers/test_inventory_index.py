@@ -0,0 +1,132 @@
+import pytest
+from nornir.core.inventory import (
+    Defaults,
+    Group,
+    Groups,
+    Host,
+    Hosts,
+    Inventory,
+    ParentGroups,
+)
+
+from nuts.helpers.inventory_index import (
+    InventoryIndex,
+    get_inventory_index,
+    glob_prefix,
+    regex_prefix,
+)
+
+
+@pytest.fixture
+def inventory() -> Inventory:
+    routers = Group(name="routers", data={"tags": ["router"]})
+    site1 = Group(name="site1", groups=ParentGroups([routers]))
+    site2 = Group(name="site2")
+    defaults = Defaults()
+    hosts = Hosts(
+        {
+            "S1": Host(name="S1", data={"tags": "switch"}, defaults=defaults),
+            "R2": Host(
+                name="R2",
+                groups=ParentGroups([routers, site2]),
+                data={"tags": ["router", "tag2"]},
+                defaults=defaults,
+            ),
+            "R1": Host(
+                name="R1",
+                hostname="r1.example.com",
+                groups=ParentGroups([site1]),
+                data={"tags": ["tag1"]},
+                defaults=defaults,
+            ),
+            "R3": Host(name="R3", groups=ParentGroups([site1]), defaults=defaults),
+            "X1": Host(name="X1", data={"tags": [{"unhashable": True}]}),
+        }
+    )
+    groups = Groups({"routers": routers, "site1": site1, "site2": site2})
+    return Inventory(hosts=hosts, groups=groups, defaults=defaults)
+
+
+@pytest.fixture
+def index(inventory: Inventory) -> InventoryIndex:
+    return InventoryIndex(inventory.hosts)
+
+
+class TestInventoryIndex:
+    def test_names(self, index):
+        assert index.names(["R1", "R9"]) == {"R1"}
+
+    def test_tagged(self, index):
+        assert index.tagged(["tag1", "switch"]) == {"R1", "S1"}
+        assert index.tagged(["notFound", ["unhashable"]]) == set()
+
+    def test_tags_are_inherited_from_groups(self, index):
+        # tags of the host itself take precedence over those of its groups
+        assert index.tagged(["router"]) == {"R2", "R3"}
+
+    def test_grouped(self, index):
+        assert index.grouped(["site2"]) == {"R2"}
+        assert index.grouped(["notFound"]) == set()
+
+    def test_groups_are_inherited(self, index):
+        assert index.grouped(["routers"]) == {"R1", "R2", "R3"}
+
+    def test_ordered(self, index):
+        assert index.ordered({"R1", "S1", "R2"}) == ["S1", "R2", "R1"]
+
+    def test_hostnames(self, index):
+        assert index.hostnames(["r1.example.com", "unknown"]) == {"R1"}
+
+    def test_hosts_are_indexed_once(self, index, monkeypatch):
+        assert index.tagged(["tag1"]) == {"R1"}
+        monkeypatch.setattr(Host, "extended_groups", None)
+        assert index.grouped(["site1"]) == {"R1", "R3"}
+
+    def test_matching(self, index):
+        assert index.matching(["R*"]) == {"R1", "R2", "R3"}
+        assert index.matching(["?1", "R[23]"]) == {"S1", "R1", "X1", "R2", "R3"}
+        assert index.matching(["r*"]) == set()
+
+    def test_matching_regex(self, index):
+        assert index.matching_regex([r"R\d"]) == {"R1", "R2", "R3"}
+        assert index.matching_regex(["R", "S1|X1"]) == {"S1", "X1"}
+        assert index.matching_regex(["R1?"]) == {"R1"}
+        assert index.matching_regex(["R?1?"]) == {"R1"}
+
+    def test_patterns_are_matched_once(self, index, monkeypatch):
+        assert index.matching(["R*"]) == {"R1", "R2", "R3"}
+        monkeypatch.setattr(
+            "nuts.helpers.inventory_index.fnmatchcase", lambda *args: False
+        )
+        assert index.matching(["R*"]) == {"R1", "R2", "R3"}
+        assert index.matching(["S*"]) == set()
+
+
+@pytest.mark.parametrize(
+    "pattern, prefix",
+    [("core-*-zrh", "core-"), ("r[12]", "r"), ("?1", ""), ("r1", "r1")],
+)
+def test_glob_prefix(pattern, prefix):
+    assert glob_prefix(pattern) == prefix
+
+
+@pytest.mark.parametrize(
+    "pattern, prefix",
+    [
+        (r"core-\d+-zrh", "core-"),
+        ("core.zrh", "core"),
+        ("cores?", "core"),
+        ("cor{2}", "co"),
+        ("core+", "core"),
+        ("a|b", ""),
+        ("(?i)core", ""),
+    ],
+)
+def test_regex_prefix(pattern, prefix):
+    assert regex_prefix(pattern) == prefix
+
+
+def test_index_is_kept_per_inventory(pytestconfig, inventory):
+    index = get_inventory_index(pytestconfig, inventory)
+    assert get_inventory_index(pytestconfig, inventory) is index
+    assert get_inventory_index(None, inventory) is not index
@@ -0,0 +1,67 @@
+import threading
+import time
+from typing import Callable, List
+
+from nuts.helpers.locks import HostLocks
+
+
+def run_in_thread(target: Callable[[], None]) -> threading.Thread:
+    thread = threading.Thread(target=target)
+    thread.start()
+    return thread
+
+
+def test_hosts_are_held_by_one_context_at_a_time():
+    locks = HostLocks()
+    events: List[str] = []
+
+    def second() -> None:
+        with locks.hold(["R2", "R1"]):
+            events.append("second")
+
+    with locks.hold(["R1"]):
+        thread = run_in_thread(second)
+        time.sleep(0.1)
+        events.append("first")
+    thread.join(timeout=5)
+
+    assert events == ["first", "second"]
+
+
+def test_different_hosts_are_held_at_the_same_time():
+    locks = HostLocks()
+    held = threading.Event()
+
+    def second() -> None:
+        with locks.hold(["R2"]):
+            held.set()
+
+    with locks.hold(["R1"]):
+        thread = run_in_thread(second)
+        assert held.wait(timeout=5)
+    thread.join(timeout=5)
+
+
+def test_exclusive_waits_for_all_hosts():
+    locks = HostLocks()
+    events: List[str] = []
+
+    def exclusive() -> None:
+        with locks.exclusive():
+            events.append("exclusive")
+
+    def later() -> None:
+        with locks.hold(["R2"]):
+            events.append("later")
+
+    with locks.hold(["R1"]):
+        first = run_in_thread(exclusive)
+        time.sleep(0.1)
+        # waits for the exclusive context which has been waiting before
+        second = run_in_thread(later)
+        time.sleep(0.1)
+        events.append("first")
+    first.join(timeout=5)
+    second.join(timeout=5)
+
+    assert events == ["first", "exclusive", "later"]
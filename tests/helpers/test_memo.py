@@ -0,0 +1,173 @@
+import threading
+from typing import Any, Dict, List
+
+import pytest
+from nornir.core import Nornir
+from nornir.core.inventory import Inventory, Hosts, Groups, Host
+from nornir.core.task import Result, Task
+from nornir.plugins.runners import SerialRunner, ThreadedRunner
+
+from nuts.context import NornirNutsContext
+from nuts.helpers.memo import TaskMemo, normalize_arguments
+
+CALLS: List[str] = []
+
+
+def count_task(task: Task, command: str, event: Any = None) -> Result:
+    CALLS.append(task.host.name)
+    if task.host.name == "R2":
+        raise ConnectionError("R2 is down")
+    return Result(host=task.host, result=f"{task.host.name}: {command}")
+
+
+class TaskContext(NornirNutsContext):
+    def __init__(self, **arguments: Any) -> None:
+        super().__init__()
+        self.arguments = arguments
+
+    def nuts_task(self):
+        return count_task
+
+    def nuts_arguments(self):
+        return self.arguments
+
+
+@pytest.fixture(autouse=True)
+def reset_calls() -> None:
+    CALLS.clear()
+
+
+@pytest.fixture
+def nornir() -> Nornir:
+    hosts = Hosts({"R1": Host(name="R1"), "R2": Host(name="R2")})
+    return Nornir(
+        inventory=Inventory(hosts=hosts, groups=Groups()), runner=SerialRunner()
+    )
+
+
+def test_normalize_arguments():
+    assert normalize_arguments({"b": 1, "a": [1, 2]}) == normalize_arguments(
+        {"a": [1, 2], "b": 1}
+    )
+    assert normalize_arguments({"a": object()}) is None
+
+
+def test_identical_tasks_are_run_once(nornir):
+    memo = TaskMemo()
+    first = TaskContext(command="show version")
+    second = TaskContext(command="show version")
+    memo.add(first, ["R1"])
+    memo.add(second, ["R1"])
+    r1 = nornir.filter(filter_func=lambda h: h.name == "R1")
+
+    first_result = memo.run(first, r1)
+    second_result = memo.run(second, r1)
+
+    assert CALLS == ["R1"]
+    assert first_result["R1"][0].result == "R1: show version"
+    assert second_result["R1"] is first_result["R1"]
+    # released after the last planned context
+    assert len(memo) == 0
+
+
+def test_released_tasks_are_not_kept(nornir):
+    memo = TaskMemo()
+    first = TaskContext(command="show version")
+    second = TaskContext(command="show version")
+    memo.add(first, ["R1"])
+    memo.add(second, ["R1"])
+    memo.release(second, ["R1"])
+
+    memo.run(first, nornir.filter(filter_func=lambda h: h.name == "R1"))
+    assert len(memo) == 0
+    assert not memo._pending
+
+
+def test_different_arguments_are_not_shared(nornir):
+    memo = TaskMemo()
+    first = TaskContext(command="show version")
+    second = TaskContext(command="show clock")
+    memo.add(first, ["R1"])
+    memo.add(second, ["R1"])
+    r1 = nornir.filter(filter_func=lambda h: h.name == "R1")
+
+    memo.run(first, r1)
+    memo.run(second, r1)
+
+    assert CALLS == ["R1", "R1"]
+
+
+def test_failed_results_are_not_reused(nornir):
+    memo = TaskMemo()
+    first = TaskContext(command="show version")
+    second = TaskContext(command="show version")
+    memo.add(first, ["R1", "R2"])
+    memo.add(second, ["R1", "R2"])
+
+    first_result = memo.run(first, nornir)
+    assert first_result["R2"].failed
+    memo.run(second, nornir)
+
+    assert CALLS == ["R1", "R2", "R2"]
+
+
+def test_concurrent_requests_share_a_single_flight():
+    hosts = Hosts({"R1": Host(name="R1")})
+    nornir = Nornir(
+        inventory=Inventory(hosts=hosts, groups=Groups()), runner=ThreadedRunner()
+    )
+    started = threading.Event()
+    release = threading.Event()
+
+    def blocking_task(task: Task) -> Result:
+        CALLS.append(task.host.name)
+        started.set()
+        release.wait(5)
+        return Result(host=task.host, result="done")
+
+    class BlockingContext(NornirNutsContext):
+        def nuts_task(self):
+            return blocking_task
+
+        def nuts_arguments(self):
+            return {}
+
+    memo = TaskMemo()
+    contexts = [BlockingContext(), BlockingContext()]
+    for ctx in contexts:
+        memo.add(ctx, ["R1"])
+    results: Dict[int, Any] = {}
+
+    def run(index: int) -> None:
+        results[index] = memo.run(contexts[index], nornir)
+
+    first = threading.Thread(target=run, args=(0,))
+    first.start()
+    assert started.wait(5)
+    second = threading.Thread(target=run, args=(1,))
+    second.start()
+    release.set()
+    first.join(5)
+    second.join(5)
+
+    assert CALLS == ["R1"]
+    assert results[0]["R1"] is results[1]["R1"]
+
+
+def test_reports_results_per_host(nornir):
+    memo = TaskMemo()
+    first = TaskContext(command="show version")
+    second = TaskContext(command="show version")
+    memo.add(first, ["R1", "R2"])
+    memo.add(second, ["R1"])
+    reported: Dict[str, Any] = {}
+
+    memo.run(first, nornir, lambda host, result: reported.update({host: result}))
+    assert set(reported) == {"R1", "R2"}
+    assert reported["R2"].failed
+
+    reported.clear()
+    r1 = nornir.filter(filter_func=lambda h: h.name == "R1")
+    memo.run(second, r1, lambda host, result: reported.update({host: result}))
+    assert reported["R1"][0].result == "R1: show version"
+    assert CALLS == ["R1", "R2"]
@@ -0,0 +1,75 @@
+from types import SimpleNamespace
+from typing import Any
+
+from nuts.helpers.outcomes import (
+    FAILED,
+    PASSED,
+    HostOutcomes,
+    item_host,
+    narrow_test_data,
+)
+
+
+def make_item(nodeid, host=None):
+    entry = {"host": host} if host is not None else {}
+    return SimpleNamespace(
+        nodeid=nodeid, callspec=SimpleNamespace(params={"nuts_test_entry": entry})
+    )
+
+
+def make_report(nodeid, failed):
+    return SimpleNamespace(nodeid=nodeid, failed=failed)
+
+
+def test_item_host():
+    assert item_host(make_item("test[R1_]", "R1")) == "R1"
+    assert item_host(make_item("test")) is None
+    unparametrized: Any = SimpleNamespace(nodeid="test")
+    assert item_host(unparametrized) is None
+
+
+class TestHostOutcomes:
+    def test_host_fails_if_any_test_fails(self):
+        outcomes = HostOutcomes({})
+        items = [make_item("a[R1_]", "R1"), make_item("b[R1_]", "R1")]
+        outcomes.add(items, "class")
+        outcomes.report(make_report("a[R1_]", failed=True))
+        outcomes.report(make_report("b[R1_]", failed=False))
+        assert outcomes.current == {"class": {"R1": FAILED}}
+
+    def test_untracked_reports_are_ignored(self):
+        outcomes = HostOutcomes({})
+        outcomes.report(make_report("a[R1_]", failed=True))
+        assert outcomes.current == {}
+
+    def test_select_hosts_which_failed(self):
+        outcomes = HostOutcomes({"class": {"R1": FAILED, "R2": PASSED}})
+        items = [
+            make_item("a[R1_]", "R1"),
+            make_item("a[R2_]", "R2"),
+            make_item("a[R3_]", "R3"),
+        ]
+        deselected, hosts = outcomes.select(items, "class")
+        assert deselected == [items[1]]
+        assert hosts == {"R1", "R3"}
+
+    def test_unknown_class_is_selected(self):
+        outcomes = HostOutcomes({"class": {"R1": PASSED}})
+        items = [make_item("a[R1_]", "R1")]
+        assert outcomes.select(items, "other") == ([], {"R1"})
+
+    def test_has_failures(self):
+        assert not HostOutcomes({"class": {"R1": PASSED}}).has_failures()
+        assert HostOutcomes({"class": {"R1": FAILED}}).has_failures()
+
+    def test_merged_keeps_hosts_which_have_not_run(self):
+        outcomes = HostOutcomes({"class": {"R1": FAILED, "R2": PASSED}})
+        outcomes.add([make_item("a[R1_]", "R1")], "class")
+        outcomes.report(make_report("a[R1_]", failed=False))
+        assert outcomes.merged() == {"class": {"R1": PASSED, "R2": PASSED}}
+
+
+def test_narrow_test_data():
+    test_data = [{"host": "R1", "x": 1}, {"host": "R2", "x": 2}]
+    assert narrow_test_data(test_data, {"R2"}) == [{"host": "R2", "x": 2}]
+    assert narrow_test_data([{"name": "a"}], set()) == [{"name": "a"}]
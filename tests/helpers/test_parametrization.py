@@ -0,0 +1,112 @@
+import json
+
+import pytest
+
+from nuts.helpers.parametrization import (
+    PARAMETRIZATION_CACHE_KEY,
+    ExpandedTestData,
+    HostEntry,
+    get_inventory_fingerprint,
+    load_expanded,
+    parametrization_key,
+    set_inventory_fingerprint,
+)
+
+
+class TestParametrizationKey:
+    def test_key_of_selected_hosts(self):
+        key = parametrization_key([{"tags": ["router"]}], "abc")
+        assert key is not None
+        assert key.startswith(f"{PARAMETRIZATION_CACHE_KEY}/")
+
+    def test_key_depends_on_data_and_fingerprint(self):
+        key = parametrization_key([{"tags": ["router"]}], "abc")
+        assert key == parametrization_key([{"tags": ["router"]}], "abc")
+        assert key != parametrization_key([{"tags": ["switch"]}], "abc")
+        assert key != parametrization_key([{"tags": ["router"]}], "def")
+
+    @pytest.mark.parametrize(
+        "test_data, fingerprint",
+        [
+            ([{"tags": ["router"]}], None),
+            ([{"host": "R1"}], "abc"),
+            ([], "abc"),
+            (None, "abc"),
+            ([{"groups": ["site1"], 1: "integer key"}], "abc"),
+            ([{"groups": ["site1"], "value": {1, 2}}], "abc"),
+        ],
+    )
+    def test_no_key(self, test_data, fingerprint):
+        assert parametrization_key(test_data, fingerprint) is None
+
+
+def test_inventory_fingerprint_of_config_file(pytestconfig, tmp_path):
+    config_file = tmp_path / "nr-config.yaml"
+    assert get_inventory_fingerprint(pytestconfig, config_file) is None
+    set_inventory_fingerprint(pytestconfig, config_file, "abc")
+    assert get_inventory_fingerprint(pytestconfig, config_file) == "abc"
+    assert get_inventory_fingerprint(pytestconfig, tmp_path / "other.yaml") is None
+
+
+class TestHostEntry:
+    def test_mapping(self):
+        entry = HostEntry({"destination": "10.0.0.1"}, "R1")
+        assert entry == {"destination": "10.0.0.1", "host": "R1"}
+        assert list(entry) == ["destination", "host"]
+        assert len(entry) == 2
+        assert "host" in entry and "source" not in entry
+        assert "{host}_{destination}".format(**entry) == "R1_10.0.0.1"
+        assert repr(entry) == "{'destination': '10.0.0.1', 'host': 'R1'}"
+
+
+class TestExpandedTestData:
+    @pytest.fixture
+    def test_data(self):
+        return ExpandedTestData([({"values": [1, 2]}, ["R1", "R2"]), ({}, ["S1"])])
+
+    def test_sequence_of_dicts(self, test_data):
+        assert len(test_data) == 3
+        assert test_data == [
+            {"values": [1, 2], "host": "R1"},
+            {"values": [1, 2], "host": "R2"},
+            {"host": "S1"},
+        ]
+        assert test_data[1] == {"values": [1, 2], "host": "R2"}
+        assert test_data[-1] == {"host": "S1"}
+        assert test_data[1:] == [{"values": [1, 2], "host": "R2"}, {"host": "S1"}]
+        with pytest.raises(IndexError):
+            test_data[3]
+
+    def test_entries_are_modifiable_and_serializable(self, test_data):
+        first = test_data[0]
+        first["source"] = "lo0"
+        assert test_data[0] == {"values": [1, 2], "host": "R1"}
+        assert json.loads(json.dumps(list(test_data))) == list(test_data)
+
+    def test_host_entries_share_their_fields(self, test_data):
+        first, second, _ = test_data.host_entries()
+        assert first == {"values": [1, 2], "host": "R1"}
+        assert first["values"] is second["values"]
+        assert list(test_data.hosts()) == ["R1", "R2", "S1"]
+
+    def test_narrow(self, test_data):
+        assert test_data.narrow({"R2", "S1"}) == [
+            {"values": [1, 2], "host": "R2"},
+            {"host": "S1"},
+        ]
+        assert test_data.narrow(set()) == []
+
+
+@pytest.mark.parametrize(
+    "cached, expected",
+    [
+        ([[{"a": 1}, ["R1"]]], [({"a": 1}, ["R1"])]),
+        ([], []),
+        (None, None),
+        ([{"host": "R1"}], None),
+        ([[{"a": 1}]], None),
+        ([[{"a": 1}, "R1"]], None),
+    ],
+)
+def test_load_expanded(cached, expected):
+    assert load_expanded(cached) == expected
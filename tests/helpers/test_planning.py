@@ -0,0 +1,146 @@
+from typing import Any, Dict, List
+from unittest.mock import Mock
+
+import pytest
+from nornir.core import Nornir
+from nornir.core.inventory import Inventory, Hosts, Groups, Host
+from nornir.plugins.runners import SerialRunner
+from nornir_napalm.plugins.tasks import napalm_get
+
+from nuts.context import NornirNutsContext
+from nuts.helpers.planning import GetterPlan, coalescible_getters
+
+
+class FakeDevice:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.calls: List[str] = []
+
+    def get_vlans(self) -> Dict[str, Any]:
+        self.calls.append("vlans")
+        return {"1": {"name": f"{self.name}-default", "interfaces": []}}
+
+    def get_users(self) -> Dict[str, Any]:
+        self.calls.append("users")
+        return {"admin": {"level": 15}}
+
+    def get_interfaces(self) -> Dict[str, Any]:
+        self.calls.append("interfaces")
+        raise NotImplementedError("interfaces are not supported")
+
+
+class GetterContext(NornirNutsContext):
+    def __init__(self, getters: List[str], **arguments: Any) -> None:
+        super().__init__()
+        self.getters = getters
+        self.arguments = arguments
+
+    def nuts_task(self):
+        return napalm_get
+
+    def nuts_arguments(self):
+        return {"getters": self.getters, **self.arguments}
+
+
+@pytest.fixture
+def devices() -> Dict[str, FakeDevice]:
+    return {"R1": FakeDevice("R1"), "R2": FakeDevice("R2")}
+
+
+@pytest.fixture
+def nornir(devices: Dict[str, FakeDevice]) -> Nornir:
+    hosts = Hosts()
+    for name, device in devices.items():
+        hosts[name] = Host(name=name)
+        hosts[name].connections["napalm"] = Mock(connection=device)
+    return Nornir(
+        inventory=Inventory(hosts=hosts, groups=Groups()), runner=SerialRunner()
+    )
+
+
+def test_coalescible_getters():
+    assert coalescible_getters(GetterContext(["vlans"])) == ["vlans"]
+    assert coalescible_getters(GetterContext(["vlans"], retrieve="all")) is None
+
+
+def test_merges_getters_of_planned_contexts(nornir, devices):
+    plan = GetterPlan()
+    vlans = GetterContext(["vlans"])
+    users = GetterContext(["users"])
+    plan.add(vlans, ["R1", "R2"])
+    plan.add(users, ["R1"])
+
+    vlans_result = plan.run(vlans, nornir)
+    assert devices["R1"].calls == ["vlans", "users"]
+    assert devices["R2"].calls == ["vlans"]
+    assert vlans_result["R1"][0].result == {
+        "vlans": {"1": {"name": "R1-default", "interfaces": []}}
+    }
+
+    users_result = plan.run(users, nornir.filter(filter_func=lambda h: h.name == "R1"))
+    assert devices["R1"].calls == ["vlans", "users"]
+    assert users_result["R1"][0].result == {"users": {"admin": {"level": 15}}}
+
+
+def test_results_are_released_once_consumed(nornir):
+    plan = GetterPlan()
+    vlans = GetterContext(["vlans"])
+    users = GetterContext(["users"])
+    plan.add(vlans, ["R1"])
+    plan.add(users, ["R1"])
+    r1 = nornir.filter(filter_func=lambda h: h.name == "R1")
+
+    plan.run(vlans, r1)
+    assert list(plan._results) == [("R1", "users")]
+
+    plan.run(users, r1)
+    assert not plan._results
+
+
+def test_released_getters_are_not_fetched(nornir, devices):
+    plan = GetterPlan()
+    vlans = GetterContext(["vlans"])
+    users = GetterContext(["users"])
+    plan.add(vlans, ["R1"])
+    plan.add(users, ["R1"])
+    plan.release(users, ["R1"])
+
+    plan.run(vlans, nornir.filter(filter_func=lambda h: h.name == "R1"))
+    assert devices["R1"].calls == ["vlans"]
+    assert not plan._pending
+    assert not plan._results
+
+
+def test_failing_additional_getter_is_retried_alone(nornir, devices):
+    plan = GetterPlan()
+    vlans = GetterContext(["vlans"])
+    interfaces = GetterContext(["interfaces"])
+    plan.add(vlans, ["R1"])
+    plan.add(interfaces, ["R1"])
+    r1 = nornir.filter(filter_func=lambda h: h.name == "R1")
+
+    vlans_result = plan.run(vlans, r1)
+    assert not vlans_result["R1"].failed
+    assert devices["R1"].calls == ["vlans", "interfaces", "vlans"]
+
+    interfaces_result = plan.run(interfaces, r1)
+    assert interfaces_result["R1"].failed
+    assert isinstance(interfaces_result["R1"][0].exception, NotImplementedError)
+
+
+def test_reports_sliced_results_per_host(nornir):
+    plan = GetterPlan()
+    vlans = GetterContext(["vlans"])
+    users = GetterContext(["users"])
+    plan.add(vlans, ["R1", "R2"])
+    plan.add(users, ["R1"])
+    reported: Dict[str, Any] = {}
+
+    plan.run(vlans, nornir, lambda host, result: reported.update({host: result}))
+    assert set(reported) == {"R1", "R2"}
+    assert set(reported["R1"][0].result) == {"vlans"}
+
+    reported.clear()
+    r1 = nornir.filter(filter_func=lambda h: h.name == "R1")
+    plan.run(users, r1, lambda host, result: reported.update({host: result}))
+    assert set(reported["R1"][0].result) == {"users"}
@@ -0,0 +1,115 @@
+import asyncio
+import socket
+from typing import Any, Iterator
+
+import pytest
+from nornir.core.inventory import ConnectionOptions, Host
+from nornir_napalm.plugins.tasks import napalm_get
+
+from nuts.helpers.preflight import Preflight, address, connection_plugin, probe
+
+
+@pytest.fixture
+def open_port() -> Iterator[int]:
+    with socket.socket() as server:
+        server.bind(("127.0.0.1", 0))
+        server.listen()
+        yield server.getsockname()[1]
+
+
+@pytest.fixture
+def closed_port() -> int:
+    with socket.socket() as server:
+        server.bind(("127.0.0.1", 0))
+        return server.getsockname()[1]
+
+
+def test_address_uses_port_of_connection_plugin():
+    host = Host(
+        name="R1",
+        hostname="10.0.0.1",
+        platform="eos",
+        connection_options={"netmiko": ConnectionOptions(port=2222)},
+    )
+
+    assert address(host, "napalm") == ("10.0.0.1", 443)
+    assert address(host, "netmiko") == ("10.0.0.1", 2222)
+    assert address(Host(name="R1", platform="junos"), "napalm") == ("R1", 830)
+    assert address(Host(name="R1", port=8443, platform="eos"), "napalm") == (
+        "R1",
+        8443,
+    )
+
+
+def test_address_without_known_port():
+    assert address(Host(name="R1", platform="unknown"), "napalm") is None
+    assert address(Host(name="R1"), None) is None
+    assert address(Host(name="R1", port=830), None) == ("R1", 830)
+
+
+def test_connection_plugin():
+    class NapalmContext:
+        def nuts_task(self):
+            return napalm_get
+
+    class CustomContext:
+        def nuts_task(self):
+            return lambda task: None
+
+    assert connection_plugin(NapalmContext()) == "napalm"  # type: ignore[arg-type]
+    assert connection_plugin(CustomContext()) is None  # type: ignore[arg-type]
+
+
+def test_probe_reports_unreachable_targets(open_port, closed_port):
+    failures = probe(
+        [("127.0.0.1", open_port), ("127.0.0.1", closed_port)],
+        timeout=2,
+        concurrency=10,
+    )
+
+    assert list(failures) == [("127.0.0.1", closed_port)]
+    assert isinstance(failures[("127.0.0.1", closed_port)], ConnectionRefusedError)
+
+
+def test_probe_times_out(monkeypatch):
+    async def hang(*args: Any) -> None:
+        await asyncio.sleep(5)
+
+    monkeypatch.setattr(asyncio, "open_connection", hang)
+    failures = probe([("10.0.0.1", 22)], timeout=0.01, concurrency=10)
+
+    assert isinstance(failures[("10.0.0.1", 22)], TimeoutError)
+
+
+def test_planned_hosts_are_probed_once(monkeypatch, open_port, closed_port):
+    probed = []
+
+    def count_probe(targets, timeout, concurrency):
+        targets = list(targets)
+        probed.append(targets)
+        return probe(targets, timeout, concurrency)
+
+    monkeypatch.setattr("nuts.helpers.preflight.probe", count_probe)
+    r1 = Host(name="R1", hostname="127.0.0.1", port=open_port)
+    r2 = Host(name="R2", hostname="127.0.0.1", port=closed_port)
+    preflight = Preflight(timeout=2, concurrency=10)
+    preflight.add([r1, r2])
+
+    assert preflight.check([r1]) == {}
+    assert list(preflight.check([r1, r2])) == ["R2"]
+    assert len(probed) == 1
+    assert len(probed[0]) == 2
+
+
+def test_hosts_without_port_are_not_probed(monkeypatch):
+    probed = []
+
+    def count_probe(targets, timeout, concurrency):
+        probed.extend(targets)
+        return {}
+
+    monkeypatch.setattr("nuts.helpers.preflight.probe", count_probe)
+    preflight = Preflight(timeout=2, concurrency=10)
+
+    assert preflight.check([Host(name="R1")]) == {}
+    assert probed == []
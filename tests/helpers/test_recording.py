@@ -0,0 +1,132 @@
+import json
+from typing import Any
+
+import pytest
+from nornir.core.inventory import Host
+from nornir.core.task import AggregatedResult, MultiResult, Result
+
+from nuts.context import NornirNutsContext
+from nuts.helpers.errors import NutsRecordedError, NutsSetupError
+from nuts.helpers.recording import Recording, dump_result, load_result, recording_id
+
+
+def ping(task: Any, count: int) -> Result:
+    return Result(host=task.host)
+
+
+class PingContext(NornirNutsContext):
+    def __init__(self, count: int = 5) -> None:
+        super().__init__({"test_execution": {"count": count}})
+
+    def nuts_task(self):
+        return ping
+
+
+def recorded_results(host: Host) -> AggregatedResult:
+    multi_result = MultiResult("ping")
+    multi_result.append(Result(host=host, result="All pings executed", name="ping"))
+    multi_result.append(
+        Result(
+            host=host,
+            result={"success": {"packet_loss": 0}},
+            name="napalm_ping",
+            destination="10.0.0.1",
+        )
+    )
+    multi_result.append(
+        Result(
+            host=host,
+            failed=True,
+            exception=ConnectionRefusedError("refused"),
+            name="napalm_ping",
+            destination="10.0.0.2",
+        )
+    )
+    results = AggregatedResult("ping")
+    results[host.name] = multi_result
+    return results
+
+
+def test_result_survives_round_trip():
+    host = Host(name="R1")
+    original = Result(host=host, result={"a": [1, 2]}, changed=True, name="t")
+    loaded = load_result(host, json.loads(json.dumps(dump_result(original))))
+    assert loaded.host is host
+    assert loaded.result == {"a": [1, 2]}
+    assert loaded.changed
+    assert not loaded.failed
+    assert loaded.exception is None
+    assert loaded.name == "t"
+
+
+def test_exception_is_replayed_as_recorded_error():
+    host = Host(name="R1")
+    original = Result(host=host, failed=True, exception=TimeoutError("too slow"))
+    loaded = load_result(host, dump_result(original))
+    assert loaded.failed
+    assert isinstance(loaded.exception, NutsRecordedError)
+    assert loaded.exception.type_name == "TimeoutError"
+    assert str(loaded.exception) == "TimeoutError: too slow"
+
+
+def test_replays_recorded_results(tmp_path):
+    host = Host(name="R1")
+    recording = Recording(tmp_path / "recorded", replay=False)
+    recording.record(PingContext(), recorded_results(host))
+
+    replayed = Recording(tmp_path / "recorded", replay=True).load(
+        PingContext(), [host]
+    )["R1"]
+
+    assert [r.result for r in replayed] == [
+        "All pings executed",
+        {"success": {"packet_loss": 0}},
+        None,
+    ]
+    assert [getattr(r, "destination", None) for r in replayed] == [
+        None,
+        "10.0.0.1",
+        "10.0.0.2",
+    ]
+    assert replayed[2].failed
+    assert "refused" in str(replayed[2].exception)
+
+
+class DestinationsContext(NornirNutsContext):
+    def __init__(self, *destinations: str) -> None:
+        super().__init__(
+            {
+                "test_data": [
+                    {"host": "R1", "destination": destination}
+                    for destination in destinations
+                ]
+            }
+        )
+
+    def nuts_task(self):
+        return self.ping_destinations
+
+    def ping_destinations(self, task: Any) -> Result:
+        return Result(host=task.host)
+
+
+def test_tasks_of_the_context_are_recorded_per_test_data(tmp_path):
+    host = Host(name="R1")
+    recording = Recording(tmp_path, replay=False)
+    recording.record(DestinationsContext("10.0.0.1"), recorded_results(host))
+    recording.record(DestinationsContext("10.0.0.2"), recorded_results(host))
+
+    assert len(list(tmp_path.iterdir())) == 2
+    assert recording_id(PingContext(), "R1") == recording_id(PingContext(), "R1")
+    assert "test_data" not in recording_id(PingContext(), "R1")
+
+
+@pytest.mark.parametrize("host_name, count", [("R2", 5), ("R1", 3)])
+def test_hosts_without_recording_fail(tmp_path, host_name, count):
+    recording = Recording(tmp_path, replay=False)
+    recording.record(PingContext(), recorded_results(Host(name="R1")))
+
+    replayed = recording.load(PingContext(count), [Host(name=host_name)])
+
+    assert replayed[host_name].failed
+    assert isinstance(replayed[host_name].exception, NutsSetupError)
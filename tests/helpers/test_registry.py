@@ -0,0 +1,50 @@
+from unittest.mock import Mock
+
+from nornir.core import Nornir
+from nornir.core.inventory import Inventory, Hosts, Groups, Host
+
+from nuts.helpers.registry import NornirRegistry, get_nornir_registry
+
+
+def create_nornir() -> Nornir:
+    hosts = Hosts({"R1": Host(name="R1"), "R2": Host(name="R2")})
+    return Nornir(inventory=Inventory(hosts=hosts, groups=Groups()))
+
+
+def test_loader_called_once_per_config():
+    registry = NornirRegistry()
+    loader = Mock(side_effect=create_nornir)
+
+    first = registry.get("nr-config.yaml", loader)
+    second = registry.get("./nr-config.yaml", loader)
+
+    assert first is second
+    loader.assert_called_once()
+
+
+def test_inventory_options_are_part_of_the_key():
+    registry = NornirRegistry()
+    loader = Mock(side_effect=create_nornir)
+
+    first = registry.get("nr-config.yaml", loader)
+    second = registry.get("nr-config.yaml", loader, inventory={"plugin": "Other"})
+
+    assert first is not second
+    assert loader.call_count == 2
+
+
+def test_view_shares_inventory_but_not_state():
+    registry = NornirRegistry()
+    shared = registry.get("nr-config.yaml", create_nornir)
+    shared.data.failed_hosts.add("R1")
+
+    view = registry.view("nr-config.yaml", create_nornir)
+
+    assert view is not shared
+    assert view.inventory is shared.inventory
+    assert view.config is shared.config
+    assert not view.data.failed_hosts
+
+
+def test_registry_is_stored_per_session(request):
+    assert get_nornir_registry(request.config) is get_nornir_registry(request.config)
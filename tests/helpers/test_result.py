@@ -1,14 +1,26 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
 import pytest
 
-from nuts.context import NutsContext
+from nuts.context import NutsContext, NornirNutsContext
 from tests.utils import YAML_EXTENSION
 
-from nuts.helpers.errors import NutsUnvalidatedResultError
+from nuts.helpers.errors import NutsSetupError, NutsUnvalidatedResultError
 from unittest.mock import Mock
 
-from nornir.core.task import Result
+from nornir.core import Nornir
+from nornir.core.inventory import Inventory, Hosts, Groups, Host
+from nornir.core.task import AggregatedResult, MultiResult, Result, Task
+from nornir.plugins.runners import ThreadedRunner
 
-from nuts.helpers.result import AbstractResultExtractor
+from nuts.helpers.result import (
+    AbstractHostDestResultExtractor,
+    AbstractHostResultExtractor,
+    AbstractResultExtractor,
+    StreamedResult,
+)
 
 
 def test_check_result(pytester):
@@ -63,3 +75,163 @@ class TestNutsResultWrapper:
         wrapped = extractor.nuts_result_wrapper(Result(host=None, failed=False))
         assert wrapped.failed
         assert wrapped.exception == thrown_exception
+
+
+def multi_result(host: str, value: str) -> MultiResult:
+    multi_result = MultiResult("task")
+    multi_result.append(Result(host=Host(name=host), result=value))
+    return multi_result
+
+
+def identity(general_result: AggregatedResult) -> Dict[str, Any]:
+    return {host: result[0].result for host, result in general_result.items()}
+
+
+class TestStreamedResult:
+    def test_host_is_available_before_task_has_completed(self):
+        release = threading.Event()
+
+        def general_result(on_host_result):
+            on_host_result("R1", multi_result("R1", "first"))
+            release.wait(5)
+            on_host_result("R2", multi_result("R2", "second"))
+            return AggregatedResult("task")
+
+        streamed = StreamedResult(general_result, identity)
+        streamed.start()
+        assert streamed["R1"] == "first"
+        release.set()
+        assert dict(streamed) == {"R1": "first", "R2": "second"}
+
+    def test_adds_hosts_that_have_not_been_reported(self):
+        def general_result(on_host_result):
+            general_result = AggregatedResult("task")
+            general_result["R1"] = multi_result("R1", "first")
+            return general_result
+
+        streamed = StreamedResult(general_result, identity)
+        streamed.run()
+        assert dict(streamed) == {"R1": "first"}
+
+    def test_reraises_exception_of_task(self):
+        def general_result(on_host_result):
+            raise NutsSetupError("No Hosts found")
+
+        streamed = StreamedResult(general_result, identity)
+        streamed.start()
+        with pytest.raises(NutsSetupError):
+            streamed["R1"]
+        with pytest.raises(NutsSetupError):
+            len(streamed)
+
+    def test_unknown_host_is_missing_once_completed(self):
+        streamed = StreamedResult(lambda _: AggregatedResult("task"), identity)
+        streamed.start()
+        assert "R1" not in streamed
+        with pytest.raises(KeyError):
+            streamed["R1"]
+
+
+class StreamingContext(NornirNutsContext):
+    stream_results = True
+
+    def __init__(self, task):
+        super().__init__({"test_data": [{"host": "R1"}, {"host": "R2"}]})
+        self.task = task
+
+    def nuts_task(self):
+        return self.task
+
+    def nuts_extractor(self):
+        return ValueExtractor(self)
+
+
+class ValueExtractor(AbstractHostResultExtractor):
+    def single_transform(self, single_result):
+        return single_result[0].result
+
+
+def test_context_streams_results_of_single_hosts():
+    release = threading.Event()
+    released: List[bool] = []
+
+    def slow_on_r2(task: Task) -> Result:
+        if task.host.name == "R2":
+            released.append(release.wait(5))
+        return Result(host=task.host, result=task.host.name)
+
+    ctx = StreamingContext(slow_on_r2)
+    hosts = Hosts({"R1": Host(name="R1"), "R2": Host(name="R2")})
+    ctx.nornir = Nornir(
+        inventory=Inventory(hosts=hosts, groups=Groups()), runner=ThreadedRunner()
+    )
+
+    r1 = ctx.extractor.single_result({"host": "R1"})
+    r1.validate()
+    assert r1.result == "R1"
+    release.set()
+    r2 = ctx.extractor.single_result({"host": "R2"})
+    r2.validate()
+    assert r2.result == "R2"
+    # R1 has been available while R2 was still running
+    assert released == [True]
+
+
+class CountingContext(NutsContext):
+    def __init__(self) -> None:
+        super().__init__()
+        self.threads: List[str] = []
+
+    def general_result(self):
+        self.threads.append(threading.current_thread().name)
+        return {"R1": "result"}
+
+    def nuts_extractor(self):
+        return CountingExtractor(self)
+
+
+class CountingExtractor(AbstractResultExtractor):
+    def transform_result(self, general_result):
+        return general_result
+
+
+class TestPrefetch:
+    def test_prefetched_result_is_used(self):
+        ctx = CountingContext()
+        with ThreadPoolExecutor(thread_name_prefix="prefetch") as executor:
+            future = ctx.extractor.prefetch(executor)
+            assert future is not None
+            future.result()
+            assert ctx.extractor.prefetch(executor) is None
+            assert ctx.extractor.transformed_result == {"R1": "result"}
+        assert len(ctx.threads) == 1
+        assert ctx.threads[0].startswith("prefetch")
+
+    def test_fetches_itself_if_prefetch_has_not_started(self):
+        ctx = CountingContext()
+        release = threading.Event()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            executor.submit(release.wait, 5)
+            future = ctx.extractor.prefetch(executor)
+            assert ctx.extractor.transformed_result == {"R1": "result"}
+            assert future is not None and future.cancelled()
+            release.set()
+        assert ctx.threads == [threading.current_thread().name]
+
+
+class DestinationExtractor(AbstractHostDestResultExtractor):
+    single_transform = Mock()
+
+
+def test_failed_host_fails_all_destinations():
+    exception = ConnectionRefusedError("refused")
+    multi_result = MultiResult("ping")
+    multi_result.append(Result(host=Host(name="R1"), failed=True, exception=exception))
+    general_result = AggregatedResult("ping")
+    general_result["R1"] = multi_result
+
+    transformed = DestinationExtractor(NutsContext()).transform_result(general_result)
+
+    assert "10.0.0.1" in transformed["R1"]
+    assert transformed["R1"]["10.0.0.1"].failed
+    assert transformed["R1"]["10.0.0.1"].exception is exception
@@ -0,0 +1,145 @@
+import json
+import os
+from typing import Any
+
+import pytest
+from nornir.core.inventory import Host
+from nornir.core.task import AggregatedResult, MultiResult, Result
+from nornir_napalm.plugins.tasks import napalm_get
+
+from nuts.context import NornirNutsContext
+from nuts.helpers.errors import NutsSetupError
+from nuts.helpers.result_cache import ResultCache, cache_ttl
+
+
+class GetterContext(NornirNutsContext):
+    def __init__(self, ttl: Any, getters: Any = ("users",)) -> None:
+        super().__init__({"test_execution": {"cache_ttl": ttl}})
+        self.getters = getters
+
+    def nuts_task(self):
+        return napalm_get
+
+    def nuts_arguments(self):
+        return {"getters": list(self.getters)} if self.getters else {}
+
+
+def results(*hosts: Host, failed: bool = False) -> AggregatedResult:
+    aggregated = AggregatedResult("napalm_get")
+    for host in hosts:
+        multi_result = MultiResult("napalm_get")
+        multi_result.append(
+            Result(
+                host=host,
+                result={"users": {"admin": {"level": 15}}},
+                failed=failed,
+                name="napalm_get",
+            )
+        )
+        aggregated[host.name] = multi_result
+    return aggregated
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResultCache(tmp_path, max_size=1024 * 1024)
+
+
+class TestCacheTtl:
+    @pytest.mark.parametrize(
+        "ttl, getters, expected",
+        [
+            (None, ["users"], None),
+            (0, ["users"], None),
+            (60, ["users"], 60),
+            ({"users": 3600, "bgp_neighbors": 30}, ["users"], 3600),
+            ({"users": 3600, "bgp_neighbors": 30}, ["users", "bgp_neighbors"], 30),
+            ({"users": 3600}, ["users", "bgp_neighbors"], None),
+        ],
+    )
+    def test_ttl(self, ttl, getters, expected):
+        assert cache_ttl(GetterContext(ttl, getters)) == expected
+
+    @pytest.mark.parametrize(
+        "ttl, getters",
+        [("1h", ["users"]), ({"users": "1h"}, ["users"]), ({"users": 60}, None)],
+    )
+    def test_invalid_ttl_raises_setup_error(self, ttl, getters):
+        with pytest.raises(NutsSetupError):
+            cache_ttl(GetterContext(ttl, getters))
+
+    def test_ttl_is_no_task_argument(self):
+        assert GetterContext(60).nuts_parameters["test_execution"]
+        assert "cache_ttl" in GetterContext(60).execution_settings()
+
+
+class TestResultCache:
+    def test_serves_stored_results(self, cache):
+        r1, r2 = Host(name="R1"), Host(name="R2")
+        cache.store(GetterContext(60), results(r1))
+
+        cached = cache.load(GetterContext(60), [r1, r2])
+
+        assert list(cached) == ["R1"]
+        assert cached["R1"][0].host is r1
+        assert cached["R1"][0].result == {"users": {"admin": {"level": 15}}}
+
+    def test_entries_are_keyed_by_arguments(self, cache):
+        r1 = Host(name="R1")
+        cache.store(GetterContext(60), results(r1))
+        assert cache.load(GetterContext(60, ["users", "vlans"]), [r1]) == {}
+
+    def test_entries_of_context_tasks_are_keyed_by_test_data(self, cache):
+        class PingContext(GetterContext):
+            def __init__(self, destination: str) -> None:
+                super().__init__(60)
+                self.nuts_parameters["test_data"] = [
+                    {"host": "R1", "destination": destination}
+                ]
+
+            def nuts_task(self):
+                return self.ping
+
+            def ping(self, task: Any) -> Result:
+                return Result(host=task.host)
+
+        r1 = Host(name="R1")
+        cache.store(PingContext("10.0.0.1"), results(r1))
+        assert list(cache.load(PingContext("10.0.0.1"), [r1])) == ["R1"]
+        assert cache.load(PingContext("10.0.0.2"), [r1]) == {}
+
+    def test_ignores_expired_results(self, cache):
+        r1 = Host(name="R1")
+        cache.store(GetterContext(60), results(r1))
+        for path in cache.directory.glob("*.json"):
+            entry = json.loads(path.read_text())
+            path.write_text(json.dumps({**entry, "stored": entry["stored"] - 61}))
+        assert cache.load(GetterContext(60), [r1]) == {}
+
+    def test_does_not_store_failed_results(self, cache):
+        r1 = Host(name="R1")
+        cache.store(GetterContext(60), results(r1, failed=True))
+        assert cache.load(GetterContext(60), [r1]) == {}
+
+    def test_does_not_cache_without_ttl(self, cache):
+        r1 = Host(name="R1")
+        cache.store(GetterContext(None), results(r1))
+        assert list(cache.directory.glob("*.json")) == []
+
+    def test_bypass_ignores_cached_results(self, cache):
+        r1 = Host(name="R1")
+        cache.store(GetterContext(60), results(r1))
+        cache.bypass = True
+        assert cache.load(GetterContext(60), [r1]) == {}
+
+    def test_evicts_least_recently_used_results(self, cache):
+        hosts = [Host(name=f"R{i}") for i in range(3)]
+        cache.store(GetterContext(60), results(*hosts))
+        paths = sorted(cache.directory.glob("*.json"))
+        for age, path in enumerate(paths):
+            os.utime(path, (1000 + age, 1000 + age))
+        cache.max_size = sum(path.stat().st_size for path in paths[1:])
+
+        cache.evict()
+
+        assert sorted(cache.directory.glob("*.json")) == paths[1:]
@@ -0,0 +1,248 @@
+import threading
+import time
+from typing import Any, Callable, Dict
+
+import pytest
+from nornir.core import Nornir
+from nornir.core.configuration import Config, RunnerConfig
+from nornir.core.inventory import (
+    Defaults,
+    Inventory,
+    Hosts,
+    Groups,
+    Group,
+    Host,
+    ParentGroups,
+)
+from nornir.core.plugins.runners import RunnersPluginRegister
+from nornir.core.task import Result, Task
+from nornir.plugins.runners import SerialRunner, ThreadedRunner
+
+from nuts.context import NornirNutsContext
+from nuts.helpers.errors import NutsDeadlineError, NutsSetupError
+from nuts.helpers.runners import (
+    MAX_CONCURRENCY_KEY,
+    ConcurrencyLimits,
+    build_runner,
+    deadline,
+)
+
+
+@pytest.fixture(autouse=True)
+def register_runners() -> None:
+    RunnersPluginRegister.auto_register()
+
+
+def make_nornir(limits: Any = None) -> Nornir:
+    core = Group(name="core")
+    groups = Groups({"core": core})
+    hosts = Hosts(
+        {
+            "R1": Host(name="R1", groups=ParentGroups([core])),
+            "R2": Host(name="R2", groups=ParentGroups([core])),
+            "R3": Host(name="R3", data={"tags": ["slow"]}),
+            "R4": Host(name="R4", data={"tags": ["slow"]}),
+        }
+    )
+    defaults = Defaults(data={MAX_CONCURRENCY_KEY: limits} if limits else {})
+    return Nornir(
+        inventory=Inventory(hosts=hosts, groups=groups, defaults=defaults),
+        runner=ThreadedRunner(num_workers=4),
+    )
+
+
+class ConcurrencyRecorder:
+    def __init__(self) -> None:
+        self.running: Dict[str, int] = {}
+        self.peak: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def task(self, task: Task) -> Result:
+        kind = "core" if task.host.name in ("R1", "R2") else "slow"
+        with self._lock:
+            self.running[kind] = self.running.get(kind, 0) + 1
+            self.peak[kind] = max(self.peak.get(kind, 0), self.running[kind])
+        time.sleep(0.05)
+        with self._lock:
+            self.running[kind] -= 1
+        return Result(host=task.host, result=task.host.name)
+
+
+class RecorderContext(NornirNutsContext):
+    def __init__(self, recorder: ConcurrencyRecorder, **test_execution: Any) -> None:
+        super().__init__({"test_data": [], "test_execution": test_execution})
+        self.recorder = recorder
+
+    def nuts_task(self):
+        return self.recorder.task
+
+
+class TestBuildRunner:
+    def test_builds_runner_of_plugin(self):
+        runner = build_runner(
+            make_nornir(), {"plugin": "threaded", "options": {"num_workers": 7}}
+        )
+        assert isinstance(runner, ThreadedRunner)
+        assert runner.num_workers == 7
+
+    def test_uses_configured_plugin_without_plugin(self):
+        nornir = make_nornir()
+        nornir.config = Config(
+            runner=RunnerConfig(plugin="threaded", options={"num_workers": 3})
+        )
+        runner = build_runner(nornir, {})
+        assert isinstance(runner, ThreadedRunner)
+        assert runner.num_workers == 3
+
+    @pytest.mark.parametrize(
+        "settings",
+        [
+            "threaded",
+            {"plugin": "does-not-exist"},
+            {"plugin": "serial", "options": {"num_workers": 2}},
+        ],
+    )
+    def test_raises_setup_error_on_invalid_settings(self, settings):
+        with pytest.raises(NutsSetupError):
+            build_runner(make_nornir(), settings)
+
+
+class TestConcurrencyLimits:
+    def test_limits_groups_and_tags(self):
+        recorder = ConcurrencyRecorder()
+        ctx = RecorderContext(recorder)
+        ctx.nornir = make_nornir({"groups": {"core": 1}, "tags": {"slow": 1}})
+
+        result = ctx.run_task(ctx.nornir)
+
+        assert recorder.peak == {"core": 1, "slow": 1}
+        assert not result.failed
+        assert [r.result for r in result["R3"]] == ["R3"]
+
+    def test_runs_without_limits(self):
+        recorder = ConcurrencyRecorder()
+        ctx = RecorderContext(recorder)
+        ctx.nornir = make_nornir()
+
+        ctx.run_task(ctx.nornir)
+
+        assert recorder.peak == {"core": 2, "slow": 2}
+
+    def test_semaphores_are_shared(self):
+        limits = ConcurrencyLimits()
+        nornir = make_nornir()
+        group_limits = {"groups": {"core": 1}}
+        r1 = limits.semaphores(nornir.inventory.hosts["R1"], group_limits)
+        r2 = limits.semaphores(nornir.inventory.hosts["R2"], group_limits)
+        r3 = limits.semaphores(nornir.inventory.hosts["R3"], group_limits)
+        assert len(r1) == 1
+        assert r1 == r2
+        assert r3 == []
+
+    def test_invalid_limits_raise_setup_error(self):
+        ctx = RecorderContext(ConcurrencyRecorder())
+        ctx.nornir = make_nornir({"groups": ["core"]})
+        with pytest.raises(NutsSetupError):
+            ctx.run_task(ctx.nornir)
+
+
+def test_runner_of_test_execution_is_used():
+    recorder = ConcurrencyRecorder()
+    ctx = RecorderContext(recorder, runner={"plugin": "serial"})
+    ctx.nornir = make_nornir()
+
+    configured = ctx.configure_runner(ctx.nornir)
+    assert isinstance(configured.runner, SerialRunner)
+    ctx.run_task(ctx.nornir)
+
+    assert recorder.peak == {"core": 1, "slow": 1}
+
+
+class TestDeadline:
+    @staticmethod
+    def hanging_task(release: threading.Event) -> Callable[[Task], Result]:
+        def task(task: Task) -> Result:
+            if task.host.name == "R1":
+                release.wait(5)
+            return Result(host=task.host, result=task.host.name)
+
+        return task
+
+    def test_abandons_hosts_after_deadline(self):
+        release = threading.Event()
+        ctx = RecorderContext(ConcurrencyRecorder(), deadline=0.1)
+        ctx.nuts_task = lambda: self.hanging_task(release)  # type: ignore
+        ctx.nornir = make_nornir()
+
+        start = time.monotonic()
+        result = ctx.run_task(ctx.nornir)
+        release.set()
+
+        assert time.monotonic() - start < 2
+        assert result["R1"].failed
+        assert isinstance(result["R1"].exception, NutsDeadlineError)
+        assert not result["R2"].failed
+        assert result["R2"].result == "R2"
+
+    def test_abandoned_hosts_are_reported_once(self):
+        release = threading.Event()
+        reported = []
+        ctx = RecorderContext(ConcurrencyRecorder(), deadline=0.1)
+        ctx.nuts_task = lambda: self.hanging_task(release)  # type: ignore
+        ctx.nornir = make_nornir()
+
+        ctx.run_task(
+            ctx.nornir, lambda host, result: reported.append((host, result.failed))
+        )
+        release.set()
+        time.sleep(0.1)
+
+        assert sorted(reported) == [
+            ("R1", True),
+            ("R2", False),
+            ("R3", False),
+            ("R4", False),
+        ]
+
+    def test_deadline_starts_after_limits_are_acquired(self):
+        def task(task: Task) -> Result:
+            time.sleep(0.15)
+            return Result(host=task.host, result=task.host.name)
+
+        ctx = RecorderContext(ConcurrencyRecorder(), deadline=0.25)
+        ctx.nuts_task = lambda: task  # type: ignore
+        ctx.nornir = make_nornir({"groups": {"core": 1}})
+
+        result = ctx.run_task(ctx.nornir)
+
+        assert not result.failed
+
+    def test_abandoned_hosts_with_limits_are_reported_once(self):
+        release = threading.Event()
+        reported = []
+        ctx = RecorderContext(ConcurrencyRecorder(), deadline=0.1)
+        ctx.nuts_task = lambda: self.hanging_task(release)  # type: ignore
+        ctx.nornir = make_nornir({"groups": {"core": 1}, "tags": {"slow": 1}})
+
+        result = ctx.run_task(
+            ctx.nornir, lambda host, result: reported.append((host, result.failed))
+        )
+        release.set()
+        time.sleep(0.1)
+
+        assert sorted(reported) == [
+            ("R1", True),
+            ("R2", False),
+            ("R3", False),
+            ("R4", False),
+        ]
+        assert isinstance(result["R1"].exception, NutsDeadlineError)
+
+    @pytest.mark.parametrize("value, expected", [(None, None), (0, None), (2, 2.0)])
+    def test_deadline(self, value, expected):
+        assert deadline(value) == expected
+
+    @pytest.mark.parametrize("value", ["soon", True, [1]])
+    def test_invalid_deadline_raises_setup_error(self, value):
+        with pytest.raises(NutsSetupError):
+            deadline(value)
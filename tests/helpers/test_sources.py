@@ -0,0 +1,77 @@
+import pytest
+
+from nuts.helpers.errors import NutsSetupError, NutsUsageError
+from nuts.helpers.sources import parse_bool, read_test_data
+
+TYPES = {"mtu": "int", "speed": "float", "is_up": "bool"}
+
+
+@pytest.mark.parametrize(
+    "name, content",
+    [
+        (
+            "interfaces.csv",
+            "host,name,mtu,speed,is_up\nR1,Gi1,1500,1e9,true\nR2,Gi2,,,no\n",
+        ),
+        (
+            "interfaces.tsv",
+            "host\tname\tmtu\tspeed\tis_up\nR1\tGi1\t1500\t1e9\tYes\nR2\tGi2\t\t\t0\n",
+        ),
+        (
+            "interfaces.ndjson",
+            '{"host": "R1", "name": "Gi1", "mtu": "1500", "speed": 1e9, "is_up": true}'
+            '\n\n{"host": "R2", "name": "Gi2", "is_up": "off"}\n',
+        ),
+    ],
+)
+def test_read_test_data(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_text(content)
+    assert list(read_test_data(path, TYPES)) == [
+        {"host": "R1", "name": "Gi1", "mtu": 1500, "speed": 1e9, "is_up": True},
+        {"host": "R2", "name": "Gi2", "is_up": False},
+    ]
+
+
+def test_untyped_cells_are_strings(tmp_path):
+    path = tmp_path / "interfaces.csv"
+    path.write_text("﻿host,mtu\nR1,1500\n")
+    assert list(read_test_data(path)) == [{"host": "R1", "mtu": "1500"}]
+
+
+def test_rows_are_read_lazily(tmp_path):
+    path = tmp_path / "interfaces.csv"
+    path.write_text("host,mtu\nR1,1500\nR2,invalid\n")
+    rows = read_test_data(path, {"mtu": "int"})
+    assert next(rows) == {"host": "R1", "mtu": 1500}
+    with pytest.raises(NutsUsageError, match="column 'mtu' of entry 2"):
+        next(rows)
+
+
+@pytest.mark.parametrize(
+    "name, content, types, message",
+    [
+        ("interfaces.xlsx", "", None, "Unsupported test_data_source"),
+        ("interfaces.csv", "host\n", {"mtu": "decimal"}, "Unsupported type"),
+        ("interfaces.csv", "host\nR1,R2\n", None, "more cells than the header"),
+        ("interfaces.ndjson", "[1, 2]\n", None, "must be a JSON object"),
+        ("interfaces.ndjson", "{\n", None, "interfaces.ndjson:1"),
+    ],
+)
+def test_invalid_source(tmp_path, name, content, types, message):
+    path = tmp_path / name
+    path.write_text(content)
+    with pytest.raises(NutsUsageError, match=message):
+        list(read_test_data(path, types))
+
+
+def test_missing_source(tmp_path):
+    with pytest.raises(NutsSetupError, match="Could not read test_data_source"):
+        list(read_test_data(tmp_path / "missing.csv"))
+
+
+def test_parse_bool():
+    assert parse_bool(" TRUE ") is True
+    assert parse_bool("no") is False
+    with pytest.raises(ValueError):
+        parse_bool("maybe")
@@ -136,6 +136,44 @@ def test_bundle_with_labels(pytester):
     )
 
 
+def test_test_data_source(pytester):
+    pytester.makepyfile(
+        interfaces="""
+        import pytest
+
+        class TestInterfaces:
+            @pytest.mark.nuts("host, mtu, is_up")
+            def test_typed_fields(self, nuts_test_entry, host, mtu, is_up):
+                assert host in ("R1", "R2", "R3")
+                assert nuts_test_entry["host"] == host
+                assert isinstance(mtu, int)
+                assert isinstance(is_up, bool)
+        """
+    )
+    pytester.syspathinsert()
+    bundles = pytester.mkdir("bundles")
+    (bundles / "interfaces.csv").write_text(
+        "host,mtu,is_up\nR2,1500,true\nR3,9000,false\n"
+    )
+    (bundles / f"test_interfaces{YAML_EXTENSION}").write_text(
+        """
+        - test_module: interfaces
+          test_class: TestInterfaces
+          test_data:
+            - host: R1
+              mtu: 1500
+              is_up: true
+          test_data_source: interfaces.csv
+          test_data_types:
+            mtu: int
+            is_up: bool
+        """
+    )
+
+    result = pytester.runpytest()
+    result.assert_outcomes(passed=3)
+
+
 def test_find_test_module_of_class(mock_index):
     path = index.find_test_module_of_class("TestFixture")
     expected = "tests.base_tests.class_loading"
@@ -219,3 +257,49 @@ def test_load_file_extension(pytester, file_extension):
 
     result = pytester.runpytest()
     result.assert_outcomes(passed=2)
+
+
+class TestModuleCache:
+    COUNTED_MODULE = """
+        import executions
+
+        executions.count += 1
+        {isolation}
+
+        class TestCounted:
+            def test_executions(self):
+                assert executions.count == {expected}
+        """
+    ENTRIES = """
+        ---
+        - test_module: counted
+          test_class: TestCounted
+          test_data: []
+        - test_module: counted
+          test_class: TestCounted
+          test_data: []
+        """
+
+    def test_module_is_loaded_once(self, pytester):
+        pytester.makepyfile(
+            executions="count = 0",
+            counted=self.COUNTED_MODULE.format(isolation="", expected=1),
+        )
+        pytester.makefile(
+            YAML_EXTENSION, test_first=self.ENTRIES, test_second=self.ENTRIES
+        )
+        pytester.syspathinsert()
+        result = pytester.runpytest()
+        result.assert_outcomes(passed=4)
+
+    def test_isolated_module_is_loaded_for_every_entry(self, pytester):
+        pytester.makepyfile(
+            executions="count = 0",
+            counted=self.COUNTED_MODULE.format(
+                isolation="NUTS_ISOLATED_MODULE = True", expected=2
+            ),
+        )
+        pytester.makefile(YAML_EXTENSION, test_isolated=self.ENTRIES)
+        pytester.syspathinsert()
+        result = pytester.runpytest()
+        result.assert_outcomes(passed=2)
@@ -1,10 +1,17 @@
+import importlib
+import json
+import socket
 from typing import Any, Dict, List
 from unittest.mock import Mock, ANY
 
 import pytest
+from nornir.core import Nornir
+from nornir.core.inventory import Group, Host, Hosts, Inventory, ParentGroups
+from nornir.core.plugins.inventory import TransformFunctionRegister
 
 from nuts.context import NornirNutsContext, NutsSetupError, NutsContext
-from tests.utils import YAML_EXTENSION
+from nuts.helpers.filters import HostSelector
+from tests.utils import YAML_EXTENSION, deregister_nornir_plugins
 
 
 class CustomNornirNutsContext(NornirNutsContext):
@@ -26,22 +33,32 @@ class CustomNornirNutsContext(NornirNutsContext):
 
 @pytest.fixture
 def nornir_instance():
+    groups = {name: Group(name) for name in ("router", "site1", "site2")}
     inventory_data = {
-        "R1": {"name": "R1", "tags": ["router", "tag1"], "groups": ["router", "site1"]},
-        "R2": {"name": "R2", "tags": ["router", "tag2"], "groups": ["router", "site2"]},
+        "R1": Host(
+            "R1",
+            data={"tags": ["router", "tag1"]},
+            groups=ParentGroups([groups["router"], groups["site1"]]),
+        ),
+        "R2": Host(
+            "R2",
+            data={"tags": ["router", "tag2"]},
+            groups=ParentGroups([groups["router"], groups["site2"]]),
+        ),
     }
 
     def nornir_mock(f=None):
         if f:
-            data: Dict[str, Dict[str, Any]] = {}
+            data: Dict[str, Host] = {}
             for host in inventory_data.values():
                 if f(host):
-                    data[str(host["name"])] = host
+                    data[host.name] = host
         else:
             data = inventory_data
 
         m = Mock()
         m.inventory.hosts.keys.return_value = data.keys()
+        m.inventory.defaults.data = {}
         return m
 
     mock = nornir_mock()
@@ -71,261 +88,1287 @@ class TestNornirNutsContextTestExecutionField:
         context = NutsContext({"test_execution": {"count": 42, "ref": 23}})
         assert context.nuts_arguments() == {"count": 42, "ref": 23}
 
+    def test_test_execution_settings_are_not_arguments(self):
+        runner = {"plugin": "serial"}
+        context = NutsContext({"test_execution": {"count": 42, "runner": runner}})
+        assert context.nuts_arguments() == {"count": 42}
+        assert context.execution_settings() == {"runner": runner}
+
 
 class TestNornirNutsContextGeneralResult:
     def test_raises_nuts_setup_error_if_nornir_is_not_defined(self):
         with pytest.raises(NutsSetupError):
             ctx = CustomNornirNutsContext({}, None)
 
-            ctx.general_result()
+            ctx.general_result()
+
+    def test_filters_inventory_based_on_nornir_filter(
+        self, nornir_nuts_ctx, nornir_instance
+    ):
+        nornir_nuts_ctx.test_filter = Mock()
+
+        nornir_nuts_ctx.general_result()
+
+        nornir_instance.filter.assert_called_with(nornir_nuts_ctx.test_filter)
+
+    def test_calls_run_on_filtered_inventory(self, nornir_nuts_ctx, nornir_instance):
+        filtered_inventory = Mock()
+        filtered_inventory.inventory.defaults.data = {}
+        nornir_instance.filter = Mock()
+        nornir_instance.filter.return_value = filtered_inventory
+        nornir_nuts_ctx.test_filter = Mock()
+
+        nornir_nuts_ctx.general_result()
+
+        assert filtered_inventory.run.called
+
+    def test_passes_nuts_arguments_to_nornir(self, nornir_nuts_ctx, nornir_instance):
+        nornir_nuts_ctx.test_arguments = {"test": "test123", "test2": "test456"}
+
+        nornir_nuts_ctx.general_result()
+
+        nornir_instance.run.assert_called_with(
+            task=ANY, test="test123", test2="test456"
+        )
+
+    def test_runs_nuts_task_on_inventory(self, nornir_nuts_ctx, nornir_instance):
+        nornir_nuts_ctx.general_result()
+
+        nornir_instance.run.assert_called_with(task=nornir_nuts_ctx.nuts_task())
+
+    def test_returns_nornir_result(self, nornir_nuts_ctx, nornir_instance):
+        nornir_results = Mock()
+        nornir_instance.run.return_value = nornir_results
+
+        result = nornir_nuts_ctx.general_result()
+
+        assert result == nornir_results
+
+
+@pytest.mark.usefixtures("default_nr_init")
+class TestNornirNutsContextIntegration:
+    def test_fails_if_no_task_is_defined(self, pytester):
+        pytester.makepyfile(
+            basic_task="""
+            from nuts.context import NornirNutsContext
+
+
+            class FailingNornirNutsContext(NornirNutsContext):
+                pass
+
+            CONTEXT = FailingNornirNutsContext
+
+            class TestBasicTask:
+                def test_basic_task(self, nuts_ctx):
+                    assert nuts_ctx.general_result()["R1"].result == "R1"
+            """
+        )
+        arguments = {
+            "test_class_loading": """
+                        ---
+                        - test_module: basic_task
+                          test_class: TestBasicTask
+                          test_data:
+                            - host: R1
+                            - host: R2
+                        """,
+        }
+        pytester.makefile(YAML_EXTENSION, **arguments)
+        result = pytester.runpytest("test_class_loading.yaml")
+        result.assert_outcomes(failed=1)
+
+    def test_filter_which_relies_on_setup(self, pytester):
+        pytester.makepyfile(
+            basic_task="""
+            from nornir.core.filter import F
+            from nuts.context import NornirNutsContext
+
+
+            def host_name(task):
+                return task.host.name
+
+
+            class SetupNornirNutsContext(NornirNutsContext):
+                def nuts_task(self):
+                    return host_name
+
+                def setup(self):
+                    self.selected = self.nuts_parameters["test_data"][0]["host"]
+
+                def nornir_filter(self):
+                    return F(name=self.selected)
+
+            CONTEXT = SetupNornirNutsContext
+
+            class TestBasicTask:
+                def test_basic_task(self, nuts_ctx):
+                    assert nuts_ctx.general_result()["R1"].result == "R1"
+            """
+        )
+        arguments = {
+            "test_class_loading": """
+                        ---
+                        - test_module: basic_task
+                          test_class: TestBasicTask
+                          test_data:
+                            - host: R1
+                        - test_module: basic_task
+                          test_class: TestBasicTask
+                          test_data:
+                            - host: R1
+                        """,
+        }
+        pytester.makefile(YAML_EXTENSION, **arguments)
+        result = pytester.runpytest("test_class_loading.yaml")
+        result.assert_outcomes(passed=2)
+
+    def test_executes_specified_task(self, pytester):
+        pytester.makepyfile(
+            basic_task="""
+    from nuts.context import NornirNutsContext
+
+
+    class CustomNornirNutsContext(NornirNutsContext):
+        def nuts_task(self):
+            return lambda task: task.host.name
+
+
+    CONTEXT = CustomNornirNutsContext
+
+
+    class TestBasicTask:
+        def test_basic_task(self, nuts_ctx):
+            assert nuts_ctx.general_result()["R1"].result == "R1"
+    """
+        )
+        arguments = {
+            "test_class_loading": """
+                ---
+                - test_module: basic_task
+                  test_class: TestBasicTask
+                  test_data:
+                    - host: R1
+                    - host: R2
+                """
+        }
+        pytester.makefile(YAML_EXTENSION, **arguments)
+        result = pytester.runpytest("test_class_loading.yaml")
+        result.assert_outcomes(passed=1)
+
+    def test_wrong_host_in_test(self, pytester):
+        pytester.makepyfile(
+            basic_task="""
+        from nuts.context import NornirNutsContext
+        from nuts.helpers.errors import NutsSetupError
+        from nornir.core.filter import F
+        from nuts.helpers.filters import filter_hosts
+
+        import pytest
+
+
+        class CustomNornirNutsContext(NornirNutsContext):
+
+            def nuts_task(self):
+                return lambda task: task.host.name
+
+
+        CONTEXT = CustomNornirNutsContext
+
+
+        class TestBasicTask:
+            @pytest.mark.xfail(raises=NutsSetupError)
+            def test_basic_task(self, nuts_ctx):
+                pass
+        """
+        )
+        arguments = {
+            "test_class_loading": """
+                    ---
+                    - test_module: basic_task
+                      test_class: TestBasicTask
+                      test_data:
+                        - host: S1
+                        - host: S2
+                    """
+        }
+        pytester.makefile(YAML_EXTENSION, **arguments)
+        result = pytester.runpytest("test_class_loading.yaml")
+        result.assert_outcomes(xpassed=1)
+
+    def test_contexts_share_nornir_inventory(self, pytester):
+        # test modules are loaded per bundle entry, the shared list must live
+        # in a regularly imported module
+        pytester.makepyfile(shared_inventories="INVENTORIES = []")
+        pytester.makepyfile(
+            basic_task="""
+        from nuts.context import NornirNutsContext
+        from shared_inventories import INVENTORIES
+
+
+        CONTEXT = NornirNutsContext
+
+
+        class TestBasicTask:
+            def test_basic_task(self, nuts_ctx):
+                INVENTORIES.append(nuts_ctx.nornir.inventory)
+                assert all(inv is INVENTORIES[0] for inv in INVENTORIES)
+        """
+        )
+        arguments = {
+            "test_class_loading": """
+                    ---
+                    - test_module: basic_task
+                      test_class: TestBasicTask
+                      test_data:
+                        - host: R1
+                    - test_module: basic_task
+                      test_class: TestBasicTask
+                      test_data:
+                        - host: R2
+                    """
+        }
+        pytester.makefile(YAML_EXTENSION, **arguments)
+        result = pytester.runpytest("test_class_loading.yaml")
+        result.assert_outcomes(passed=2)
+
+    def test_context_is_built_once_per_class(self, pytester):
+        pytester.makepyfile(shared_contexts="CONTEXTS = []")
+        pytester.makepyfile(
+            basic_task="""
+        import pytest
+        from nuts.context import NornirNutsContext
+        from shared_contexts import CONTEXTS
+
+
+        class CustomNornirNutsContext(NornirNutsContext):
+            def initialize(self):
+                super().initialize()
+                CONTEXTS.append(self)
+
+
+        CONTEXT = CustomNornirNutsContext
+
+
+        class TestBasicTask:
+            @pytest.mark.nuts("host")
+            def test_first(self, nuts_ctx, nuts_test_entry, host):
+                assert CONTEXTS == [nuts_ctx]
+                assert type(nuts_test_entry) is dict
+                nuts_test_entry["checked"] = True
+
+            @pytest.mark.nuts("host")
+            def test_second(self, nuts_ctx, nuts_test_entry, host):
+                assert CONTEXTS == [nuts_ctx]
+                assert nuts_ctx.nuts_parameters["test_data"] == [{"host": "R1"}]
+        """
+        )
+        arguments = {
+            "test_class_loading": """
+                    ---
+                    - test_module: basic_task
+                      test_class: TestBasicTask
+                      test_data:
+                        - tags: tag1
+                    """
+        }
+        pytester.makefile(YAML_EXTENSION, **arguments)
+        result = pytester.runpytest("test_class_loading.yaml")
+        result.assert_outcomes(passed=2)
+
+
+@pytest.mark.usefixtures("default_nr_init")
+class TestNornirNutsContextCaching:
+    BASIC_TASK = """
+    import pytest
+    from nornir.core.task import Result
+    from nuts.context import NornirNutsContext
+    from nuts.helpers.cache import (
+        INVENTORY_CACHE_DIR,
+        INVENTORY_CACHE_FILE,
+        InventoryCacheFile,
+        LazyHosts,
+    )
+    from nuts.helpers.result import AbstractHostResultExtractor
+
+
+    def cached_inventory(pytestconfig):
+        path = pytestconfig.cache.mkdir(INVENTORY_CACHE_DIR) / INVENTORY_CACHE_FILE
+        return InventoryCacheFile.open(path)
+
+
+    class ExpanseExtractor(AbstractHostResultExtractor):
+        def single_transform(self, single_result):
+            return self._simple_extract(single_result)
+
+    class CustomNornirNutsContext(NornirNutsContext):
+        def nuts_task(self):
+            return lambda task: Result(host=task.host, result=task.host.name)
+
+        def nuts_extractor(self) -> ExpanseExtractor:
+            return ExpanseExtractor(self)
+
+    CONTEXT = CustomNornirNutsContext
+
+    class TestBasicTaskFirst:
+        def test_config_has_cache(self, nuts_ctx):
+            nornir_cache = cached_inventory(nuts_ctx.pytestconfig)
+            assert nornir_cache is not None
+            assert "R1" in nornir_cache.hosts
+            assert "routers" in nornir_cache.groups
+            assert nornir_cache.defaults is not None
+
+            assert nornir_cache.hosts["R1"]["hostname"] == "1.1.1.1"
+
+        def test_has_correct_pytestconfig(self, nuts_ctx):
+            assert not nuts_ctx.pytestconfig.getoption("nornir_cache_disabled")
+
+        @pytest.mark.nuts("host")
+        def test_trigger_teardown(self, nuts_ctx, single_result, host):
+            assert host == "R1"
+
+
+    class TestBasicTaskSecond:
+        def test_config_has_cache(self, nuts_ctx):
+            nornir_cache = cached_inventory(nuts_ctx.pytestconfig)
+            assert nornir_cache is not None
+            assert "R1" in nornir_cache.hosts
+            assert nornir_cache.hosts["R1"]["groups"] == ["routers", "site1"]
+            assert nornir_cache.hosts["R1"]["data"] == {"tags": ["tag1", "router"]}
+
+
+    class TestLazyInventory:
+        @pytest.mark.nuts("host")
+        def test_only_selected_hosts_are_built(self, nuts_ctx, single_result, host):
+            hosts = nuts_ctx.nornir.inventory.hosts
+            assert isinstance(hosts, LazyHosts)
+            assert "R2" in hosts
+            assert [h.name for h in hosts.loaded()] == ["R1"]
+            assert [g.name for g in hosts["R1"].groups] == ["routers", "site1"]
+                """
+    ARGUMENTS = {
+        "test_class_loading": """
+                        ---
+                        - test_module: basic_task
+                          test_class: TestBasicTaskFirst
+                          test_data:
+                            - host: R1
+                        - test_module: basic_task
+                          test_class: TestBasicTaskSecond
+                          test_data:
+                            - host: R1
+                        """,
+    }
+
+    HOST_NAMES_TASK = """
+    from nornir.core.task import Result
+    from nuts.context import NornirNutsContext
+
+
+    class CustomNornirNutsContext(NornirNutsContext):
+        def nuts_task(self):
+            return lambda task: Result(host=task.host, result=task.host.name)
+
+
+    CONTEXT = CustomNornirNutsContext
+
+
+    class TestHostNames:
+        def test_has_r4(self, nuts_ctx):
+            assert "R4" in nuts_ctx.nornir.inventory.hosts
+    """
+    HOST_NAMES_BUNDLE = """
+        ---
+        - test_module: basic_task
+          test_class: TestHostNames
+          test_data: []
+        """
+
+    def test_cached_nornir_inventory(self, pytester, deregister_nornir_plugin):
+        pytester.makepyfile(basic_task=self.BASIC_TASK)
+        arguments = self.ARGUMENTS
+        pytester.makefile(YAML_EXTENSION, **arguments)
+        result = pytester.runpytest("test_class_loading.yaml")
+        result.assert_outcomes(passed=4)
+
+        deregister_nornir_plugins()
+        pytester.makefile(
+            YAML_EXTENSION,
+            test_lazy_inventory="""
+                ---
+                - test_module: basic_task
+                  test_class: TestLazyInventory
+                  test_data:
+                    - host: R1
+                """,
+        )
+        result = pytester.runpytest("test_lazy_inventory.yaml")
+        result.assert_outcomes(passed=1)
+
+    def test_cached_inventory_is_rebuilt_if_hosts_change(
+        self, pytester, deregister_nornir_plugin
+    ):
+        pytester.makepyfile(basic_task=self.HOST_NAMES_TASK)
+        pytester.makefile(YAML_EXTENSION, test_host_names=self.HOST_NAMES_BUNDLE)
+        pytester.runpytest("test_host_names.yaml").assert_outcomes(failed=1)
+        with open(pytester.path / f"hosts{YAML_EXTENSION}", "a") as hosts:
+            hosts.write("\nR4:\n  hostname: 4.4.4.4\n")
+
+        deregister_nornir_plugins()
+        forced = pytester.runpytest("test_host_names.yaml", "--nornir-cached-inventory")
+        forced.assert_outcomes(failed=1)
+        deregister_nornir_plugins()
+        pytester.runpytest("test_host_names.yaml").assert_outcomes(passed=1)
+
+    def test_transform_function_is_not_applied_to_cached_hosts(
+        self, pytester, deregister_nornir_plugin
+    ):
+        pytester.makepyfile(
+            shared_transform="""
+            from nornir.core.plugins.inventory import TransformFunctionRegister
+
+            TRANSFORMED = []
+
+
+            def add_suffix(host):
+                TRANSFORMED.append(host.name)
+                host.hostname = f"{host.hostname}-t"
+
+
+            TransformFunctionRegister.register("add_suffix", add_suffix)
+            """
+        )
+        shared_transform = importlib.import_module("shared_transform")
+        pytester.makefile(
+            YAML_EXTENSION,
+            **{
+                "nr-config": f"""
+                inventory:
+                  plugin: SimpleInventory
+                  options:
+                    host_file: {pytester.path / f"hosts{YAML_EXTENSION}"}
+                    group_file: {pytester.path / f"groups{YAML_EXTENSION}"}
+                  transform_function: add_suffix
+                """
+            },
+        )
+        pytester.makepyfile(
+            basic_task="""
+            from nornir.core.task import Result
+            from nuts.context import NornirNutsContext
+
+
+            class CustomNornirNutsContext(NornirNutsContext):
+                def nuts_task(self):
+                    return lambda task: Result(host=task.host, result=task.host.name)
+
+
+            CONTEXT = CustomNornirNutsContext
+
+
+            class TestHostName:
+                def test_hostname(self, nuts_ctx):
+                    hosts = nuts_ctx.nornir.inventory.hosts
+                    assert hosts["R1"].hostname == "1.1.1.1-t"
+                    if hasattr(hosts, "loaded"):
+                        assert [h.name for h in hosts.loaded()] == ["R1"]
+            """
+        )
+        pytester.makefile(
+            YAML_EXTENSION,
+            test_hostname="""
+                ---
+                - test_module: basic_task
+                  test_class: TestHostName
+                  test_data: []
+                """,
+        )
+        pytester.runpytest("test_hostname.yaml").assert_outcomes(passed=1)
+        assert "R1" in shared_transform.TRANSFORMED
+        shared_transform.TRANSFORMED.clear()
+
+        deregister_nornir_plugins()
+        TransformFunctionRegister.register("add_suffix", shared_transform.add_suffix)
+        pytester.runpytest("test_hostname.yaml").assert_outcomes(passed=1)
+        assert shared_transform.TRANSFORMED == []
+
+    def test_no_cached_nornir_inventory(self, pytester, deregister_nornir_plugin):
+        pytester.makepyfile(basic_task=self.BASIC_TASK)
+        arguments = self.ARGUMENTS
+        pytester.makefile(YAML_EXTENSION, **arguments)
+        result = pytester.runpytest("--nornir-cache-disable", "-v")
+
+        result.assert_outcomes(passed=1, failed=3)
+        output = result.stdout.str()
+        assert "test_config_has_cache FAILED" in output
+        assert "test_has_correct_pytestconfig FAILED" in output
+        assert "test_trigger_teardown[R1_] PASSED" in output
+        assert "test_config_has_cache FAILED" in output
+
+
+@pytest.mark.usefixtures("default_nr_init")
+class TestNornirNutsContextConnectionPool:
+    SHARED_CONNECTIONS = """
+    from nornir.core.plugins.connections import ConnectionPluginRegister
+
+    OPENED = []
+    CLOSED = []
+
+
+    class DummyConnection:
+        def open(self, hostname, username, password, port, platform, extras=None,
+                 configuration=None):
+            self.connection = hostname
+            OPENED.append(hostname)
+
+        def close(self):
+            CLOSED.append(self.connection)
+
+
+    ConnectionPluginRegister.register("dummy", DummyConnection)
+    """
+    BASIC_TASK = """
+    from nornir.core.task import Result
+    from nuts.context import NornirNutsContext
+
+
+    class CustomNornirNutsContext(NornirNutsContext):
+        def nuts_task(self):
+            return lambda task: Result(
+                host=task.host,
+                result=task.host.get_connection("dummy", task.nornir.config),
+            )
+
+
+    CONTEXT = CustomNornirNutsContext
+
+
+    class TestBasicTask:
+        def test_basic_task(self, nuts_ctx):
+            assert nuts_ctx.general_result()["R1"].result == "1.1.1.1"
+    """
+    ARGUMENTS = {
+        "test_class_loading": """
+                ---
+                - test_module: basic_task
+                  test_class: TestBasicTask
+                  test_data:
+                    - host: R1
+                - test_module: basic_task
+                  test_class: TestBasicTask
+                  test_data:
+                    - host: R1
+                """
+    }
+
+    @pytest.fixture
+    def shared_connections(self, pytester):
+        pytester.makepyfile(shared_connections=self.SHARED_CONNECTIONS)
+        pytester.makepyfile(basic_task=self.BASIC_TASK)
+        pytester.makefile(YAML_EXTENSION, **self.ARGUMENTS)
+        # imported before the run, so the module is shared with the inline run
+        return importlib.import_module("shared_connections")
+
+    def test_connections_are_reused_between_classes(self, pytester, shared_connections):
+        result = pytester.runpytest("test_class_loading.yaml")
+        result.assert_outcomes(passed=2)
+        assert shared_connections.OPENED == ["1.1.1.1"]
+        # closed at the end of the session
+        assert shared_connections.CLOSED == ["1.1.1.1"]
+
+    def test_connections_are_checked_in_if_the_task_fails(
+        self, pytester, shared_connections
+    ):
+        pytester.makepyfile(
+            pool_size="""
+            from basic_task import CONTEXT
+            from nuts.helpers.connections import get_connection_pool
+
+
+            class TestPoolSize:
+                def test_pool_size(self, nuts_ctx):
+                    assert len(get_connection_pool(nuts_ctx.pytestconfig)) == 1
+            """
+        )
+        pytester.makefile(
+            YAML_EXTENSION,
+            test_class_loading="""
+                ---
+                - test_module: basic_task
+                  test_class: TestBasicTask
+                  test_data:
+                    - host: R1
+                - test_module: basic_task
+                  test_class: TestBasicTask
+                  test_execution:
+                    runner: invalid
+                  test_data:
+                    - host: R1
+                - test_module: pool_size
+                  test_class: TestPoolSize
+                  test_data:
+                    - host: R1
+                """,
+        )
+        result = pytester.runpytest("test_class_loading.yaml")
+        result.assert_outcomes(passed=2, failed=1)
+        assert shared_connections.CLOSED == ["1.1.1.1"]
+
+    def test_close_connections_after_every_class(self, pytester, shared_connections):
+        result = pytester.runpytest(
+            "test_class_loading.yaml", "--nuts-close-connections"
+        )
+        result.assert_outcomes(passed=2)
+        assert shared_connections.OPENED == ["1.1.1.1", "1.1.1.1"]
+        assert shared_connections.CLOSED == ["1.1.1.1", "1.1.1.1"]
+
+
+@pytest.mark.usefixtures("default_nr_init")
+class TestNornirNutsContextPrefetch:
+    SHARED_THREADS = """
+    THREADS = {}
+    """
+    THREAD_TASK = """
+    import threading
+
+    import pytest
+    from nornir.core.task import Result
+    from nuts.context import NornirNutsContext
+    from nuts.helpers.result import AbstractHostResultExtractor
+
+    import shared_threads
+
+
+    class HostNameExtractor(AbstractHostResultExtractor):
+        def single_transform(self, single_result):
+            return single_result[0].result
+
+
+    class CustomNornirNutsContext(NornirNutsContext):
+        def nuts_task(self):
+            return lambda task: Result(host=task.host, result=task.host.name)
+
+        def nuts_extractor(self):
+            return HostNameExtractor(self)
+
+        def setup(self):
+            name = self.nuts_parameters["test_execution"]["name"]
+            shared_threads.THREADS[name] = threading.current_thread().name
+
+
+    CONTEXT = CustomNornirNutsContext
+
+
+    class TestThreadTask:
+        @pytest.mark.nuts("host")
+        def test_thread_task(self, single_result, host):
+            assert single_result.result == host
+    """
+    ARGUMENTS = {
+        "test_class_loading": """
+                ---
+                - test_module: thread_task
+                  test_class: TestThreadTask
+                  test_execution:
+                    name: first
+                  test_data:
+                    - host: R1
+                - test_module: thread_task
+                  test_class: TestThreadTask
+                  test_execution:
+                    name: second
+                  test_data:
+                    - host: R2
+                """
+    }
+
+    @pytest.fixture
+    def shared_threads(self, pytester):
+        pytester.makepyfile(shared_threads=self.SHARED_THREADS)
+        pytester.makepyfile(thread_task=self.THREAD_TASK)
+        pytester.makefile(YAML_EXTENSION, **self.ARGUMENTS)
+        # imported before the run, so the module is shared with the inline run
+        return importlib.import_module("shared_threads")
+
+    def test_next_class_is_prefetched(self, pytester, shared_threads):
+        result = pytester.runpytest("test_class_loading.yaml", "--nuts-prefetch", "1")
+        result.assert_outcomes(passed=2)
+        assert not shared_threads.THREADS["first"].startswith("nuts-prefetch")
+        assert shared_threads.THREADS["second"].startswith("nuts-prefetch")
+
+    def test_classes_do_not_use_a_host_at_the_same_time(self, pytester):
+        pytester.makepyfile(shared_use="ACTIVE = []\nOVERLAPS = []\n")
+        pytester.makepyfile(
+            host_task="""
+            import time
+
+            import pytest
+            from nornir.core.task import Result
+            from nuts.context import NornirNutsContext
+            from nuts.helpers.result import AbstractHostResultExtractor
+
+            import shared_use
+
+
+            def use_host(task, label):
+                if task.host.name in shared_use.ACTIVE:
+                    shared_use.OVERLAPS.append(task.host.name)
+                shared_use.ACTIVE.append(task.host.name)
+                time.sleep(0.2)
+                shared_use.ACTIVE.remove(task.host.name)
+                return Result(host=task.host, result=task.host.name)
+
+
+            class HostNameExtractor(AbstractHostResultExtractor):
+                def single_transform(self, single_result):
+                    return single_result[0].result
+
+
+            class CustomNornirNutsContext(NornirNutsContext):
+                def nuts_task(self):
+                    return use_host
+
+                def nuts_extractor(self):
+                    return HostNameExtractor(self)
+
+
+            CONTEXT = CustomNornirNutsContext
+
+
+            class TestHostTask:
+                @pytest.mark.nuts("host")
+                def test_host_task(self, single_result, host):
+                    assert single_result.result == host
+            """
+        )
+        entry = """
+                - test_module: host_task
+                  test_class: TestHostTask
+                  test_execution:
+                    label: {label}
+                  test_data:
+                    - host: R1
+                """
+        pytester.makefile(
+            YAML_EXTENSION,
+            test_class_loading="".join(entry.format(label=i) for i in range(4)),
+        )
+        shared_use = importlib.import_module("shared_use")
+        result = pytester.runpytest(
+            "test_class_loading.yaml",
+            "--nuts-prefetch",
+            "2",
+            "--nuts-prefetch-inflight",
+            "2",
+        )
+        result.assert_outcomes(passed=4)
+        assert shared_use.OVERLAPS == []
+
+    def test_class_whose_context_cannot_be_built(self, pytester):
+        pytester.makepyfile(shared_builds="BUILDS = []\n")
+        pytester.makepyfile(
+            broken_task="""
+            import pytest
+            from nornir.core.task import Result
+            from nuts.context import NornirNutsContext
+            from nuts.helpers.result import AbstractHostResultExtractor
+
+            import shared_builds
+
+
+            class HostNameExtractor(AbstractHostResultExtractor):
+                def single_transform(self, single_result):
+                    return single_result[0].result
+
+
+            class CustomNornirNutsContext(NornirNutsContext):
+                def initialize(self):
+                    shared_builds.BUILDS.append(self.nuts_parameters["test_execution"])
+                    if self.nuts_parameters["test_execution"]["broken"]:
+                        raise OSError("inventory not readable")
+                    super().initialize()
+
+                def nuts_task(self):
+                    return lambda task: Result(host=task.host, result=task.host.name)
+
+                def nuts_extractor(self):
+                    return HostNameExtractor(self)
+
+
+            CONTEXT = CustomNornirNutsContext
+
+
+            class TestBrokenTask:
+                def test_context(self, nuts_ctx):
+                    assert nuts_ctx.nuts_parameters["test_data"]
+            """
+        )
+        entry = """
+                - test_module: broken_task
+                  test_class: TestBrokenTask
+                  test_execution:
+                    broken: {broken}
+                  test_data:
+                    - host: R1
+                """
+        pytester.makefile(
+            YAML_EXTENSION,
+            test_class_loading=entry.format(broken="false")
+            + entry.format(broken="true"),
+        )
+        shared_builds = importlib.import_module("shared_builds")
+        result = pytester.runpytest("test_class_loading.yaml", "--nuts-prefetch", "1")
+        result.assert_outcomes(passed=1, errors=1)
+        assert shared_builds.BUILDS.count({"broken": True}) == 1
+
+    def test_no_prefetch_by_default(self, pytester, shared_threads):
+        result = pytester.runpytest("test_class_loading.yaml")
+        result.assert_outcomes(passed=2)
+        assert not shared_threads.THREADS["second"].startswith("nuts-prefetch")
+
+
+@pytest.mark.usefixtures("default_nr_init")
+class TestNornirNutsContextCircuitBreaker:
+    SHARED_CALLS = """
+    CALLS = []
+    """
+    REFUSING_TASK = """
+    import pytest
+    from nornir.core.task import Result
+    from nuts.context import NornirNutsContext
+    from nuts.helpers.result import AbstractHostResultExtractor
+
+    import shared_calls
+
+
+    def refuse_r1(task, label):
+        shared_calls.CALLS.append(task.host.name)
+        if task.host.name == "R1":
+            raise ConnectionRefusedError("R1 refused the connection")
+        return Result(host=task.host, result=task.host.name)
+
+
+    class HostNameExtractor(AbstractHostResultExtractor):
+        def single_transform(self, single_result):
+            return single_result[0].result
+
+
+    class CustomNornirNutsContext(NornirNutsContext):
+        def nuts_task(self):
+            return refuse_r1
+
+        def nuts_arguments(self):
+            return {"label": self.nuts_parameters["test_execution"]["label"]}
+
+        def nuts_extractor(self):
+            return HostNameExtractor(self)
+
+
+    CONTEXT = CustomNornirNutsContext
+
+
+    class TestRefusingTask:
+        @pytest.mark.nuts("host")
+        def test_refusing_task(self, single_result, host):
+            assert single_result.result == host
+    """
+    ARGUMENTS = {
+        "test_class_loading": """
+                ---
+                - test_module: refusing_task
+                  test_class: TestRefusingTask
+                  test_execution:
+                    label: first
+                  test_data:
+                    - host: R1
+                    - host: R2
+                - test_module: refusing_task
+                  test_class: TestRefusingTask
+                  test_execution:
+                    label: second
+                  test_data:
+                    - host: R1
+                    - host: R2
+                """
+    }
+
+    @pytest.fixture
+    def shared_calls(self, pytester):
+        pytester.makepyfile(shared_calls=self.SHARED_CALLS)
+        pytester.makepyfile(refusing_task=self.REFUSING_TASK)
+        pytester.makefile(YAML_EXTENSION, **self.ARGUMENTS)
+        # imported before the run, so the module is shared with the inline run
+        return importlib.import_module("shared_calls")
+
+    def test_unreachable_host_is_skipped_later(self, pytester, shared_calls):
+        result = pytester.runpytest("test_class_loading.yaml")
+        result.assert_outcomes(passed=2, errors=2)
+        assert sorted(shared_calls.CALLS) == ["R1", "R2", "R2"]
+        # both errors carry the original exception
+        assert result.stdout.str().count("R1 refused the connection") >= 2
+
+    def test_circuit_breaker_can_be_disabled(self, pytester, shared_calls):
+        result = pytester.runpytest(
+            "test_class_loading.yaml", "--nuts-circuit-breaker-disable"
+        )
+        result.assert_outcomes(passed=2, errors=2)
+        assert sorted(shared_calls.CALLS) == ["R1", "R1", "R2", "R2"]
+
+
+@pytest.mark.usefixtures("default_nr_init")
+class TestNornirNutsContextRecording:
+    shared_calls = TestNornirNutsContextCircuitBreaker.shared_calls
+    SHARED_CALLS = TestNornirNutsContextCircuitBreaker.SHARED_CALLS
+    REFUSING_TASK = TestNornirNutsContextCircuitBreaker.REFUSING_TASK
+    ARGUMENTS = TestNornirNutsContextCircuitBreaker.ARGUMENTS
+
+    def test_replays_recorded_results_without_running_the_task(
+        self, pytester, shared_calls
+    ):
+        recorded = pytester.runpytest("test_class_loading.yaml", "--nuts-record", "rec")
+        recorded.assert_outcomes(passed=2, errors=2)
+        calls = list(shared_calls.CALLS)
+        deregister_nornir_plugins()
+
+        replayed = pytester.runpytest("test_class_loading.yaml", "--nuts-replay", "rec")
+
+        replayed.assert_outcomes(passed=2, errors=2)
+        assert shared_calls.CALLS == calls
+        assert replayed.stdout.str().count("R1 refused the connection") >= 2
 
-    def test_filters_inventory_based_on_nornir_filter(
-        self, nornir_nuts_ctx, nornir_instance
-    ):
-        nornir_nuts_ctx.test_filter = Mock()
+    def test_replay_without_recording_fails(self, pytester, shared_calls):
+        result = pytester.runpytest("test_class_loading.yaml", "--nuts-replay", "rec")
+        result.assert_outcomes(errors=4)
+        assert shared_calls.CALLS == []
 
-        nornir_nuts_ctx.general_result()
 
-        nornir_instance.filter.assert_called_with(nornir_nuts_ctx.test_filter)
+@pytest.mark.usefixtures("default_nr_init")
+class TestNornirNutsContextResultCache:
+    COUNTING_TASK = """
+    import pytest
+    from nornir.core.task import Result
+    from nuts.context import NornirNutsContext
+    from nuts.helpers.result import AbstractHostResultExtractor
 
-    def test_calls_run_on_filtered_inventory(self, nornir_nuts_ctx, nornir_instance):
-        filtered_inventory = Mock()
-        nornir_instance.filter = Mock()
-        nornir_instance.filter.return_value = filtered_inventory
-        nornir_nuts_ctx.test_filter = Mock()
+    import shared_calls
 
-        nornir_nuts_ctx.general_result()
 
-        assert filtered_inventory.run.called
+    def count(task):
+        shared_calls.CALLS.append(task.host.name)
+        return Result(host=task.host, result=task.host.name)
 
-    def test_passes_nuts_arguments_to_nornir(self, nornir_nuts_ctx, nornir_instance):
-        nornir_nuts_ctx.test_arguments = {"test": "test123", "test2": "test456"}
 
-        nornir_nuts_ctx.general_result()
+    class HostNameExtractor(AbstractHostResultExtractor):
+        def single_transform(self, single_result):
+            return single_result[0].result
 
-        nornir_instance.run.assert_called_with(
-            task=ANY, test="test123", test2="test456"
-        )
 
-    def test_runs_nuts_task_on_inventory(self, nornir_nuts_ctx, nornir_instance):
-        nornir_nuts_ctx.general_result()
+    class CustomNornirNutsContext(NornirNutsContext):
+        def nuts_task(self):
+            return count
 
-        nornir_instance.run.assert_called_with(task=nornir_nuts_ctx.nuts_task())
+        def nuts_extractor(self):
+            return HostNameExtractor(self)
 
-    def test_returns_nornir_result(self, nornir_nuts_ctx, nornir_instance):
-        nornir_results = Mock()
-        nornir_instance.run.return_value = nornir_results
 
-        result = nornir_nuts_ctx.general_result()
+    CONTEXT = CustomNornirNutsContext
 
-        assert result == nornir_results
 
+    class TestCountingTask:
+        @pytest.mark.nuts("host")
+        def test_counting_task(self, single_result, host):
+            assert single_result.result == host
+    """
 
-@pytest.mark.usefixtures("default_nr_init")
-class TestNornirNutsContextIntegration:
-    def test_fails_if_no_task_is_defined(self, pytester):
-        pytester.makepyfile(
-            basic_task="""
-            from nuts.context import NornirNutsContext
+    @pytest.fixture
+    def shared_calls(self, pytester):
+        pytester.makepyfile(shared_calls="CALLS = []")
+        pytester.makepyfile(counting_task=self.COUNTING_TASK)
+        pytester.makefile(
+            YAML_EXTENSION,
+            test_class_loading="""
+                ---
+                - test_module: counting_task
+                  test_class: TestCountingTask
+                  test_execution:
+                    cache_ttl: 600
+                  test_data:
+                    - host: R1
+                    - host: R2
+                """,
+        )
+        return importlib.import_module("shared_calls")
 
+    def run_twice(self, pytester, *args):
+        pytester.runpytest("test_class_loading.yaml").assert_outcomes(passed=2)
+        deregister_nornir_plugins()
+        pytester.runpytest("test_class_loading.yaml", *args).assert_outcomes(passed=2)
 
-            class FailingNornirNutsContext(NornirNutsContext):
-                pass
+    def test_second_run_is_served_from_cache(self, pytester, shared_calls):
+        self.run_twice(pytester)
+        assert sorted(shared_calls.CALLS) == ["R1", "R2"]
 
-            CONTEXT = FailingNornirNutsContext
+    def test_cache_can_be_bypassed(self, pytester, shared_calls):
+        self.run_twice(pytester, "--nuts-cache-bypass")
+        assert sorted(shared_calls.CALLS) == ["R1", "R1", "R2", "R2"]
 
-            class TestBasicTask:
-                def test_basic_task(self, nuts_ctx):
-                    assert nuts_ctx.general_result()["R1"].result == "R1"
-            """
-        )
-        arguments = {
-            "test_class_loading": """
-                        ---
-                        - test_module: basic_task
-                          test_class: TestBasicTask
-                          test_data:
-                            - host: R1
-                            - host: R2
-                        """,
-        }
-        pytester.makefile(YAML_EXTENSION, **arguments)
-        result = pytester.runpytest("test_class_loading.yaml")
-        result.assert_outcomes(failed=1)
 
-    def test_executes_specified_task(self, pytester):
-        pytester.makepyfile(
-            basic_task="""
+@pytest.mark.usefixtures("default_nr_init")
+class TestNornirNutsContextRerunFailedHosts:
+    FAILING_TASK = """
+    import pytest
+    from nornir.core.task import Result
     from nuts.context import NornirNutsContext
+    from nuts.helpers.result import AbstractHostResultExtractor
+
+    import shared_calls
+
+
+    def count(task):
+        shared_calls.CALLS.append(task.host.name)
+        return Result(host=task.host, result=task.host.name)
+
+
+    class HostNameExtractor(AbstractHostResultExtractor):
+        def single_transform(self, single_result):
+            return single_result[0].result
 
 
     class CustomNornirNutsContext(NornirNutsContext):
         def nuts_task(self):
-            return lambda task: task.host.name
+            return count
+
+        def nuts_extractor(self):
+            return HostNameExtractor(self)
 
 
     CONTEXT = CustomNornirNutsContext
 
 
-    class TestBasicTask:
-        def test_basic_task(self, nuts_ctx):
-            assert nuts_ctx.general_result()["R1"].result == "R1"
+    class TestFailingTask:
+        @pytest.mark.nuts("host")
+        def test_host_is_healthy(self, single_result, host):
+            assert host not in shared_calls.FAILING
     """
-        )
-        arguments = {
-            "test_class_loading": """
+
+    @pytest.fixture
+    def shared_calls(self, pytester):
+        pytester.makepyfile(shared_calls="CALLS = []\nFAILING = {'R1'}")
+        pytester.makepyfile(failing_task=self.FAILING_TASK)
+        pytester.makefile(
+            YAML_EXTENSION,
+            test_class_loading="""
                 ---
-                - test_module: basic_task
-                  test_class: TestBasicTask
+                - test_module: failing_task
+                  test_class: TestFailingTask
                   test_data:
                     - host: R1
                     - host: R2
-                """
-        }
-        pytester.makefile(YAML_EXTENSION, **arguments)
-        result = pytester.runpytest("test_class_loading.yaml")
-        result.assert_outcomes(passed=1)
-
-    def test_wrong_host_in_test(self, pytester):
-        pytester.makepyfile(
-            basic_task="""
-        from nuts.context import NornirNutsContext
-        from nuts.helpers.errors import NutsSetupError
-        from nornir.core.filter import F
-        from nuts.helpers.filters import filter_hosts
-
-        import pytest
-
+                    - host: R3
+                """,
+        )
+        return importlib.import_module("shared_calls")
 
-        class CustomNornirNutsContext(NornirNutsContext):
+    def run(self, pytester, shared_calls, *args):
+        deregister_nornir_plugins()
+        shared_calls.CALLS.clear()
+        return pytester.runpytest("test_class_loading.yaml", *args)
 
-            def nuts_task(self):
-                return lambda task: task.host.name
+    def test_only_failed_hosts_are_rerun(self, pytester, shared_calls):
+        self.run(pytester, shared_calls).assert_outcomes(passed=2, failed=1)
+        assert sorted(shared_calls.CALLS) == ["R1", "R2", "R3"]
 
+        rerun = self.run(pytester, shared_calls, "--nuts-rerun-failed-hosts")
+        rerun.assert_outcomes(failed=1, deselected=2)
+        assert shared_calls.CALLS == ["R1"]
 
-        CONTEXT = CustomNornirNutsContext
+        shared_calls.FAILING.clear()
+        rerun = self.run(pytester, shared_calls, "--nuts-rerun-failed-hosts")
+        rerun.assert_outcomes(passed=1, deselected=2)
+        assert shared_calls.CALLS == ["R1"]
 
+        # without any failed host, all hosts are run again
+        rerun = self.run(pytester, shared_calls, "--nuts-rerun-failed-hosts")
+        rerun.assert_outcomes(passed=3)
 
-        class TestBasicTask:
-            @pytest.mark.xfail(raises=NutsSetupError)
-            def test_basic_task(self, nuts_ctx):
-                pass
-        """
-        )
-        arguments = {
-            "test_class_loading": """
-                    ---
-                    - test_module: basic_task
-                      test_class: TestBasicTask
-                      test_data:
-                        - host: S1
-                        - host: S2
-                    """
-        }
-        pytester.makefile(YAML_EXTENSION, **arguments)
-        result = pytester.runpytest("test_class_loading.yaml")
-        result.assert_outcomes(xpassed=1)
+    def test_all_hosts_are_run_by_default(self, pytester, shared_calls):
+        self.run(pytester, shared_calls).assert_outcomes(passed=2, failed=1)
+        self.run(pytester, shared_calls).assert_outcomes(passed=2, failed=1)
+        assert sorted(shared_calls.CALLS) == ["R1", "R2", "R3"]
 
 
 @pytest.mark.usefixtures("default_nr_init")
-class TestNornirNutsContextCaching:
-    BASIC_TASK = """
+class TestNornirNutsContextChangedOnly:
+    STATE_TASK = """
     import pytest
     from nornir.core.task import Result
     from nuts.context import NornirNutsContext
     from nuts.helpers.result import AbstractHostResultExtractor
 
+    import shared_state
 
-    class ExpanseExtractor(AbstractHostResultExtractor):
+
+    def state(task):
+        return Result(host=task.host, result=shared_state.STATE[task.host.name])
+
+
+    class StateExtractor(AbstractHostResultExtractor):
         def single_transform(self, single_result):
-            return self._simple_extract(single_result)
+            return single_result[0].result
+
 
     class CustomNornirNutsContext(NornirNutsContext):
         def nuts_task(self):
-            return lambda task: Result(host=task.host, result=task.host.name)
+            return state
 
-        def nuts_extractor(self) -> ExpanseExtractor:
-            return ExpanseExtractor(self)
+        def nuts_extractor(self):
+            return StateExtractor(self)
 
-        def teardown(self) -> None:
-            # Manipulate the cashe, will be executed by
-            if self.pytestconfig and self.pytestconfig.cache:
-                if nc := self.pytestconfig.cache.get("nuts/NORNIR_CACHE", None):
-                    nc["hosts"]["R1"]["data"]["new"] = "manipulate cashe"
-                    self.pytestconfig.cache.set("nuts/NORNIR_CACHE", nc)
 
     CONTEXT = CustomNornirNutsContext
 
-    class TestBasicTaskFirst:
-        def test_config_has_cache(self, nuts_ctx):
-            nornir_cache = nuts_ctx.pytestconfig.cache.get("nuts/NORNIR_CACHE", {})
-            assert "hosts" in nornir_cache
-            assert "groups" in nornir_cache
-            assert "defaults" in nornir_cache
-            assert "R1" in nornir_cache["hosts"]
 
-            assert "new" not in nornir_cache["hosts"]["R1"]["data"]
+    class TestState:
+        @pytest.mark.nuts("host")
+        def test_state(self, single_result, host):
+            shared_state.EVALUATED.append(host)
+            assert single_result.result == "up"
+    """
 
-        def test_has_correct_pytestconfig(self, nuts_ctx):
-            assert not nuts_ctx.pytestconfig.getoption("nornir_cache_disabled")
+    @pytest.fixture
+    def shared_state(self, pytester):
+        pytester.makepyfile(
+            shared_state="STATE = {'R1': 'up', 'R2': 'up'}\nEVALUATED = []"
+        )
+        pytester.makepyfile(state_task=self.STATE_TASK)
+        pytester.makefile(
+            YAML_EXTENSION,
+            test_class_loading="""
+                ---
+                - test_module: state_task
+                  test_class: TestState
+                  test_data:
+                    - host: R1
+                    - host: R2
+                """,
+        )
+        return importlib.import_module("shared_state")
+
+    def run(self, pytester, shared_state, *args):
+        deregister_nornir_plugins()
+        shared_state.EVALUATED.clear()
+        return pytester.runpytest("test_class_loading.yaml", "-v", *args)
+
+    def test_unchanged_tests_are_passed_from_cache(self, pytester, shared_state):
+        self.run(pytester, shared_state).assert_outcomes(passed=2)
+        shared_state.STATE["R2"] = "down"
+
+        result = self.run(pytester, shared_state, "--nuts-changed-only")
+        assert shared_state.EVALUATED == ["R2"]
+        result.stdout.fnmatch_lines(
+            [
+                "*[[]R1_[]] PASSED FROM CACHE (*)*",
+                "*[[]R2_[]] FAILED*",
+                "*1 failed, 1 passed-from-cache*",
+            ]
+        )
 
-        @pytest.mark.nuts("host")
-        def test_trigger_teardown(self, nuts_ctx, single_result, host):
-            assert host == "R1"
+        # failed tests are evaluated until they pass again
+        shared_state.STATE["R2"] = "up"
+        self.run(pytester, shared_state, "--nuts-changed-only")
+        assert shared_state.EVALUATED == ["R2"]
+        self.run(pytester, shared_state, "--nuts-changed-only")
+        assert shared_state.EVALUATED == []
+
+    def test_all_tests_are_evaluated_by_default(self, pytester, shared_state):
+        self.run(pytester, shared_state).assert_outcomes(passed=2)
+        self.run(pytester, shared_state).assert_outcomes(passed=2)
+        assert shared_state.EVALUATED == ["R1", "R2"]
+
+
+class TestNornirNutsContextPreflight:
+    @pytest.fixture
+    def local_inventory(self, pytester, deregister_nornir_plugin):
+        """Inventory with a reachable host R1 and an unreachable host R2."""
+        server = socket.socket()
+        server.bind(("127.0.0.1", 0))
+        server.listen()
+        closed = socket.socket()
+        closed.bind(("127.0.0.1", 0))
+        closed_port = closed.getsockname()[1]
+        closed.close()
+
+        hosts_path = pytester.path / f"hosts{YAML_EXTENSION}"
+        arguments = {
+            "nr-config": f"""inventory:
+                              plugin: SimpleInventory
+                              options:
+                                  host_file: {hosts_path}
+            """,
+            "hosts": f"""
+                R1:
+                  hostname: 127.0.0.1
+                  port: {server.getsockname()[1]}
+                R2:
+                  hostname: 127.0.0.1
+                  port: {closed_port}
+            """,
+        }
+        pytester.makefile(YAML_EXTENSION, **arguments)
+        pytester.makepyfile(
+            basic_task="""
+            import pytest
+            from nornir.core.task import Result
+            from nuts.context import NornirNutsContext
+            from nuts.helpers.result import AbstractHostResultExtractor
 
 
-    class TestBasicTaskSecond:
-        def test_config_has_cache(self, nuts_ctx):
-            nornir_cache = nuts_ctx.pytestconfig.cache.get("nuts/NORNIR_CACHE", {})
-            assert "hosts" in nornir_cache
-            assert "groups" in nornir_cache
-            assert "defaults" in nornir_cache
-            assert "R1" in nornir_cache["hosts"]
+            class HostNameExtractor(AbstractHostResultExtractor):
+                def single_transform(self, single_result):
+                    return single_result[0].result
 
-            print(nornir_cache["hosts"]["R1"]["data"])
 
-            assert "new" in nornir_cache["hosts"]["R1"]["data"]
-            assert nornir_cache["hosts"]["R1"]["data"]["new"] == "manipulate cashe"
-                """
-    ARGUMENTS = {
-        "test_class_loading": """
-                        ---
-                        - test_module: basic_task
-                          test_class: TestBasicTaskFirst
-                          test_data:
-                            - host: R1
-                        - test_module: basic_task
-                          test_class: TestBasicTaskSecond
-                          test_data:
-                            - host: R1
-                        """,
-    }
+            class CustomNornirNutsContext(NornirNutsContext):
+                def nuts_task(self):
+                    return lambda task: Result(host=task.host, result=task.host.name)
 
-    def test_cached_nornir_inventory(self, pytester, deregister_nornir_plugin):
-        pytester.makepyfile(basic_task=self.BASIC_TASK)
-        arguments = self.ARGUMENTS
-        pytester.makefile(YAML_EXTENSION, **arguments)
-        result = pytester.runpytest("test_class_loading.yaml")
-        result.assert_outcomes(passed=4)
+                def nuts_extractor(self):
+                    return HostNameExtractor(self)
 
-        result = pytester.runpytest(
-            "--nornir-cached-inventory", "--cache-show", "nuts/NORNIR_CACHE"
+
+            CONTEXT = CustomNornirNutsContext
+
+
+            class TestBasicTask:
+                @pytest.mark.nuts("host")
+                def test_basic_task(self, single_result, host):
+                    assert single_result.result == host
+            """
+        )
+        pytester.makefile(
+            YAML_EXTENSION,
+            test_class_loading="""
+                ---
+                - test_module: basic_task
+                  test_class: TestBasicTask
+                  test_data:
+                    - host: R1
+                    - host: R2
+                """,
         )
-        result.assert_outcomes()
-        assert "hosts" in result.stdout.str()
+        pytester.syspathinsert()
+        yield
+        server.close()
 
-    def test_no_cached_nornir_inventory(self, pytester, deregister_nornir_plugin):
-        pytester.makepyfile(basic_task=self.BASIC_TASK)
-        arguments = self.ARGUMENTS
-        pytester.makefile(YAML_EXTENSION, **arguments)
-        result = pytester.runpytest("--nornir-cache-disable", "-v")
+    @pytest.mark.usefixtures("local_inventory")
+    def test_unreachable_hosts_fail_without_running_the_task(self, pytester):
+        result = pytester.runpytest("test_class_loading.yaml", "--nuts-preflight")
+        result.assert_outcomes(passed=1, errors=1)
+        result.stdout.fnmatch_lines(["*ConnectionRefusedError*"])
 
-        result.assert_outcomes(passed=1, failed=3)
-        output = result.stdout.str()
-        assert "test_config_has_cache FAILED" in output
-        assert "test_has_correct_pytestconfig FAILED" in output
-        assert "test_trigger_teardown[R1_] PASSED" in output
-        assert "test_config_has_cache FAILED" in output
+    @pytest.mark.usefixtures("local_inventory")
+    def test_no_preflight_by_default(self, pytester):
+        result = pytester.runpytest("test_class_loading.yaml")
+        result.assert_outcomes(passed=2)
 
 
 class TestNornirNutsContextIntegrationWithoutFiles:
@@ -539,6 +1582,73 @@ class TestNornirContextParametrization:
         for d in expected:
             assert d in new_data
 
+    def test_nornir_filter_of_parametrized_test_data(self, nornir_nuts_ctx):
+        test_data = nornir_nuts_ctx.parametrize([{"tags": ["router"]}])
+        nornir_nuts_ctx.nuts_parameters = {"test_data": test_data}
+        nornir_nuts_ctx.parametrize = Mock(side_effect=AssertionError)
+        selector = NornirNutsContext.nornir_filter(nornir_nuts_ctx)
+        assert isinstance(selector, HostSelector)
+        assert selector.names == {"R1", "R2"}
+
+    def test_nornir_filter_parametrizes_test_data(self, nornir_nuts_ctx):
+        nornir_nuts_ctx.nuts_parameters = {"test_data": [{"tags": ["router"]}]}
+        selector = NornirNutsContext.nornir_filter(nornir_nuts_ctx)
+        assert isinstance(selector, HostSelector)
+        assert selector.names == {"R1", "R2"}
+
+    def test_parametrization_keeps_explicit_hosts_first(self, nornir_nuts_ctx):
+        test_data = [{"host": "R2", "tags": ["router"], "test": "test"}]
+        new_data = nornir_nuts_ctx.parametrize(test_data)
+        assert new_data == [
+            {"host": "R2", "test": "test"},
+            {"host": "R1", "test": "test"},
+        ]
+
+    def test_parametrization_shares_entry_fields(self, nornir_nuts_ctx):
+        test_data = [{"tags": ["router"], "values": [1, 2]}]
+        first, second = nornir_nuts_ctx.parametrize(test_data)
+        assert first == {"host": "R1", "values": [1, 2]}
+        assert second == {"host": "R2", "values": [1, 2]}
+        assert first["values"] is second["values"]
+
+    @pytest.mark.parametrize(
+        "selectors, expected",
+        [
+            ({"host_match": "R*"}, ["R1", "R2"]),
+            ({"host_match": ["R2", "R9*"]}, ["R2"]),
+            ({"host_regex": r"R\d"}, ["R1", "R2"]),
+            ({"host_regex": "R", "host_match": "?2"}, ["R2"]),
+        ],
+    )
+    def test_parametrization_by_name_pattern(self, selectors, expected):
+        context = CustomNornirNutsContext({}, None)
+        context.nornir = Nornir(
+            inventory=Inventory(
+                hosts=Hosts({name: Host(name) for name in ("R1", "R2")})
+            )
+        )
+        new_data = context.parametrize([{**selectors, "test": "test"}])
+        assert new_data == [{"host": host, "test": "test"} for host in expected]
+
+    @pytest.mark.parametrize(
+        "selectors, expected",
+        [
+            ({"host_match": "R*"}, ["R1", "R2"]),
+            ({"host_regex": "R2"}, ["R2"]),
+        ],
+    )
+    def test_parametrization_by_name_pattern_without_inventory(
+        self, nornir_nuts_ctx, selectors, expected
+    ):
+        new_data = nornir_nuts_ctx.parametrize([{**selectors, "test": "test"}])
+        assert new_data == [{"host": host, "test": "test"} for host in expected]
+
+    def test_parametrization_without_matching_name(self):
+        context = CustomNornirNutsContext({}, None)
+        context.nornir = Nornir(inventory=Inventory(hosts=Hosts({"R1": Host("R1")})))
+        with pytest.raises(NutsSetupError, match="No hosts found"):
+            context.parametrize([{"host_match": "X*", "test": "test"}])
+
 
 @pytest.mark.usefixtures("default_nr_init")
 class TestNornirNutsContextParametrizationIntegration:
@@ -600,6 +1710,36 @@ class TestNornirNutsContextParametrizationIntegration:
         result = pytester.runpytest("test_class_loading.yaml")
         result.assert_outcomes(passed=2)
 
+    def test_expanded_test_data_is_cached(self, pytester, deregister_nornir_plugin):
+        pytester.makepyfile(basic_task=self.BASIC_TASK)
+        pytester.makefile(
+            YAML_EXTENSION,
+            test_class_loading="""
+                ---
+                - test_module: basic_task
+                  test_class: TestBasicTask
+                  test_data:
+                    - tags: router
+                """,
+        )
+        result = pytester.runpytest("test_class_loading.yaml", "-v")
+        result.assert_outcomes(passed=2)
+        result.stdout.re_match_lines([r".*\[R1_\] PASSED", r".*\[R2_\] PASSED"])
+
+        [cached] = (pytester.path / ".pytest_cache/v/nuts/parametrization").iterdir()
+        assert json.loads(cached.read_text()) == [[{}, ["R1", "R2"]]]
+        cached.write_text(json.dumps([[{}, ["R2"]]]))
+        deregister_nornir_plugins()
+        result = pytester.runpytest("test_class_loading.yaml", "-v")
+        result.assert_outcomes(passed=1)
+        result.stdout.fnmatch_lines(["*[[]R2_[]] PASSED*"])
+
+        with open(pytester.path / f"hosts{YAML_EXTENSION}", "a") as hosts:
+            hosts.write("\nR4:\n  hostname: 4.4.4.4\n  data:\n    tags: [router]\n")
+        deregister_nornir_plugins()
+        result = pytester.runpytest("test_class_loading.yaml")
+        result.assert_outcomes(passed=3)
+
     def test_executes_task_with_group_site1(self, pytester):
         pytester.makepyfile(basic_task=self.BASIC_TASK)
         arguments = {
@@ -6,6 +6,12 @@ from dataclasses import dataclass
 from typing import Any, Optional, List, Dict
 
 from nornir.core.inventory import Host
+from nornir.core.plugins.connections import ConnectionPluginRegister
+from nornir.core.plugins.inventory import (
+    InventoryPluginRegister,
+    TransformFunctionRegister,
+)
+from nornir.core.plugins.runners import RunnersPluginRegister
 from nornir.core.task import MultiResult, Result
 
 YAML_EXTENSION = ".yaml"
@@ -70,3 +76,15 @@ def create_result(
     result.failed = failed
     result.exception = exception
     return result
+
+
+def deregister_nornir_plugins() -> None:
+    """
+    Cleanup Nornir's PluginRegisters, which are shared between pytest runs.
+    Otherwise, the plugins of the next run raise a PluginAlreadyRegistered
+    Exception as they are registered multiple times.
+    """
+    ConnectionPluginRegister.deregister_all()
+    InventoryPluginRegister.deregister_all()
+    RunnersPluginRegister.deregister_all()
+    TransformFunctionRegister.deregister_all()